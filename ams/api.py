@@ -0,0 +1,106 @@
+"""Shared pieces of the REST API (``/api/v1/``)."""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .cache import account_cache
+
+
+class AccountScopedMixin:
+    """Limits non-staff users to the rows of their own account.
+
+    ``account_lookup`` is the ORM path from the model to ``AmsUser``.
+    ``related_account_lookups`` maps each writable related field to the path
+    from its model to ``AmsUser``, so writes can only point at rows of the
+    user's own account.
+    """
+    account_lookup = 'AccountID'
+    related_account_lookups = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        return queryset.filter(**{self.account_lookup: user.pk})
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        user = self.request.user
+        if not user.is_staff and self.request.method not in permissions.SAFE_METHODS:
+            fields = serializer.child.fields if hasattr(serializer, 'child') else serializer.fields
+            for name, lookup in self.related_account_lookups.items():
+                fields[name].queryset = fields[name].queryset.filter(**{lookup: user.pk})
+        return serializer
+
+
+class AccountScopedModelViewSet(AccountScopedMixin, viewsets.ModelViewSet):
+    pass
+
+
+class AccountScopedReadOnlyModelViewSet(AccountScopedMixin, viewsets.ReadOnlyModelViewSet):
+    pass
+
+
+async def aget_user(request):
+    """The session user, or the user of a ``Bearer`` JWT, for plain (non-DRF) async views."""
+    user = await request.auser()
+    if user.is_authenticated or 'HTTP_AUTHORIZATION' not in request.META:
+        return user
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return user
+    return result[0] if result else user
+
+
+def async_account_view(view):
+    """Async view decorator: requires an authenticated user who is staff or owns ``account_id``.
+
+    The view receives the user as its second argument.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return JsonResponse({'detail': "Authentication credentials were not provided."}, status=401)
+        account_id = kwargs.get('account_id')
+        if account_id is not None and not user.is_staff and account_id != user.pk:
+            return JsonResponse({'detail': "Not found."}, status=404)
+        return await view(request, user, *args, **kwargs)
+    return wrapper
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request, version):
+    """Hit/miss/eviction counters of this process's ``ams.cache.account_cache``."""
+    return Response(account_cache.stats())
+
+
+@functools.cache
+def docs_view():
+    # drf_yasg's OpenAPI and inspector modules are the largest single share of a worker's start-up,
+    # so the docs view is built, and they are imported, on the first docs request only.
+    from drf_yasg import openapi
+    from drf_yasg.views import get_schema_view
+
+    schema_view = get_schema_view(
+        openapi.Info(title="AMS API", default_version='v1'),
+        public=False,
+        permission_classes=[permissions.IsAdminUser],
+    )
+    return schema_view.with_ui('swagger', cache_timeout=0)
+
+
+@csrf_exempt
+def api_docs(request, *args, **kwargs):
+    """Swagger UI for the API (staff only)."""
+    return docs_view()(request, *args, **kwargs)
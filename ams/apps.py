@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class AmsConfig(AppConfig):
+    name = 'ams'
+
+    def ready(self):
+        from .db import configure_connection
+
+        connection_created.connect(configure_connection, dispatch_uid='ams.db.configure_connection')
@@ -0,0 +1,223 @@
+"""Benchmark suite for the ORM hot paths, run by ``manage.py run_benchmarks``.
+
+``generate`` fills the database with synthetic accounts, transactions,
+payments (half the transactions), credit card and cash rows (half the
+payments each), reports and invoices (one per hundred transactions), spread
+over three years, in batches so 10M rows do not have to fit in memory.
+
+``run`` times each case from ``cases``: admin changelists, the date-hierarchy
+drilldown, admin search, statement aggregation and bulk insert. Results are
+plain dicts so they can be written as JSON and compared later with
+``regressions``.
+"""
+import platform
+import random
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ams.metrics import QueryRecorder
+from apps.billing.models import Invoice
+from apps.reports.models import Report
+from apps.reports.statements import generate_statements
+from apps.transactions import ledger, rollups
+from apps.transactions.models import Cash, CreditCard, Payment, Transaction
+from apps.transactions.payments import method_totals
+from apps.users.models import AmsUser
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+WORDS = ('invoice rent payroll coffee supplies travel hotel fuel insurance licence consulting refund '
+         'transfer deposit salary utilities electricity water internet subscription hardware software '
+         'maintenance repair catering marketing advertising shipping freight customs tax').split()
+BANKS = ('Demo Bank', 'First Savings', 'Metro Credit Union', 'Harbour Trust')
+START = date(2023, 1, 1)
+DAYS = 3 * 365
+# The drilldown and statement cases look at this month.
+MONTH = date(2024, 6, 1)
+
+Dataset = namedtuple('Dataset', ['rows', 'admin', 'account', 'report'])
+Case = namedtuple('Case', ['name', 'func'])
+
+
+def generate(rows, seed=0, batch_size=10_000, log=None):
+    """Create ``rows`` transactions and the rows that hang off them; returns a ``Dataset``."""
+    rng = random.Random(seed)
+    prefix = f'benchmark-{time.time_ns()}'
+    admin = AmsUser.objects.create_superuser(username=f'{prefix}-admin', password=None)
+    accounts = AmsUser.objects.bulk_create(
+        AmsUser(username=f'{prefix}-{i}', first_name=rng.choice(WORDS).title(), email=f'{prefix}-{i}@example.com')
+        for i in range(max(10, rows // 1000))
+    )
+    start = timezone.make_aware(datetime.combine(START, datetime.min.time()))
+
+    created = 0
+    while created < rows:
+        # bulk_create skips the signals that maintain the ledger and rollups; see below.
+        transactions = Transaction.objects.bulk_create(
+            Transaction(AccountID=rng.choice(accounts), BankName=rng.choice(BANKS),
+                        DateOfTransaction=start + timedelta(seconds=rng.randrange(DAYS * 86400)),
+                        Description=' '.join(rng.choices(WORDS, k=6)),
+                        Debit=Decimal(rng.randint(0, 500)), Credit=Decimal(rng.randint(0, 500)), TotalAmount=0)
+            for _ in range(min(batch_size, rows - created))
+        )
+        payments = Payment.objects.bulk_create(
+            Payment(TransactionID=tx, Amount=Decimal(rng.randint(1, 500)), Method=(Payment.CARD, Payment.CASH)[i % 2])
+            for i, tx in enumerate(transactions[::2])
+        )
+        CreditCard.objects.bulk_create(
+            CreditCard(CreditCardNo=f'4000-{p.pk}', PaymentID=p, BankCredit=rng.choice(BANKS),
+                       NameCredit=rng.choice(WORDS).title())
+            for p in payments[::2]
+        )
+        Cash.objects.bulk_create(
+            Cash(CashTransactionNo=f'C-{p.pk}', PaymentID=p, NameCash=rng.choice(WORDS).title(),
+                 CashTendered=p.Amount)
+            for p in payments[1::2]
+        )
+        reports = Report.objects.bulk_create(
+            Report(AccountID_id=tx.AccountID_id, TransactionID=tx,
+                   DateRange=START + timedelta(days=rng.randrange(DAYS)))
+            for tx in transactions[::100]
+        )
+        Invoice.objects.bulk_create(
+            Invoice(IVID=f'IV-{prefix}-{r.pk}', ReportID=r, BalanceDue=0, POno=f'PO-{r.pk}', Quantity=1,
+                    Description=' '.join(rng.choices(WORDS, k=4)), UnitPrice=0)
+            for r in reports
+        )
+        created += len(transactions)
+        if log:
+            log(f"generated {created}/{rows} transactions")
+
+    # Only the account the statement case reads needs a correct ledger and rollups.
+    account = accounts[0]
+    ledger.rebuild(account.pk)
+    rollups.rebuild(account.pk)
+    first = Transaction.objects.filter(AccountID=account).order_by('pk').first()
+    report = Report.objects.create(AccountID=account, TransactionID=first,
+                                   DateRange=ledger.month_end(MONTH))
+    return Dataset(rows, admin, account, report)
+
+
+def changelist(client, model, **params):
+    def func():
+        response = client.get(reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'), params)
+        if response.status_code != 200:
+            raise RuntimeError(f"{model.__name__} changelist {params} answered {response.status_code}.")
+    return func
+
+
+def bulk_insert(account, count=1000):
+    def func():
+        with transaction.atomic():
+            transactions = Transaction.objects.bulk_create(
+                Transaction(AccountID=account, BankName='Benchmark Bank', Credit=1, TotalAmount=1)
+                for _ in range(count)
+            )
+            Payment.objects.bulk_create(Payment(TransactionID=tx, Amount=1) for tx in transactions)
+            transaction.set_rollback(True)
+    return func
+
+
+def cases(dataset):
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(dataset.admin)
+    year, month = MONTH.year, MONTH.month
+    return [
+        *(Case(f'admin.changelist.{model._meta.model_name}', changelist(client, model))
+          for model in (AmsUser, Transaction, Payment, CreditCard, Cash, Report, Invoice)),
+        Case('admin.drilldown.transaction.year', changelist(client, Transaction, DateOfTransaction__year=year)),
+        Case('admin.drilldown.transaction.month', changelist(
+            client, Transaction, DateOfTransaction__year=year, DateOfTransaction__month=month)),
+        Case('admin.drilldown.transaction.day', changelist(
+            client, Transaction, DateOfTransaction__year=year, DateOfTransaction__month=month,
+            DateOfTransaction__day=15)),
+        Case('admin.drilldown.report.month', changelist(client, Report, DateRange__year=year, DateRange__month=month)),
+        Case('admin.search.transaction.text', changelist(client, Transaction, q='payroll hotel')),
+        Case('admin.search.transaction.id', changelist(client, Transaction, q=str(dataset.report.TransactionID_id))),
+        Case('admin.search.invoice.text', changelist(client, Invoice, q='coffee')),
+        Case('admin.search.user', changelist(client, AmsUser, q=dataset.account.username)),
+        Case('payments.page_with_details', lambda: list(Payment.objects.with_details().order_by('-pk')[:100])),
+        Case('payments.method_totals', lambda: method_totals(Payment.objects.all())),
+        Case('statements.generate', lambda: generate_statements(dataset.report)),
+        Case('bulk_insert.transactions_1000', bulk_insert(dataset.account)),
+    ]
+
+
+def measure(func, repeat):
+    func()  # warm-up
+    # Not CaptureQueriesContext: the test client's request_started resets connection.queries.
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(recorder))
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0], 3),
+        'min_ms': round(min(timings), 3),
+        'runs': repeat,
+        'queries': recorder.count,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(dataset, repeat=5, only=None, log=None):
+    results = {}
+    for case in cases(dataset):
+        if only and not any(case.name.startswith(prefix) for prefix in only):
+            continue
+        results[case.name] = measure(case.func, repeat)
+        if log:
+            log(case.name, results[case.name])
+    return {
+        'meta': {
+            'rows': dataset.rows,
+            'vendor': connection.vendor,
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'machine': platform.machine(),
+            'time': timezone.now().isoformat(),
+        },
+        'results': results,
+    }
+
+
+def regressions(current, baseline, threshold=0.2, min_delta_ms=1.0):
+    """Cases whose median is more than ``threshold`` (a fraction) slower than in ``baseline``.
+
+    Slowdowns under ``min_delta_ms`` are ignored so sub-millisecond noise
+    cannot fail a run. Returns ``[(name, baseline_ms, current_ms)]``.
+    """
+    slower = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        now, then = result['median_ms'], before['median_ms']
+        if now > then * (1 + threshold) and now - then > min_delta_ms:
+            slower.append((name, then, now))
+    return slower
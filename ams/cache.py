@@ -0,0 +1,254 @@
+"""Two-level read-through cache for values computed per account.
+
+Level 1 is an in-process LRU bounded by ``LOCAL_MAXSIZE`` entries and
+``LOCAL_TTL`` seconds; level 2 is the shared Django cache ``ALIAS`` (see
+``AMS_CACHE`` in settings), so processes share what any of them computed.
+
+Every key embeds the account's current version number, kept in the shared
+cache. ``invalidate(account_id)`` increments it: all older entries of that
+account become unreachable at once (and age out of both levels), and no other
+account's entries are touched. Writers call ``invalidate_on_commit``: the
+version moves when their transaction commits, which also orphans anything
+another process computed from the pre-commit rows in the meantime. Until then
+the writing transaction itself bypasses the cache for that account, so it
+reads its own changes and never publishes uncommitted ones.
+
+Invalidation only reaches other processes through the shared cache, so
+production needs a backend every worker talks to (``REDIS_URL``). When the
+alias is process-local (``LocMemCache``, the fallback without Redis), each
+process has its own versions and never sees another's invalidations; both
+levels then keep entries for at most ``PROCESS_LOCAL_TIMEOUT`` seconds, which
+bounds how stale another process's totals can get.
+
+``cached_per_account`` also takes coroutine functions, for async views: the
+async path reads the same entries through the cache's ``aget``/``aset``.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'LOCAL_MAXSIZE': 1024,
+    'LOCAL_TTL': 30,
+    'PROCESS_LOCAL_TIMEOUT': 5,
+}
+# Backends whose entries live in one process only.
+PROCESS_LOCAL_BACKENDS = {'django.core.cache.backends.locmem.LocMemCache'}
+_MISSING = object()
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'AMS_CACHE', {})}
+
+
+def is_process_local(alias):
+    return settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_BACKENDS
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a size bound and a per-entry time to live."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class AccountCache:
+    def __init__(self, alias=None, timeout=None, local_maxsize=None, local_ttl=None, namespace='ams',
+                 process_local_timeout=None):
+        config = cache_settings()
+        # Caches with different namespaces keep separate versions: invalidating one leaves the others.
+        self.namespace = namespace
+        self.alias = alias or config['ALIAS']
+        self.timeout = config['TIMEOUT'] if timeout is None else timeout
+        local_ttl = config['LOCAL_TTL'] if local_ttl is None else local_ttl
+        if is_process_local(self.alias):
+            # Other processes never see this one's invalidations: nothing may outlive a few seconds.
+            limit = config['PROCESS_LOCAL_TIMEOUT'] if process_local_timeout is None else process_local_timeout
+            self.timeout = limit if self.timeout is None else min(self.timeout, limit)
+            local_ttl = min(local_ttl, limit)
+        self.local = LRUCache(config['LOCAL_MAXSIZE'] if local_maxsize is None else local_maxsize, local_ttl)
+        self.local_hits = self.shared_hits = self.misses = 0
+        self._pending = threading.local()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def version_key(self, account_id):
+        return f'{self.namespace}:v:{account_id}'
+
+    def version(self, account_id):
+        key = self.version_key(account_id)
+        version = self.shared.get(key)
+        if version is None:
+            # Start from the clock, not 1: if the shared cache dropped the key, restarting at a
+            # number that was used before could resurrect that version's entries.
+            self.shared.add(key, time.time_ns(), timeout=None)
+            version = self.shared.get(key)
+        return version
+
+    def key(self, account_id, name, version):
+        return f'{self.namespace}:{name}:{account_id}:{version}'
+
+    def get_or_compute(self, account_id, name, compute):
+        if self.pending(account_id):
+            return compute()
+        key = self.key(account_id, name, self.version(account_id))
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is not _MISSING:
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            value = compute()
+            self.shared.set(key, value, self.timeout)
+        self.local.set(key, value)
+        return value
+
+    async def aversion(self, account_id):
+        key = self.version_key(account_id)
+        version = await self.shared.aget(key)
+        if version is None:
+            await self.shared.aadd(key, time.time_ns(), timeout=None)
+            version = await self.shared.aget(key)
+        return version
+
+    async def aget_or_compute(self, account_id, name, compute):
+        """Async ``get_or_compute``; ``compute`` returns an awaitable.
+
+        There is no pending check: async code runs outside transactions.
+        """
+        key = self.key(account_id, name, await self.aversion(account_id))
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+        value = await self.shared.aget(key, _MISSING)
+        if value is not _MISSING:
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            value = await compute()
+            await self.shared.aset(key, value, self.timeout)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, *account_ids):
+        for account_id in set(account_ids):
+            try:
+                self.shared.incr(self.version_key(account_id))
+            except ValueError:
+                # No version yet, so nothing was cached under one.
+                pass
+
+    def invalidate_on_commit(self, *account_ids):
+        if transaction.get_connection().in_atomic_block:
+            self.pending_ids().update(account_ids)
+        transaction.on_commit(functools.partial(self.committed, account_ids))
+
+    def committed(self, account_ids):
+        self.invalidate(*account_ids)
+        self.pending_ids().difference_update(account_ids)
+
+    def pending_ids(self):
+        """Accounts this thread's open transaction has invalidated and not committed yet.
+
+        Nothing is pending outside a transaction. The ids of a rolled-back
+        transaction are only dropped then; until that, reads of those
+        accounts bypass the cache, which costs time but never correctness.
+        """
+        ids = self._pending.__dict__.setdefault('ids', set())
+        if not transaction.get_connection().in_atomic_block:
+            ids.clear()
+        return ids
+
+    def pending(self, account_id):
+        """Whether the current transaction has changed ``account_id`` and not committed yet."""
+        return account_id in self.pending_ids()
+
+    def stats(self):
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'local_evictions': self.local.evictions,
+            'local_expirations': self.local.expirations,
+            'local_size': len(self.local),
+            'local_maxsize': self.local.maxsize,
+        }
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+        self.local_hits = self.shared_hits = self.misses = 0
+
+
+account_cache = AccountCache()
+
+
+def _key_part(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def cached_per_account(name):
+    """Cache ``func(account_id, *args)`` in ``account_cache``; the original stays available as ``.uncached``.
+
+    ``func`` may be a coroutine function; its entries are shared with a sync
+    function cached under the same name.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(account_id, *args):
+                key = ':'.join([name, *map(_key_part, args)])
+                return await account_cache.aget_or_compute(account_id, key, lambda: func(account_id, *args))
+        else:
+            @functools.wraps(func)
+            def wrapper(account_id, *args):
+                key = ':'.join([name, *map(_key_part, args)])
+                return account_cache.get_or_compute(account_id, key, lambda: func(account_id, *args))
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,244 @@
+"""Streaming bulk fixture loading, for fixtures too large for ``loaddata``.
+
+``loaddata`` deserialises the whole file into memory and saves objects one at
+a time. ``load_fixture`` reads Django's JSON fixture format (a top-level
+array) or JSON Lines (one object per line) incrementally, builds model
+instances in batches of consecutive records of the same model, resolves
+natural-key foreign keys once per distinct key per batch, and writes each batch
+with ``bulk_create``. Existing rows with the same primary key are overwritten,
+as ``loaddata`` does.
+
+``bulk_create`` skips the model signals, so ``fixture_loaded`` is sent once per
+model with the loaded primary keys for receivers that maintain derived data.
+"""
+import functools
+import gzip
+import json
+import operator
+import time
+from collections import Counter, defaultdict, namedtuple
+from pathlib import Path
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+
+# Sent with sender=<model>, pks=<list of loaded primary keys>, using=<alias>.
+fixture_loaded = Signal()
+
+LoadResult = namedtuple('LoadResult', ['objects', 'models', 'seconds'])
+
+
+def open_fixture(path):
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8'), Path(path.stem).suffix
+    return open(path, encoding='utf-8'), path.suffix
+
+
+def read_json_array(stream, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array without reading the whole document."""
+    decoder = json.JSONDecoder()
+    buffer, expecting = '', '['
+    while True:
+        buffer = buffer.lstrip()
+        if buffer and expecting == '[':
+            if buffer[0] != '[':
+                raise ValueError("A JSON fixture must be an array of objects.")
+            buffer, expecting = buffer[1:], 'first'
+            continue
+        if buffer and expecting in ('first', ','):
+            if buffer[0] == ']':
+                return
+            if expecting == ',':
+                if buffer[0] != ',':
+                    raise ValueError(f"Malformed JSON fixture near {buffer[:40]!r}.")
+                buffer = buffer[1:]
+            expecting = 'item'
+            continue
+        if buffer and expecting == 'item':
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                pass  # the item continues in the next chunk
+            else:
+                yield item
+                buffer, expecting = buffer[end:], ','
+                continue
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            raise ValueError("Truncated or malformed JSON fixture.")
+        buffer += chunk
+
+
+def read_json_lines(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_records(path):
+    stream, suffix = open_fixture(path)
+    with stream:
+        yield from (read_json_lines(stream) if suffix in ('.jsonl', '.ndjson') else read_json_array(stream))
+
+
+class ModelLoader:
+    """Turns fixture records of one model into instances and writes them in batches."""
+
+    def __init__(self, model, using):
+        self.model = model
+        self.using = using
+        self.fields = {field.name: field for field in model._meta.concrete_fields}
+        self.m2m = {field.name: field for field in model._meta.many_to_many}
+        self.natural_pks = defaultdict(dict)
+        self.pks = []
+
+    def natural_key_fields(self, model):
+        """Lookups matching the parts of ``model``'s natural key, or None if it has to go through the manager."""
+        if model is get_user_model():
+            return [model.USERNAME_FIELD]
+        if model is ContentType:
+            return ['app_label', 'model']
+        if model is Permission:
+            return ['codename', 'content_type__app_label', 'content_type__model']
+        return None
+
+    def resolve(self, model, keys):
+        """Map natural keys (tuples) of ``model`` to primary keys, querying each key at most once.
+
+        Keys of models with known natural-key lookups are fetched in chunks of
+        one query each; any other key goes through ``get_by_natural_key``.
+        """
+        known = self.natural_pks[model]
+        missing = [key for key in keys if key not in known]
+        fields = self.natural_key_fields(model)
+        manager = model._default_manager.db_manager(self.using)
+        if missing and fields:
+            size = connections[self.using].ops.bulk_batch_size(fields, missing) or len(missing)
+            for start in range(0, len(missing), size):
+                chunk = missing[start:start + size]
+                if len(fields) == 1:
+                    lookup = Q(**{f'{fields[0]}__in': [key[0] for key in chunk]})
+                else:
+                    lookup = functools.reduce(operator.or_, (Q(**dict(zip(fields, key))) for key in chunk))
+                known.update((tuple(row[:-1]), row[-1]) for row in manager.filter(lookup).values_list(*fields, 'pk'))
+        for key in missing:
+            if key not in known:
+                known[key] = manager.get_by_natural_key(*key).pk
+        return known
+
+    def related_pk(self, field, value):
+        if isinstance(value, list):
+            return self.natural_pks[field.related_model][tuple(value)]
+        return field.target_field.to_python(value)
+
+    def build(self, records):
+        natural = defaultdict(set)
+        for record in records:
+            for name, value in record.get('fields', {}).items():
+                field = self.fields.get(name) or self.m2m.get(name)
+                if field is None or not field.is_relation or value is None:
+                    continue
+                for item in (value if field.many_to_many else [value]):
+                    if isinstance(item, list):
+                        natural[field.related_model].add(tuple(item))
+        for model, keys in natural.items():
+            self.resolve(model, keys)
+
+        objects, m2m = [], []
+        for record in records:
+            values = {}
+            if record.get('pk') is not None:
+                values[self.model._meta.pk.attname] = self.model._meta.pk.to_python(record['pk'])
+            relations = {}
+            for name, value in record.get('fields', {}).items():
+                if name in self.m2m:
+                    relations[name] = [self.related_pk(self.m2m[name], item) for item in value]
+                elif name in self.fields:
+                    field = self.fields[name]
+                    if field.is_relation:
+                        values[field.attname] = None if value is None else self.related_pk(field, value)
+                    else:
+                        values[field.attname] = field.to_python(value)
+                else:
+                    raise ValueError(f"{self.model._meta.label} has no field named {name!r}.")
+            objects.append(self.model(**values))
+            m2m.append(relations)
+        return objects, m2m
+
+    def write(self, records):
+        objects, m2m = self.build(records)
+        connection = connections[self.using]
+        with_pk = [obj for obj in objects if obj.pk is not None]
+        without_pk = [obj for obj in objects if obj.pk is None]
+        pk = self.model._meta.pk
+        update_fields = [field.name for field in self.fields.values() if not field.primary_key]
+        manager = self.model._base_manager.db_manager(self.using)
+        if with_pk and not update_fields:
+            # Nothing to overwrite: rows that exist already match the fixture.
+            manager.bulk_create(with_pk, ignore_conflicts=True)
+        elif with_pk and connection.features.supports_update_conflicts_with_target:
+            manager.bulk_create(with_pk, update_conflicts=True, unique_fields=[pk.name], update_fields=update_fields)
+        elif with_pk:
+            # No upsert: update the rows that exist and insert the rest, as loaddata's save() does.
+            existing = set(manager.filter(pk__in=[obj.pk for obj in with_pk]).values_list('pk', flat=True))
+            manager.bulk_update([obj for obj in with_pk if obj.pk in existing], update_fields)
+            manager.bulk_create([obj for obj in with_pk if obj.pk not in existing])
+        if without_pk:
+            manager.bulk_create(without_pk)
+
+        for name, field in self.m2m.items():
+            through = field.remote_field.through
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            rows = [
+                through(**{f'{source}_id': obj.pk, f'{target}_id': target_pk})
+                for obj, relations in zip(objects, m2m) for target_pk in relations.get(name, ())
+            ]
+            through._base_manager.db_manager(self.using).bulk_create(rows, ignore_conflicts=True)
+        if fixture_loaded.has_listeners(self.model):
+            self.pks.extend(obj.pk for obj in objects)
+
+
+def load_fixture(path, using=DEFAULT_DB_ALIAS, batch_size=5000, on_batch=None):
+    """Load one fixture file in a single transaction; returns a ``LoadResult``."""
+    started = time.monotonic()
+    loaders, counts = {}, Counter()
+    with transaction.atomic(using=using):
+        batch, loader = [], None
+
+        def flush():
+            if batch:
+                loader.write(batch)
+                counts[loader.model._meta.label] += len(batch)
+                if on_batch:
+                    on_batch(loader.model, len(batch))
+                batch.clear()
+
+        for record in read_records(path):
+            model = apps.get_model(record['model'])
+            if loader is None or loader.model is not model:
+                flush()
+                if model not in loaders:
+                    loaders[model] = ModelLoader(model, using)
+                loader = loaders[model]
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        connection = connections[using]
+        sequences = connection.ops.sequence_reset_sql(no_style(), list(loaders))
+        if sequences:
+            with connection.cursor() as cursor:
+                for sql in sequences:
+                    cursor.execute(sql)
+        for model, model_loader in loaders.items():
+            if model_loader.pks:
+                fixture_loaded.send(sender=model, pks=model_loader.pks, using=using)
+    return LoadResult(sum(counts.values()), dict(counts), time.monotonic() - started)
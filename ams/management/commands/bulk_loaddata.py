@@ -0,0 +1,33 @@
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from ams.fixtures import load_fixture
+
+
+class Command(BaseCommand):
+    help = ("Load large JSON or JSON Lines fixtures (optionally .gz) with streaming parsing and batched "
+            "bulk_create instead of loaddata's object-by-object saves. Each file is loaded in one "
+            "transaction; rows with an existing primary key are overwritten.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, fixtures, database, batch_size, **options):
+        def on_batch(model, count):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {model._meta.label}: {count} objects")
+
+        for path in fixtures:
+            try:
+                result = load_fixture(path, using=database, batch_size=batch_size, on_batch=on_batch)
+            except (OSError, ValueError, LookupError, FieldDoesNotExist, ObjectDoesNotExist, DatabaseError) as exc:
+                raise CommandError(f"{path}: {exc}")
+            rate = result.objects / result.seconds if result.seconds else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: loaded {result.objects} objects "
+                f"({', '.join(f'{label} {count}' for label, count in result.models.items())}) "
+                f"in {result.seconds:.1f}s ({rate:.0f} objects/s)"
+            ))
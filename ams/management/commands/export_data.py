@@ -0,0 +1,35 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from ams import export
+
+EXPORTABLE = ['transactions.Transaction', 'transactions.Payment', 'billing.Invoice', 'reports.Report']
+
+
+class Command(BaseCommand):
+    help = ("Stream Transaction, Payment, Invoice or Report rows as CSV or JSONL, "
+            "reading the table in keyset-paginated chunks so memory stays bounded.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=EXPORTABLE)
+        parser.add_argument('--format', choices=list(export.FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+        parser.add_argument('--filter', action='append', default=[], metavar='LOOKUP=VALUE',
+                            help="Queryset filter, e.g. --filter AccountID=3 --filter DateOfTransaction__year=2025.")
+
+    def handle(self, *args, **options):
+        model = apps.get_model(options['model'])
+        try:
+            lookups = dict(item.split('=', 1) for item in options['filter'])
+        except ValueError:
+            raise CommandError("--filter expects LOOKUP=VALUE.")
+        queryset = model._default_manager.filter(**lookups)
+
+        lines = export.export(queryset, options['format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
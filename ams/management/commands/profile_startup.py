@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ams import startup
+
+
+class Command(BaseCommand):
+    help = ("Profile a cold worker start in fresh interpreters: import time per module and package, "
+            "each AppConfig.ready(), the boot phases, and the wall time of `import ams.wsgi` and "
+            "`manage.py check`. Fails when either is over its budget (see ams.startup.BUDGETS).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts to take the median of.")
+        parser.add_argument('--top', type=int, default=20, help="Modules to list.")
+        parser.add_argument('--max-wsgi-seconds', type=float, default=startup.BUDGETS['wsgi'])
+        parser.add_argument('--max-check-seconds', type=float, default=startup.BUDGETS['check'])
+
+    def handle(self, *args, runs, top, max_wsgi_seconds, max_check_seconds, **options):
+        profile = startup.profile()
+
+        self.stdout.write(f"{'phase':<24} {'ms':>8}")
+        for name, ms in profile.phases_ms.items():
+            self.stdout.write(f"{name:<24} {ms:>8.1f}")
+
+        self.stdout.write(f"\n{'AppConfig.ready()':<24} {'ms':>8}")
+        for label, ms in sorted(profile.ready_ms.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"{label:<24} {ms:>8.1f}")
+
+        self.stdout.write(f"\n{'package':<24} {'import ms':>10}")
+        for package, ms in startup.by_package(profile.imports)[:top]:
+            self.stdout.write(f"{package:<24} {ms:>10.1f}")
+
+        self.stdout.write(f"\n{'module':<48} {'self ms':>8} {'cumul. ms':>10}")
+        for row in sorted(profile.imports, key=lambda row: -row.self_ms)[:top]:
+            self.stdout.write(f"{row.module:<48} {row.self_ms:>8.1f} {row.cumulative_ms:>10.1f}")
+
+        timings = startup.cold_start(runs)
+        self.stdout.write(f"\n{'cold start':<24} {'median s':>8} {'budget s':>9}")
+        budgets = {'wsgi': max_wsgi_seconds, 'check': max_check_seconds}
+        for name, seconds in timings.items():
+            self.stdout.write(f"{name:<24} {seconds:>8.3f} {budgets[name]:>9.3f}")
+        over = startup.over_budget(timings, budgets)
+        if over:
+            raise CommandError("Over the start-up budget: " + ", ".join(
+                f"{name} {seconds:.3f} s > {budget:.3f} s" for name, seconds, budget in over))
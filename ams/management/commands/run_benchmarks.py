@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ams import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Run the ORM benchmark suite (admin changelists, date drilldown, search, statement "
+            "aggregation, bulk insert) against synthetic data, write the results as JSON and, with "
+            "--baseline, fail when a case is slower than the baseline by more than --threshold. "
+            "Runs inside a transaction that is rolled back, so no data is kept.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=benchmarks.SCALES, default='10k',
+                            help="Transactions to generate; the other tables are sized from it.")
+        parser.add_argument('--rows', type=int, help="Exact transaction count; overrides --scale.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per case.")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--only', nargs='+', metavar='PREFIX', help="Run the cases with these name prefixes.")
+        parser.add_argument('--output', help="Results file (default: benchmark-results/<rows>-<time>.json).")
+        parser.add_argument('--baseline', help="Results file of an earlier run to compare against.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed slowdown of a case's median, as a fraction of the baseline.")
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help="Ignore slowdowns smaller than this many milliseconds.")
+
+    def handle(self, *args, scale, rows, repeat, batch_size, only, output, baseline, threshold, min_delta_ms,
+               **options):
+        rows = rows or benchmarks.SCALES[scale]
+        baseline_results = json.loads(Path(baseline).read_text()) if baseline else None
+
+        with transaction.atomic():
+            dataset = benchmarks.generate(rows, batch_size=batch_size, log=self.progress)
+            self.stdout.write(f"{'case':<40} {'median ms':>10} {'p95 ms':>10} {'queries':>8}")
+            results = benchmarks.run(dataset, repeat=repeat, only=only, log=self.report)
+            transaction.set_rollback(True)
+
+        path = Path(output) if output else (
+            Path(settings.BASE_DIR) / 'benchmark-results' / f"{rows}-{timezone.now():%Y%m%d-%H%M%S}.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + '\n')
+        self.stdout.write(f"Results written to {path}")
+
+        if baseline_results is None:
+            return
+        if baseline_results['meta']['rows'] != rows:
+            self.stderr.write(f"Baseline was run with {baseline_results['meta']['rows']} rows, this run with {rows}.")
+        slower = benchmarks.regressions(results, baseline_results, threshold, min_delta_ms)
+        for name, before, now in slower:
+            self.stderr.write(f"{name}: {before:.2f} ms -> {now:.2f} ms (+{(now / before - 1) * 100:.0f}%)")
+        if slower:
+            raise CommandError(f"{len(slower)} case(s) slower than the baseline by more than {threshold:.0%}.")
+        self.stdout.write(f"No case slower than the baseline by more than {threshold:.0%}.")
+
+    def progress(self, message):
+        self.stderr.write(message)
+
+    def report(self, name, result):
+        self.stdout.write(f"{name:<40} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['queries']:>8}")
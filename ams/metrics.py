@@ -0,0 +1,292 @@
+"""Per-view request metrics, exported in the Prometheus text format.
+
+``MetricsMiddleware`` (added to ``MIDDLEWARE`` when ``AMS_METRICS['ENABLED']``)
+records for every request, keyed by the resolved view name (admin changelists
+are ``admin:<app>_<model>_changelist``):
+
+* wall time, as a histogram;
+* the number of SQL queries and the time spent in them, on every connection;
+* duplicate queries: the same SQL executed more than once in one request,
+  which is what an N+1 access pattern looks like.
+
+The middleware is async-capable, so under ASGI it does not turn the async
+views back into sync ones. The totals are served by ``metrics_view`` and each request is also written as
+one JSON line to the ``ams.metrics`` logger (a rotating file in settings).
+
+With ``PROFILE_SAMPLE_RATE`` above 0, that fraction of requests runs under
+cProfile, and those slower than ``PROFILE_THRESHOLD_MS`` are written to
+``PROFILE_DIR`` as folded stacks (``frame;frame;frame microseconds``), the
+input format of flamegraph.pl and speedscope. A request that cannot start
+its profiler (on Python 3.12+ only one runs at a time) is not sampled.
+"""
+import cProfile
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from .cache import account_cache
+
+logger = logging.getLogger('ams.metrics')
+
+DEFAULTS = {
+    'ENABLED': False,
+    'TOKEN': '',
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_THRESHOLD_MS': 500,
+    'PROFILE_DIR': None,
+}
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'AMS_METRICS', {})}
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times the queries of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.statements.items() if count > 1}
+
+
+class ViewStats:
+    __slots__ = ('requests', 'errors', 'queries', 'db_seconds', 'duplicates', 'seconds', 'buckets')
+
+    def __init__(self):
+        self.requests = self.errors = self.queries = self.duplicates = 0
+        self.db_seconds = self.seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+
+    def observe(self, view, status, seconds, recorder):
+        with self._lock:
+            stats = self.views[view]
+            stats.requests += 1
+            stats.errors += status >= 500
+            stats.queries += recorder.count
+            stats.db_seconds += recorder.seconds
+            stats.duplicates += sum(count - 1 for count in recorder.duplicates().values())
+            stats.seconds += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+
+    def reset(self):
+        with self._lock:
+            self.views.clear()
+
+    def prometheus(self):
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{labels} {value}' for labels, value in samples)
+
+        with self._lock:
+            views = sorted(self.views.items())
+            label = {view: '{view="%s"}' % view.replace('\\', '\\\\').replace('"', '\\"') for view, _ in views}
+            family('ams_requests_total', 'counter', 'Requests handled, by view.',
+                   [(label[v], s.requests) for v, s in views])
+            family('ams_request_errors_total', 'counter', 'Requests answered with a 5xx status, by view.',
+                   [(label[v], s.errors) for v, s in views])
+            family('ams_db_queries_total', 'counter', 'SQL queries executed, by view.',
+                   [(label[v], s.queries) for v, s in views])
+            family('ams_db_duplicate_queries_total', 'counter',
+                   'Repeats of a query already executed in the same request (N+1 patterns), by view.',
+                   [(label[v], s.duplicates) for v, s in views])
+            family('ams_db_seconds_total', 'counter', 'Time spent executing SQL, by view.',
+                   [(label[v], round(s.db_seconds, 6)) for v, s in views])
+            histogram = []
+            for view, stats in views:
+                inner = label[view][1:-1]
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    histogram.append((f'_bucket{{{inner},le="{bound}"}}', count))
+                histogram.append((f'_bucket{{{inner},le="+Inf"}}', stats.requests))
+                histogram.append((f'_sum{{{inner}}}', round(stats.seconds, 6)))
+                histogram.append((f'_count{{{inner}}}', stats.requests))
+            lines.append('# HELP ams_request_seconds Wall time of requests, by view.')
+            lines.append('# TYPE ams_request_seconds histogram')
+            lines.extend(f'ams_request_seconds{suffix} {value}' for suffix, value in histogram)
+
+        for name, value in account_cache.stats().items():
+            kind = 'gauge' if name.startswith('local_size') or name.endswith('maxsize') else 'counter'
+            suffix = '' if kind == 'gauge' else '_total'
+            family(f'ams_cache_{name}{suffix}', kind, f'ams.cache account cache {name.replace("_", " ")}.',
+                   [('', value)])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def frame_label(func):
+    filename, line, name = func
+    if filename == '~':  # built-in
+        return name.strip('<>').replace(';', ',')
+    return f'{name} ({Path(filename).name}:{line})'.replace(';', ',')
+
+
+def folded_stacks(profile, min_seconds=1e-5, max_depth=64):
+    """Collapse a cProfile run into ``{"root;caller;callee": seconds}``.
+
+    cProfile keeps caller -> callee edges, not whole stacks, so the time of a
+    function called from several places is split between its callers in
+    proportion to the time each call edge accounted for.
+    """
+    stats = pstats.Stats(profile).stats
+    children = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+    stacks = Counter()
+
+    def walk(func, path, share, seen):
+        own = stats[func][2]
+        path = f'{path};{frame_label(func)}' if path else frame_label(func)
+        stacks[path] += own * share
+        if len(seen) >= max_depth:
+            return
+        for child, edge_time in children[func]:
+            child_cumulative = stats[child][3]
+            child_share = share * edge_time / child_cumulative if child_cumulative else 0
+            if child not in seen and child_cumulative * child_share >= min_seconds:
+                walk(child, path, child_share, seen | {child})
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers and '_lsprof.Profiler' not in func[2]:
+            walk(func, '', 1.0, {func})
+    return {stack: seconds for stack, seconds in stacks.items() if seconds > 0}
+
+
+def write_folded(path, stacks):
+    with open(path, 'w') as out:
+        for stack, seconds in sorted(stacks.items()):
+            out.write(f'{stack} {max(1, round(seconds * 1_000_000))}\n')
+
+
+class MetricsMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = metrics_settings()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self.recording(recorder):
+            profile = self.start_profile()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profile:
+                    profile.disable()
+        self.finish(request, response, time.perf_counter() - started, recorder, profile)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self.recording(recorder):
+            profile = self.start_profile()
+            try:
+                response = await self.get_response(request)
+            finally:
+                if profile:
+                    profile.disable()
+        self.finish(request, response, time.perf_counter() - started, recorder, profile)
+        return response
+
+    @staticmethod
+    def recording(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def start_profile(self):
+        """A running profiler if this request is sampled, else ``None``."""
+        rate = self.config['PROFILE_SAMPLE_RATE']
+        if not rate or random.random() >= rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles through sys.monitoring, one profiler at a time: a request
+            # that overlaps a sampled one is not sampled.
+            return None
+        return profile
+
+    def finish(self, request, response, seconds, recorder, profile):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, response.status_code, seconds, recorder)
+        duplicates = recorder.duplicates()
+        logger.info(json.dumps({
+            'time': timezone.now().isoformat(),
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(seconds * 1000, 2),
+            'queries': recorder.count,
+            'db_ms': round(recorder.seconds * 1000, 2),
+            'duplicates': [{'sql': sql[:300], 'count': count}
+                           for sql, count in sorted(duplicates.items(), key=lambda item: -item[1])[:5]],
+        }))
+
+        if profile and seconds * 1000 >= self.config['PROFILE_THRESHOLD_MS'] and self.config['PROFILE_DIR']:
+            directory = Path(self.config['PROFILE_DIR'])
+            directory.mkdir(parents=True, exist_ok=True)
+            name = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{view.replace(':', '_')}.folded"
+            write_folded(directory / name, folded_stacks(profile))
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: ``Bearer AMS_METRICS['TOKEN']`` or a staff session."""
+    token = metrics_settings()['TOKEN']
+    if token:
+        allowed = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        allowed = request.user.is_authenticated and request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
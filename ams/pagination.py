@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination on the primary key: every page is ``WHERE pk > cursor LIMIT n``,
+    so page 10,000 costs the same as page 1."""
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
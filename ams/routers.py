@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'replica'
+
+
+class ReadReplicaRouter:
+    """Send reads to the ``replica`` database and writes to ``default``.
+
+    Reads made while ``default`` is inside a transaction stay on ``default``, so a
+    transaction sees its own writes and ``select_for_update`` locks the rows it reads.
+    """
+
+    @staticmethod
+    def hinted(hints):
+        # Objects loaded from some other alias (e.g. a benchmark database) stay there.
+        instance = hints.get('instance')
+        db = instance._state.db if instance is not None else None
+        return db if db not in (None, DEFAULT_DB_ALIAS, READ_ALIAS) else None
+
+    def db_for_read(self, model, **hints):
+        if db := self.hinted(hints):
+            return db
+        if READ_ALIAS not in settings.DATABASES or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return self.hinted(hints) or DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, READ_ALIAS} or None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return False if db == READ_ALIAS else None
@@ -0,0 +1,183 @@
+"""Full-text search over model text columns.
+
+Each backend creates and queries its own index for a model's text fields:
+
+* ``SQLiteFTS5Backend`` keeps an external-content FTS5 table in sync with
+  INSERT/UPDATE/DELETE triggers, so ``bulk_create`` and raw SQL stay indexed.
+* ``PostgresBackend`` adds a GIN index on the ``to_tsvector`` expression that
+  the search query repeats verbatim.
+* ``LikeBackend`` is the fallback: Django's ``icontains``.
+
+The backend is chosen from the connection vendor; ``AMS_SEARCH_BACKENDS`` in
+settings can map a vendor to another dotted class path.
+"""
+import functools
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import AutoField, BigAutoField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from django.utils.text import smart_split, unescape_string_literal
+
+
+def search_terms(text):
+    terms = []
+    for term in smart_split(text):
+        if term[:1] in '"\'' and term[:1] == term[-1:]:
+            term = unescape_string_literal(term)
+        if term.strip():
+            terms.append(term)
+    return terms
+
+
+class LikeBackend:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self, schema_editor, model, fields):
+        pass
+
+    def uninstall(self, schema_editor, model, fields):
+        pass
+
+    def q(self, model, fields, text):
+        q = Q()
+        for term in search_terms(text):
+            q &= functools.reduce(Q.__or__, (Q(**{f'{field}__icontains': term}) for field in fields))
+        return q
+
+
+class SQLiteFTS5Backend(LikeBackend):
+    def available(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+    def table(self, model):
+        return f'{model._meta.db_table}_fts'
+
+    def rowid(self, model):
+        pk = model._meta.pk
+        return pk.column if isinstance(pk, (AutoField, BigAutoField)) else 'rowid'
+
+    def install(self, schema_editor, model, fields):
+        if not self.available():
+            return
+        qn = schema_editor.quote_name
+        table, fts, rowid = qn(model._meta.db_table), qn(self.table(model)), qn(self.rowid(model))
+        columns = [qn(model._meta.get_field(field).column) for field in fields]
+        cols = ', '.join(columns)
+        new = ', '.join(f'new.{c}' for c in columns)
+        old = ', '.join(f'old.{c}' for c in columns)
+        delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old});"
+        insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.{rowid}, {new});"
+        for sql in [
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content={table}, content_rowid={rowid})",
+            f"CREATE TRIGGER {qn(self.table(model) + '_ai')} AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER {qn(self.table(model) + '_ad')} AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER {qn(self.table(model) + '_au')} AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]:
+            schema_editor.execute(sql)
+
+    def uninstall(self, schema_editor, model, fields):
+        qn = schema_editor.quote_name
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {qn(self.table(model) + suffix)}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {qn(self.table(model))}")
+
+    def q(self, model, fields, text):
+        terms = search_terms(text)
+        if not terms or not self.available():
+            return super().q(model, fields, text)
+        qn = self.connection.ops.quote_name
+        # Every term is a quoted prefix query; FTS5 ANDs them like the admin's default search.
+        query = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        match = f"SELECT rowid FROM {qn(self.table(model))} WHERE {qn(self.table(model))} MATCH %s"
+        if self.rowid(model) == 'rowid':
+            match = f"SELECT {qn(model._meta.pk.column)} FROM {qn(model._meta.db_table)} WHERE rowid IN ({match})"
+        return Q(pk__in=RawSQL(match, [query]))
+
+
+class PostgresBackend(LikeBackend):
+    config = 'english'
+
+    def document(self, quote_name, model, fields):
+        columns = " || ' ' || ".join(
+            f"coalesce({quote_name(model._meta.get_field(field).column)}, '')" for field in fields
+        )
+        return f"to_tsvector('{self.config}', {columns})"
+
+    def index_name(self, model):
+        return f'{model._meta.db_table}_fts_idx'
+
+    def install(self, schema_editor, model, fields):
+        qn = schema_editor.quote_name
+        schema_editor.execute(
+            f"CREATE INDEX {qn(self.index_name(model))} ON {qn(model._meta.db_table)} "
+            f"USING GIN ({self.document(qn, model, fields)})"
+        )
+
+    def uninstall(self, schema_editor, model, fields):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(self.index_name(model))}")
+
+    def q(self, model, fields, text):
+        if not search_terms(text):
+            return Q()
+        document = self.document(self.connection.ops.quote_name, model, fields)
+        match = (f"SELECT {self.connection.ops.quote_name(model._meta.pk.column)} "
+                 f"FROM {self.connection.ops.quote_name(model._meta.db_table)} "
+                 f"WHERE {document} @@ plainto_tsquery('{self.config}', %s)")
+        return Q(pk__in=RawSQL(match, [text]))
+
+
+BACKENDS = {
+    'sqlite': 'ams.search.SQLiteFTS5Backend',
+    'postgresql': 'ams.search.PostgresBackend',
+}
+
+
+def get_backend(connection):
+    paths = {**BACKENDS, **getattr(settings, 'AMS_SEARCH_BACKENDS', {})}
+    return import_string(paths.get(connection.vendor, 'ams.search.LikeBackend'))(connection)
+
+
+def search_q(model, fields, text):
+    return get_backend(connections[router.db_for_read(model)]).q(model, fields, text)
+
+
+def search(queryset, fields, text):
+    return queryset.filter(search_q(queryset.model, fields, text))
+
+
+def index_operation(app_label, model_name, fields):
+    """Migration operation that creates (and on reverse drops) the full-text index for a model."""
+    from django.db import migrations
+
+    def install(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        get_backend(schema_editor.connection).install(schema_editor, model, fields)
+
+    def uninstall(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        get_backend(schema_editor.connection).uninstall(schema_editor, model, fields)
+
+    return migrations.RunPython(install, uninstall)
+
+
+class FullTextSearchMixin:
+    """ModelAdmin mixin: ``full_text_fields`` are searched through the index, the other
+    ``search_fields`` the usual way, and a row matching either is returned."""
+    full_text_fields = ()
+
+    def get_search_fields(self, request):
+        return [field for field in super().get_search_fields(request) if field not in self.full_text_fields]
+
+    def get_search_results(self, request, queryset, search_term):
+        matched, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term.strip() or not self.full_text_fields:
+            return matched, may_have_duplicates
+        if not self.get_search_fields(request):
+            matched = queryset.none()
+        return matched | search(queryset, self.full_text_fields, search_term), may_have_duplicates
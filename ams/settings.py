@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from ams.db import configure_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +41,11 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
+    'rest_framework',
+    'django_filters',
+    'drf_yasg',
+
+    'ams',
     'apps.users',
     'apps.accounts',
     'apps.billing',
@@ -80,11 +88,85 @@ WSGI_APPLICATION = 'ams.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Built from DATABASE_URL and friends; see ams/db.py. Without it: db.sqlite3 here.
+DATABASES = configure_databases(os.environ, BASE_DIR)
+
+DATABASE_ROUTERS = ['ams.routers.ReadReplicaRouter']
+
+
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Level 2 of ams.cache; shared by all processes when REDIS_URL is set. Production needs it:
+    # the LocMem fallback keeps invalidations in one process, so ams.cache then caps every
+    # entry at AMS_CACHE['PROCESS_LOCAL_TIMEOUT'] seconds.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ams-shared',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+}
+
+AMS_CACHE = {
+    'ALIAS': 'shared',
+    'TIMEOUT': 300,
+    'LOCAL_MAXSIZE': 1024,
+    'LOCAL_TTL': 30,
+    'PROCESS_LOCAL_TIMEOUT': 5,
+}
+
+
+# Where Report statements are computed from: 'rollups' (the balance ledger and period
+# rollups) or 'journal' (double-entry postings; see apps/accounts/trial_balance.py).
+AMS_STATEMENT_SOURCE = os.environ.get('AMS_STATEMENT_SOURCE', 'rollups')
+
+# Currency that FxRate.Rate is quoted in, and the default reporting currency (see apps/transactions/fx.py).
+AMS_FX_BASE = os.environ.get('AMS_FX_BASE', 'USD')
+
+
+# Request metrics and profiling
+# See ams/metrics.py. Off unless AMS_METRICS=1.
+
+AMS_METRICS = {
+    'ENABLED': os.environ.get('AMS_METRICS') == '1',
+    # Bearer token for /metrics/; without one the endpoint is staff-only.
+    'TOKEN': os.environ.get('AMS_METRICS_TOKEN', ''),
+    'PROFILE_SAMPLE_RATE': float(os.environ.get('AMS_PROFILE_SAMPLE_RATE', 0)),
+    'PROFILE_THRESHOLD_MS': float(os.environ.get('AMS_PROFILE_THRESHOLD_MS', 500)),
+    'PROFILE_DIR': os.environ.get('AMS_PROFILE_DIR', BASE_DIR / 'profiles'),
+    'LOG_FILE': os.environ.get('AMS_METRICS_LOG', BASE_DIR / 'metrics.log'),
+}
+
+if AMS_METRICS['ENABLED']:
+    # First, so the timings cover the other middleware too.
+    MIDDLEWARE.insert(0, 'ams.metrics.MetricsMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'metrics': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': AMS_METRICS['LOG_FILE'],
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+            'delay': True,
+        } if AMS_METRICS['ENABLED'] else {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'ams.metrics': {'handlers': ['metrics'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 
@@ -129,4 +211,32 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-AUTH_USER_MODEL = 'users.AmsUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'users.AmsUser'
+
+# ModelBackend with permission checks answered from cached bitsets; see apps/users/permissions.py.
+AUTHENTICATION_BACKENDS = ['apps.users.permissions.RolePermissionBackend']
+
+
+# REST API
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+        'rest_framework.permissions.DjangoModelPermissions',
+    ],
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
+    'DEFAULT_PAGINATION_CLASS': 'ams.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+}
+
+SIMPLE_JWT = {
+    # AmsUser's primary key is AccountID, not id.
+    'USER_ID_FIELD': 'AccountID',
+}
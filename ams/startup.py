@@ -0,0 +1,144 @@
+"""Worker start-up: warming at boot and profiling the cold start.
+
+``warm`` runs at the end of ``ams.wsgi`` and ``ams.asgi``, once Django is set
+up. It builds the URL resolvers, which imports every view module the URLconf
+names. It also compiles ``WARM_TEMPLATES`` into the cached template loader.
+A new worker then pays for both before it takes traffic rather than on its
+first requests. The API docs view is the exception: drf_yasg's schema
+generation is imported on the first docs request (see ``ams.api.api_docs``).
+
+``profile`` starts fresh interpreters under ``python -X importtime`` and
+reports where a cold start goes: import time per module, each
+``AppConfig.ready()`` and the boot phases. ``cold_start`` times what an
+autoscaled worker waits for: ``import ams.wsgi`` and ``manage.py check``,
+whose ``BUDGETS`` the ``profile_startup`` command enforces, as does the test
+suite when ``AMS_TIMING_TESTS`` is set.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict, namedtuple
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+WARM_TEMPLATES = (
+    'admin/index.html',
+    'admin/change_list.html',
+    'admin/change_form.html',
+    'rest_framework/api.html',
+    'billing/invoice.html',
+)
+
+# Seconds, for the median cold run, interpreter start included.
+BUDGETS = {'wsgi': 1.5, 'check': 2.5}
+COMMANDS = {
+    'wsgi': [sys.executable, '-c', 'import ams.wsgi'],
+    'check': [sys.executable, 'manage.py', 'check'],
+}
+
+Import = namedtuple('Import', ['module', 'self_ms', 'cumulative_ms', 'depth'])
+Profile = namedtuple('Profile', ['imports', 'ready_ms', 'phases_ms'])
+
+
+def warm():
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    get_resolver().reverse_dict  # imports the URLconf and its views and builds the lookup tables
+    for name in WARM_TEMPLATES:
+        get_template(name)
+
+
+def _run(command, **kwargs):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'ams.settings')}
+    return subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True, **kwargs)
+
+
+def cold_start(runs=3):
+    """Median wall time in seconds of each of ``COMMANDS``, each run in a new interpreter."""
+    result = {}
+    for name, command in COMMANDS.items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            _run(command)
+            timings.append(time.perf_counter() - started)
+        result[name] = statistics.median(timings)
+    return result
+
+
+def over_budget(timings, budgets=BUDGETS):
+    return [(name, seconds, budgets[name]) for name, seconds in timings.items()
+            if name in budgets and seconds > budgets[name]]
+
+
+def parse_importtime(lines):
+    """``Import`` rows from the stderr of ``python -X importtime``, in the order they finished."""
+    imports = []
+    for line in lines:
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(Import(name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return imports
+
+
+def by_package(imports):
+    """Total self import time per top-level package, largest first."""
+    totals = defaultdict(float)
+    for row in imports:
+        totals[row.module.partition('.')[0]] += row.self_ms
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+def probe():
+    """Boot like a WSGI worker, timing each phase, and print the timings as JSON. Runs in ``profile``'s child."""
+    started = time.perf_counter()
+    import django
+    from django.apps.config import AppConfig
+
+    ready_ms = {}
+    create = AppConfig.create.__func__
+
+    def timed_create(cls, entry):
+        config = create(cls, entry)
+        ready = config.ready
+
+        def timed_ready():
+            begin = time.perf_counter()
+            ready()
+            ready_ms[config.label] = (time.perf_counter() - begin) * 1000
+        config.ready = timed_ready
+        return config
+
+    AppConfig.create = classmethod(timed_create)
+    phases_ms = {'import django': (time.perf_counter() - started) * 1000}
+
+    def phase(name, func):
+        begin = time.perf_counter()
+        func()
+        phases_ms[name] = (time.perf_counter() - begin) * 1000
+
+    from django.conf import settings
+    phase('settings', lambda: settings.INSTALLED_APPS)
+    phase('django.setup()', django.setup)
+    from django.core.wsgi import get_wsgi_application
+    phase('WSGI handler', get_wsgi_application)
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+    phase('URL resolvers', lambda: get_resolver().reverse_dict)
+    phase('templates', lambda: [get_template(name) for name in WARM_TEMPLATES])
+    phases_ms['total'] = (time.perf_counter() - started) * 1000
+    print(json.dumps({'ready_ms': ready_ms, 'phases_ms': phases_ms}))
+
+
+def profile():
+    """Import, ``ready()`` and phase timings of one cold worker boot."""
+    result = _run([sys.executable, '-X', 'importtime', '-c', 'from ams.startup import probe; probe()'])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return Profile(parse_importtime(result.stderr.splitlines()), timings['ready_ms'], timings['phases_ms'])
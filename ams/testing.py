@@ -0,0 +1,92 @@
+"""Helpers shared by the apps' test suites."""
+import itertools
+import re
+from datetime import date
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+# SQLite prints "SCAN <table>" for a full table scan and "SCAN <table> USING [COVERING] INDEX ..."
+# when it walks an index; Postgres prints "Seq Scan on <table>".
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+_sequence = itertools.count(1)
+
+
+def make_account(**kwargs):
+    kwargs.setdefault('username', f'account-{next(_sequence)}')
+    return get_user_model().objects.create_user(**kwargs)
+
+
+def make_transaction(account=None, when=None, debit=0, credit=0, **kwargs):
+    from apps.transactions.models import Transaction
+
+    if when is not None:
+        kwargs['DateOfTransaction'] = when
+    kwargs.setdefault('BankName', 'Demo Bank')
+    return Transaction.objects.create(AccountID=account or make_account(), Debit=debit, Credit=credit,
+                                      TotalAmount=Decimal(credit) - Decimal(debit), **kwargs)
+
+
+def make_report(account=None, transaction=None, **kwargs):
+    from apps.reports.models import Report
+
+    account = account or make_account()
+    kwargs.setdefault('DateRange', date(2025, 1, 31))
+    return Report.objects.create(AccountID=account, TransactionID=transaction or make_transaction(account), **kwargs)
+
+
+class AdminTestMixin:
+    """Builds admin changelists the way the admin views do, for a superuser."""
+
+    @classmethod
+    def admin_user(cls):
+        user, _ = get_user_model().objects.get_or_create(
+            username='admin-tests', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        return user
+
+    def changelist(self, model, **params):
+        request = RequestFactory().get('/', params)
+        request.user = self.admin_user()
+        return admin.site._registry[model].get_changelist_instance(request)
+
+    def assertChangelistQueriesConstant(self, model, add_rows):
+        """Render the changelist with a few rows, then with many, and require the same query count."""
+        self.client.force_login(self.admin_user())
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+
+        add_rows(2)
+        with CaptureQueriesContext(connection) as baseline:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        add_rows(20)
+        with self.assertNumQueries(len(baseline)):
+            self.client.get(url)
+
+
+class QueryPlanMixin:
+    """``assertUsesIndex`` fails when the database plans a full table scan for a queryset."""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make a sequential scan the cheapest plan; ask what the index allows.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f"No query plan check for {connection.vendor}.")
+        plan = queryset.explain()
+        scans = pattern.findall(plan)
+        self.assertFalse(scans, f"Full table scan of {', '.join(scans)}:\n{queryset.query}\n{plan}")
@@ -15,8 +15,42 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path, re_path
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from ams.api import api_docs, cache_stats
+from ams.metrics import metrics_view
+from apps.balance_sheet.views import BalanceSheetViewSet
+from apps.billing.views import InvoiceViewSet
+from apps.income_statement.views import IncomeStatementViewSet
+from apps.reports.views import ReportViewSet, report_status
+from apps.transactions.views import PaymentViewSet, TransactionViewSet, account_balance, latest_transactions
+from apps.users.views import AmsUserViewSet
+
+router = DefaultRouter()
+router.register('users', AmsUserViewSet)
+router.register('transactions', TransactionViewSet)
+router.register('payments', PaymentViewSet)
+router.register('reports', ReportViewSet)
+router.register('invoices', InvoiceViewSet)
+router.register('balance-sheets', BalanceSheetViewSet)
+router.register('income-statements', IncomeStatementViewSet)
+
+api_patterns = [
+    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('docs/', api_docs, name='api-docs'),
+    # Async (ASGI) polling endpoints.
+    path('accounts/<int:account_id>/balance/', account_balance, name='account-balance'),
+    path('accounts/<int:account_id>/transactions/latest/', latest_transactions, name='account-latest-transactions'),
+    path('reports/<int:report_id>/status/', report_status, name='report-status'),
+    path('cache/stats/', cache_stats, name='cache-stats'),
+    path('', include(router.urls)),
+]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
+    re_path(r'^api/(?P<version>v1)/', include(api_patterns)),
 ]
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from ams.startup import warm
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ams.settings')
 
 application = get_wsgi_application()
+
+# Build the URL resolvers and compile templates now, not on the worker's first requests.
+warm()
@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AccountCategory, LedgerAccount, Posting
+
+@admin.register(AccountCategory)
+class AccountCategoryAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'type', 'created_at']
+    list_filter = ['type']
+    search_fields = ['code', 'name']
+
+@admin.register(LedgerAccount)
+class LedgerAccountAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'category', 'owner', 'is_active', 'created_at']
+    list_filter = ['is_active', 'category__type']
+    search_fields = ['code', 'name']
+    list_select_related = ['category', 'owner']
+    raw_id_fields = ['owner']
+
+@admin.register(Posting)
+class PostingAdmin(admin.ModelAdmin):
+    # Not the transaction: archived ones are no longer in the Transaction table.
+    list_display = ['id', 'date', 'ledger_account', 'account', 'debit', 'credit']
+    list_filter = ['ledger_account']
+    date_hierarchy = 'date'
+    list_select_related = ['ledger_account', 'account']
+    raw_id_fields = ['transaction', 'account']
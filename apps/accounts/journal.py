@@ -0,0 +1,99 @@
+"""Double-entry postings for transactions.
+
+Every transaction posts balanced legs to the chart of accounts:
+
+* its Credit (money in): Dr Cash, Cr Revenue;
+* its Debit (money out): Dr Expenses, Cr Cash.
+
+The three ledger accounts are ``SYSTEM_ACCOUNTS``, created on first use.
+Postings are kept in step by the Transaction signals (apps/accounts/signals.py),
+the statement importer and the bulk fixture loader; archiving a period leaves
+them in place. ``rebuild`` reposts an account from its hot and archived
+transactions and ``verify`` compares the two.
+"""
+import itertools
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from apps.transactions.ledger import local_date, sources
+from .models import AccountCategory, LedgerAccount, Posting
+
+SYSTEM_ACCOUNTS = {
+    'cash': ('1000', 'Cash', AccountCategory.ASSET),
+    'revenue': ('4000', 'Revenue', AccountCategory.INCOME),
+    'expense': ('5000', 'Expenses', AccountCategory.EXPENSE),
+}
+
+
+def system_accounts():
+    """``{'cash': pk, 'revenue': pk, 'expense': pk}``, creating missing accounts and categories."""
+    codes = {code: key for key, (code, _, _) in SYSTEM_ACCOUNTS.items()}
+    found = dict(LedgerAccount.objects.filter(code__in=codes).values_list('code', 'pk'))
+    for code, key in codes.items():
+        if code not in found:
+            _, name, account_type = SYSTEM_ACCOUNTS[key]
+            category, _ = AccountCategory.objects.get_or_create(
+                code=f'SYS-{account_type.upper()}', defaults={'name': account_type.title(), 'type': account_type},
+            )
+            found[code] = LedgerAccount.objects.get_or_create(
+                code=code, defaults={'name': name, 'category': category},
+            )[0].pk
+    return {key: found[code] for code, key in codes.items()}
+
+
+def legs(tx, accounts):
+    """Unsaved postings for a Transaction or ArchivedTransaction row."""
+    common = {'transaction_id': tx.pk, 'account_id': tx.AccountID_id, 'date': local_date(tx.DateOfTransaction)}
+    postings = []
+    if tx.Credit:
+        postings += [Posting(ledger_account_id=accounts['cash'], debit=tx.Credit, **common),
+                     Posting(ledger_account_id=accounts['revenue'], credit=tx.Credit, **common)]
+    if tx.Debit:
+        postings += [Posting(ledger_account_id=accounts['expense'], debit=tx.Debit, **common),
+                     Posting(ledger_account_id=accounts['cash'], credit=tx.Debit, **common)]
+    return postings
+
+
+def unpost(transaction_ids):
+    Posting.objects.filter(transaction_id__in=transaction_ids).delete()
+
+
+def post(transactions):
+    """(Re)post ``transactions``, replacing any postings they already have."""
+    transactions = list(transactions)
+    if not transactions:
+        return
+    accounts = system_accounts()
+    unpost([tx.pk for tx in transactions])
+    Posting.objects.bulk_create([posting for tx in transactions for posting in legs(tx, accounts)], batch_size=5000)
+
+
+def rebuild(account_id, batch_size=2000):
+    Posting.objects.filter(account_id=account_id).delete()
+    accounts = system_accounts()
+    for rows in sources(account_id):
+        iterator = rows.order_by().iterator(chunk_size=batch_size)
+        while batch := list(itertools.islice(iterator, batch_size)):
+            Posting.objects.bulk_create([posting for tx in batch for posting in legs(tx, accounts)])
+
+
+def verify(account_id):
+    problems = []
+    expected = {}
+    for rows in sources(account_id):
+        for pk, debit, credit in rows.values_list('pk', 'Debit', 'Credit'):
+            if debit or credit:
+                expected[pk] = Decimal(debit) + Decimal(credit)
+    stored = {
+        row['transaction_id']: (row['debit'], row['credit'])
+        for row in Posting.objects.filter(account_id=account_id).values('transaction_id')
+                                  .annotate(debit=Sum('debit'), credit=Sum('credit'))
+    }
+    for pk in sorted(set(expected) | set(stored)):
+        debit, credit = stored.get(pk, (0, 0))
+        if debit != credit:
+            problems.append(f"transaction {pk}: postings do not balance (Dr {debit} != Cr {credit})")
+        elif debit != expected.get(pk, 0):
+            problems.append(f"transaction {pk}: posted {debit} != {expected.get(pk, 0)}")
+    return problems
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('transactions', '0007_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to=settings.AUTH_USER_MODEL)),
+                ('ledger_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='accounts.ledgeraccount')),
+                ('transaction', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='postings', to='transactions.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'date'], name='posting_account_date_idx'), models.Index(fields=['ledger_account', 'date'], name='posting_ledger_date_idx')],
+            },
+        ),
+    ]
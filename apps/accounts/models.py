@@ -1,3 +1,65 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from apps.transactions.models import Transaction
+from apps.users.models import AmsUser
+
+
+# Chart of accounts. Field names follow sample_data.json.
+class AccountCategory(models.Model):
+    ASSET = 'asset'
+    LIABILITY = 'liability'
+    EQUITY = 'equity'
+    INCOME = 'income'
+    EXPENSE = 'expense'
+    TYPE_CHOICES = [(ASSET, 'Asset'), (LIABILITY, 'Liability'), (EQUITY, 'Equity'),
+                    (INCOME, 'Income'), (EXPENSE, 'Expense')]
+
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=50, unique=True)
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'account categories'
+
+    def __str__(self):
+        return f"{self.code} {self.name}"
+
+
+class LedgerAccount(models.Model):
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=50, unique=True)
+    category = models.ForeignKey(AccountCategory, on_delete=models.PROTECT, related_name='ledger_accounts')
+    owner = models.ForeignKey(AmsUser, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='ledger_accounts')
+    description = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.code} {self.name}"
+
+
+# One leg of a double-entry journal entry; every Transaction posts legs whose debits equal their credits
+# (see apps/accounts/journal.py). ``account`` and ``date`` are copied from the transaction so trial
+# balances and statements read this table alone. ``transaction`` has no database constraint: archived
+# transactions leave the hot table but stay in the books.
+class Posting(models.Model):
+    transaction = models.ForeignKey(Transaction, on_delete=models.DO_NOTHING, db_constraint=False,
+                                    related_name='postings')
+    ledger_account = models.ForeignKey(LedgerAccount, on_delete=models.PROTECT, related_name='postings')
+    account = models.ForeignKey(AmsUser, on_delete=models.CASCADE, related_name='postings')
+    date = models.DateField()
+    debit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'date'], name='posting_account_date_idx'),
+            models.Index(fields=['ledger_account', 'date'], name='posting_ledger_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ledger_account_id} Dr {self.debit} Cr {self.credit}"
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ams.fixtures import fixture_loaded
+from apps.transactions.models import Transaction
+from . import journal
+
+
+@receiver(post_save, sender=Transaction)
+def post_transaction(sender, instance, **kwargs):
+    journal.post([instance])
+
+
+@receiver(post_delete, sender=Transaction)
+def unpost_transaction(sender, instance, **kwargs):
+    journal.unpost([instance.pk])
+
+
+@receiver(fixture_loaded, sender=Transaction)
+def post_loaded_transactions(sender, pks, using, **kwargs):
+    for start in range(0, len(pks), 5000):
+        journal.post(Transaction.objects.using(using).filter(pk__in=pks[start:start + 5000]))
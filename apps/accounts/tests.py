@@ -1,3 +1,151 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ams.fixtures import load_fixture, read_json_array
+from ams.testing import make_account, make_report, make_transaction
+from apps.reports.statements import generate_statements
+from apps.transactions import archive
+from apps.transactions.models import AccountBalance
+from . import journal, trial_balance
+from .models import AccountCategory, LedgerAccount, Posting
+
+SAMPLE_DATA = Path(settings.BASE_DIR) / 'sample_data.json'
+
+
+class FixtureLoaderTests(TestCase):
+    def write(self, name, text):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / name
+        path.write_text(text)
+        return path
+
+    def test_sample_data_loads_and_reloads(self):
+        for _ in range(2):
+            call_command('bulk_loaddata', str(SAMPLE_DATA), stdout=StringIO())
+
+        self.assertEqual(AccountCategory.objects.count(), 2)
+        ledger = LedgerAccount.objects.select_related('category').get()
+        self.assertEqual((ledger.code, ledger.category.code, ledger.owner), ('LEDGER-001', 'DEMO-ASSET', None))
+        self.assertIsNotNone(ledger.created_at.tzinfo)
+
+    def test_reload_overwrites_without_upsert_support(self):
+        path = self.write('category.json', json.dumps([
+            {'model': 'accounts.accountcategory', 'pk': 7, 'fields': {'name': 'Expenses', 'code': 'EXP', 'type': 'expense'}},
+        ]))
+        load_fixture(path)
+        AccountCategory.objects.filter(pk=7).update(name='Renamed')
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            load_fixture(path)
+        self.assertEqual(AccountCategory.objects.get().name, 'Expenses')
+
+    def test_array_is_read_incrementally(self):
+        records = json.loads(SAMPLE_DATA.read_text())
+        self.assertEqual(list(read_json_array(StringIO(SAMPLE_DATA.read_text()), chunk_size=7)), records)
+        with self.assertRaises(ValueError):
+            list(read_json_array(StringIO(SAMPLE_DATA.read_text()[:-10]), chunk_size=7))
+
+    def test_jsonl_with_natural_key_owner(self):
+        owner = make_account(username='ledger-owner')
+        category = {'model': 'accounts.accountcategory', 'pk': 7,
+                    'fields': {'name': 'Expenses', 'code': 'EXP', 'type': 'expense'}}
+        ledgers = [{'model': 'accounts.ledgeraccount',
+                    'fields': {'name': f'Ledger {i}', 'code': f'L-{i}', 'category': 7, 'owner': ['ledger-owner']}}
+                   for i in range(5)]
+        path = self.write('ledgers.jsonl', '\n'.join(json.dumps(record) for record in [category, *ledgers]))
+
+        # The owner is looked up once for both ledger batches.
+        with self.assertNumQueries(6):  # savepoint, category, owner lookup, two ledger batches, release
+            result = load_fixture(path, batch_size=3)
+        self.assertEqual(result.models, {'accounts.AccountCategory': 1, 'accounts.LedgerAccount': 5})
+        self.assertEqual(LedgerAccount.objects.filter(owner=owner, category_id=7).count(), 5)
+
+    def test_multi_field_natural_keys_are_batched(self):
+        permissions = [['view_ledgeraccount', 'accounts', 'ledgeraccount'],
+                       ['change_ledgeraccount', 'accounts', 'ledgeraccount'],
+                       ['view_accountcategory', 'accounts', 'accountcategory']]
+        groups = [{'model': 'auth.group', 'pk': 10 + i, 'fields': {'name': f'Group {i}', 'permissions': permissions}}
+                  for i in range(3)]
+        path = self.write('groups.json', json.dumps(groups))
+
+        with self.assertNumQueries(5):  # savepoint, permission lookup, groups, group permissions, release
+            load_fixture(path)
+        self.assertEqual(Permission.objects.filter(group__pk=11).count(), 3)
+
+    def test_transactions_update_the_ledger(self):
+        account = make_account()
+        path = self.write('transactions.json', json.dumps([
+            {'model': 'transactions.transaction', 'fields': {
+                'AccountID': account.pk, 'DateOfTransaction': f'2025-03-0{day}T12:00:00Z', 'BankName': 'Demo Bank',
+                'Debit': '0', 'Credit': str(10 * day), 'TotalAmount': str(10 * day)}}
+            for day in range(1, 4)
+        ]))
+        load_fixture(path)
+        self.assertEqual(AccountBalance.objects.get(AccountID=account).Credit, Decimal('60.00'))
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class JournalTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        self.salary = make_transaction(self.account, aware(2024, 3, 5), credit=100)
+        self.rent = make_transaction(self.account, aware(2024, 3, 20), debit=30)
+        make_transaction(self.account, aware(2024, 4, 2), debit=5, credit=20)
+
+    def balances(self, **kwargs):
+        return {row.code: row.debit - row.credit for row in trial_balance.trial_balance(**kwargs)}
+
+    def test_transactions_post_balanced_legs(self):
+        rows = trial_balance.trial_balance()
+        self.assertEqual(sum(row.debit for row in rows), sum(row.credit for row in rows))
+        self.assertEqual(self.balances(), {'1000': Decimal('85.00'), '4000': Decimal('-120.00'),
+                                           '5000': Decimal('35.00')})
+        self.assertEqual(self.balances(end=date(2024, 3, 31))['1000'], Decimal('70.00'))
+
+        self.rent.Debit = 50
+        self.rent.save()
+        self.salary.delete()
+        self.assertEqual(self.balances()['1000'], Decimal('-35.00'))
+        self.assertEqual(journal.verify(self.account.pk), [])
+
+    def test_by_month(self):
+        cash = [(row.period, row.debit, row.credit) for row in trial_balance.trial_balance(by_month=True)
+                if row.code == '1000']
+        self.assertEqual(cash, [(date(2024, 3, 1), Decimal('100.00'), Decimal('30.00')),
+                                (date(2024, 4, 1), Decimal('20.00'), Decimal('5.00'))])
+
+    def test_archive_keeps_postings_and_rebuild_restores_them(self):
+        archive.archive_period(date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual(journal.verify(self.account.pk), [])
+
+        Posting.objects.all().delete()
+        journal.rebuild(self.account.pk)
+        self.assertEqual(self.balances()['1000'], Decimal('85.00'))
+
+    @override_settings(AMS_STATEMENT_SOURCE='journal')
+    def test_statements_from_the_journal(self):
+        report = make_report(self.account, self.rent, DateRange=date(2024, 4, 30))
+        with CaptureQueriesContext(connection) as queries:
+            sheet, statement = generate_statements(report)
+        self.assertEqual(sum('FROM "accounts_posting"' in query['sql'] for query in queries), 1)
+
+        self.assertEqual((sheet.TotalAssets, sheet.TotalLiabilities, sheet.TotalOwnersEquity),
+                         (Decimal('85.00'), Decimal('0.00'), Decimal('85.00')))
+        self.assertEqual((statement.TotalRevenue, statement.TotalExpense, statement.NetIncome),
+                         (Decimal('20.00'), Decimal('5.00'), Decimal('15.00')))
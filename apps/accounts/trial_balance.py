@@ -0,0 +1,123 @@
+"""Trial balance and financial statements computed from the journal.
+
+``aggregate`` sums postings per (ledger account, period) group in the
+database: one scan of the matching postings that returns only the group
+totals, so neither time in Python nor memory depends on the number of
+postings.
+
+``generate_statements`` produces a Report's BalanceSheet and IncomeStatement
+from a single such pass over the account's postings up to ``DateRange``.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from apps.balance_sheet.models import BalanceSheet
+from apps.income_statement.models import IncomeStatement
+from .models import AccountCategory, LedgerAccount, Posting
+
+ZERO = Decimal('0.00')
+
+TrialBalanceRow = namedtuple('TrialBalanceRow', ['code', 'name', 'type', 'period', 'debit', 'credit'])
+
+
+def aggregate(postings, period=None):
+    """``{(ledger_account_id, period): (debit, credit)}`` for a Posting queryset.
+
+    ``period`` is an expression evaluated per posting (``F('date')``, or a
+    ``Case``); without one every ledger account has a single group, period 0.
+    """
+    rows = (postings.order_by()
+            .annotate(period_key=period if period is not None else Value(0, output_field=IntegerField()))
+            .values('ledger_account_id', 'period_key')
+            .annotate(total_debit=Sum('debit'), total_credit=Sum('credit')))
+    return {
+        (row['ledger_account_id'], row['period_key']): (row['total_debit'] or ZERO, row['total_credit'] or ZERO)
+        for row in rows
+    }
+
+
+def ledger_types(ledger_ids):
+    return dict(LedgerAccount.objects.filter(pk__in=ledger_ids).values_list('pk', 'category__type'))
+
+
+def trial_balance(account_id=None, start=None, end=None, by_month=False):
+    """Debit and credit totals per ledger account (and month), sorted by account code.
+
+    Over the whole journal the debit and credit columns sum to the same amount.
+    """
+    postings = Posting.objects.all()
+    if account_id is not None:
+        postings = postings.filter(account_id=account_id)
+    if start is not None:
+        postings = postings.filter(date__gte=start)
+    if end is not None:
+        postings = postings.filter(date__lte=end)
+    if by_month:
+        # Grouped by the plain date column and folded into months here: month extraction
+        # is a Python function call per row on SQLite.
+        totals = defaultdict(lambda: (ZERO, ZERO))
+        for (ledger, day), (debit, credit) in aggregate(postings, F('date')).items():
+            month = totals[ledger, day.replace(day=1)]
+            totals[ledger, day.replace(day=1)] = (month[0] + debit, month[1] + credit)
+    else:
+        totals = aggregate(postings)
+
+    ledgers = {
+        pk: (code, name, account_type) for pk, code, name, account_type in
+        LedgerAccount.objects.filter(pk__in={key[0] for key in totals})
+                             .values_list('pk', 'code', 'name', 'category__type')
+    }
+    rows = [
+        TrialBalanceRow(*ledgers[ledger], period if by_month else None, debit, credit)
+        for (ledger, period), (debit, credit) in totals.items()
+    ]
+    return sorted(rows, key=lambda row: (row.code, row.period or date.min))
+
+
+def statement_totals(account_id, day):
+    """Net debits per category type: closing balances at ``day`` and activity in its month."""
+    in_month = Case(When(date__gte=day.replace(day=1), then=Value(1)), default=Value(0), output_field=IntegerField())
+    totals = aggregate(Posting.objects.filter(account_id=account_id, date__lte=day), in_month)
+    types = ledger_types({ledger for ledger, _ in totals})
+    closing, month = defaultdict(lambda: ZERO), defaultdict(lambda: ZERO)
+    for (ledger, in_period), (debit, credit) in totals.items():
+        closing[types[ledger]] += debit - credit
+        if in_period:
+            month[types[ledger]] += debit - credit
+    return closing, month
+
+
+def generate_statements(report):
+    """BalanceSheet and IncomeStatement for ``report`` from the journal, in one pass over its postings.
+
+    Equity includes retained earnings (all income less all expenses to date),
+    so TotalAssets = TotalLiabilities + TotalOwnersEquity.
+    """
+    closing, month = statement_totals(report.AccountID_id, report.DateRange)
+    # Subtracted from ZERO rather than negated, which would store Decimal('-0.00').
+    retained = ZERO - closing[AccountCategory.INCOME] - closing[AccountCategory.EXPENSE]
+    revenue, expense = ZERO - month[AccountCategory.INCOME], month[AccountCategory.EXPENSE]
+    with transaction.atomic():
+        sheet, _ = BalanceSheet.objects.update_or_create(
+            BSID=f"BS-{report.pk}",
+            defaults={
+                'ReportID': report,
+                'TotalAssets': closing[AccountCategory.ASSET],
+                'TotalLiabilities': ZERO - closing[AccountCategory.LIABILITY],
+                'TotalOwnersEquity': retained - closing[AccountCategory.EQUITY],
+            },
+        )
+        statement, _ = IncomeStatement.objects.update_or_create(
+            ISID=f"IS-{report.pk}",
+            defaults={
+                'ReportID': report,
+                'TotalRevenue': revenue,
+                'TotalExpense': expense,
+                'NetIncome': revenue - expense,
+            },
+        )
+    return sheet, statement
@@ -6,4 +6,5 @@ from .models import BalanceSheet
 @admin.register(BalanceSheet)
 class BalanceSheetAdmin(admin.ModelAdmin):
     list_display = ['BSID', 'ReportID', 'TotalLiabilities', 'TotalAssets', 'TotalOwnersEquity']
-    search_fields = ['BSID']
\ No newline at end of file
+    search_fields = ['BSID']
+    list_select_related = ['ReportID']
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import BalanceSheet
+
+
+class BalanceSheetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BalanceSheet
+        fields = ['BSID', 'ReportID', 'TotalLiabilities', 'TotalAssets', 'TotalOwnersEquity']
@@ -1,3 +1,13 @@
 from django.test import TestCase
 
-# Create your tests here.
+from ams.testing import AdminTestMixin, make_report
+from .models import BalanceSheet
+
+
+class BalanceSheetAdminQueryTests(AdminTestMixin, TestCase):
+    def test_balance_sheet_changelist(self):
+        self.assertChangelistQueriesConstant(BalanceSheet, lambda count: [
+            BalanceSheet.objects.create(BSID=f'BS-{report.pk}', ReportID=report, TotalLiabilities=0,
+                                        TotalAssets=0, TotalOwnersEquity=0)
+            for report in (make_report() for _ in range(count))
+        ])
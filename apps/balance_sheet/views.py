@@ -1,3 +1,10 @@
-from django.shortcuts import render
+from ams.api import AccountScopedReadOnlyModelViewSet
+from .models import BalanceSheet
+from .serializers import BalanceSheetSerializer
 
-# Create your views here.
+
+class BalanceSheetViewSet(AccountScopedReadOnlyModelViewSet):
+    queryset = BalanceSheet.objects.all()
+    serializer_class = BalanceSheetSerializer
+    account_lookup = 'ReportID__AccountID'
+    filterset_fields = ['ReportID']
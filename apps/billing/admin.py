@@ -1,10 +1,32 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from ams.export import ExportActionsMixin
+from ams.search import FullTextSearchMixin
 
 # Register your models here.
+from .batch import iter_archive, update_balance_due
 from .models import Invoice
 
 @admin.register(Invoice)
-class InvoiceAdmin(admin.ModelAdmin):
+class InvoiceAdmin(ExportActionsMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['IVID', 'ReportID', 'BalanceDue', 'POno', 'Quantity', 'UnitPrice']
-    search_fields = ['IVID', 'POno']
-    list_filter = ['BalanceDue']
\ No newline at end of file
+    search_fields = ['IVID__istartswith', 'POno', 'Description']
+    full_text_fields = ['POno', 'Description']
+    list_filter = ['BalanceDue']
+    list_select_related = ['ReportID']
+    actions = [*ExportActionsMixin.actions, 'download_archive', 'recompute_balance_due']
+
+    @admin.action(description="Download selected %(verbose_name_plural)s as a ZIP of HTML documents")
+    def download_archive(self, request, queryset):
+        # Rendered in the request's process: a page of selected invoices does not need a pool.
+        ivids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        response = StreamingHttpResponse(iter_archive(ivids, processes=0), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="invoices-{timezone.now():%Y%m%d-%H%M%S}.zip"'
+        return response
+
+    @admin.action(description="Recompute balance due of selected %(verbose_name_plural)s")
+    def recompute_balance_due(self, request, queryset):
+        self.message_user(request, f"Updated {update_balance_due(queryset)} invoices.")
+
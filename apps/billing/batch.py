@@ -0,0 +1,159 @@
+"""Month-end invoicing for batches of reports.
+
+``generate_invoices`` produces the same invoice as
+``apps.reports.statements.generate_invoice`` for every report of a queryset,
+a batch at a time: one query annotates the batch's reports with their
+period's debit total and transaction count (a correlated subquery over the
+daily rollups of each report's month), one ``bulk_create`` upserts the
+invoices and one ``UPDATE`` sets ``BalanceDue = Quantity * UnitPrice``.
+
+``iter_archive`` renders invoices (HTML, or PDF when WeasyPrint is installed)
+in a process pool, a chunk of invoices per task, and streams them into a
+single ZIP archive as the chunks come back, in order. Only a bounded number
+of chunks is in flight, so memory does not grow with the number of invoices.
+"""
+import io
+import itertools
+import os
+import time
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.template.loader import render_to_string
+
+from apps.reports.jobs import init_process
+from apps.transactions.models import PeriodRollup
+from .models import Invoice
+
+FORMATS = {'html': 'text/html', 'pdf': 'application/pdf'}
+INVOICE_FIELDS = ['ReportID', 'POno', 'Description', 'Quantity', 'UnitPrice', 'BalanceDue']
+
+BatchResult = namedtuple('BatchResult', ['invoices', 'seconds'])
+
+
+def _period_sum(field, output_field):
+    rollups = (PeriodRollup.objects
+               .filter(AccountID=OuterRef('AccountID'), Granularity=PeriodRollup.DAY,
+                       PeriodStart__gte=OuterRef('period_start'), PeriodStart__lte=OuterRef('DateRange'))
+               .order_by().values('AccountID').annotate(total=Sum(field)).values('total'))
+    return Coalesce(Subquery(rollups, output_field=output_field), Value(0), output_field=output_field)
+
+
+def with_period_totals(reports):
+    """Annotate ``reports`` with the debit total and transaction count of their statement period."""
+    return reports.annotate(period_start=TruncMonth('DateRange')).annotate(
+        period_debit=_period_sum('Debit', DecimalField(max_digits=15, decimal_places=2)),
+        period_count=_period_sum('TransactionCount', IntegerField()),
+    )
+
+
+def update_balance_due(invoices):
+    """Set ``BalanceDue = Quantity * UnitPrice`` for an Invoice queryset in one UPDATE."""
+    return invoices.update(BalanceDue=F('Quantity') * F('UnitPrice'))
+
+
+def write_batch(reports):
+    invoices = []
+    for report in reports:
+        invoices.append(Invoice(
+            IVID=f"IV-{report.pk}", ReportID_id=report.pk, POno=f"PO-{report.pk}",
+            Description=f"Debits {report.period_start:%Y-%m-%d} to {report.DateRange:%Y-%m-%d} "
+                        f"({report.period_count} transactions)",
+            Quantity=1, UnitPrice=report.period_debit, BalanceDue=0,
+        ))
+    with transaction.atomic():
+        Invoice.objects.bulk_create(invoices, update_conflicts=True, unique_fields=['IVID'],
+                                    update_fields=INVOICE_FIELDS)
+        update_balance_due(Invoice.objects.filter(IVID__in=[invoice.IVID for invoice in invoices]))
+    return [invoice.IVID for invoice in invoices]
+
+
+def generate_invoices(reports, batch_size=2000, on_batch=None):
+    """Create or refresh the invoice of every report in ``reports``; returns a ``BatchResult``."""
+    started = time.monotonic()
+    report_ids = list(reports.order_by('pk').values_list('pk', flat=True))
+    invoices = []
+    for offset in range(0, len(report_ids), batch_size):
+        batch = with_period_totals(reports.model.objects.filter(pk__in=report_ids[offset:offset + batch_size]))
+        batch_started = time.monotonic()
+        invoices += write_batch(batch.only('pk', 'AccountID', 'DateRange').order_by('pk'))
+        if on_batch:
+            on_batch(len(invoices), time.monotonic() - batch_started)
+    return BatchResult(invoices, time.monotonic() - started)
+
+
+def to_pdf(html):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise ImproperlyConfigured("PDF invoices need WeasyPrint (pip install weasyprint).") from None
+    return HTML(string=html).write_pdf()
+
+
+def render_invoice(invoice, fmt='html'):
+    html = render_to_string('billing/invoice.html', {
+        'invoice': invoice, 'report': invoice.ReportID, 'account': invoice.ReportID.AccountID,
+    })
+    return to_pdf(html) if fmt == 'pdf' else html.encode()
+
+
+def render_chunk(ivids, fmt='html'):
+    """``[(filename, document bytes)]`` for the invoices ``ivids``, in that order. Runs in pool processes."""
+    invoices = Invoice.objects.select_related('ReportID__AccountID').in_bulk(ivids)
+    return [(f"{ivid}.{fmt}", render_invoice(invoices[ivid], fmt)) for ivid in ivids if ivid in invoices]
+
+
+def render_chunks(ivids, fmt='html', processes=None, chunk_size=100):
+    """Yield ``render_chunk`` results in order; ``processes=0`` renders in this process."""
+    processes = os.cpu_count() if processes is None else processes
+    ivids = iter(ivids)
+    chunks = iter(lambda: list(itertools.islice(ivids, chunk_size)), [])
+    if not processes:
+        yield from (render_chunk(chunk, fmt) for chunk in chunks)
+        return
+    connections.close_all()
+    with ProcessPoolExecutor(processes, initializer=init_process) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(render_chunk, chunk, fmt))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _Stream(io.RawIOBase):
+    """Unseekable file that collects what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_archive(ivids, fmt='html', processes=None, chunk_size=100):
+    """Yield the bytes of a ZIP archive of the invoices ``ivids``, rendered in a process pool."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown invoice format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    stream = _Stream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for documents in render_chunks(ivids, fmt, processes, chunk_size):
+            for name, content in documents:
+                archive.writestr(name, content)
+            yield stream.drain()
+    yield stream.drain()
@@ -0,0 +1,65 @@
+import time
+from datetime import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.billing import batch
+from apps.reports.models import Report
+
+
+def month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Expected a month as YYYY-MM, got {value!r}.")
+
+
+class Command(BaseCommand):
+    help = ("Generate (or refresh) the invoices of a batch of reports in bulk and, with --archive, render "
+            "them in a process pool into one ZIP file. Prints throughput in invoices per second.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('reports', nargs='*', type=int, help="ReportIDs (default: every report selected).")
+        parser.add_argument('--month', type=month, help="Only reports whose DateRange falls in this month (YYYY-MM).")
+        parser.add_argument('--status', help="Only reports with this Status.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--archive', help="Write the rendered invoices to this ZIP file.")
+        parser.add_argument('--format', choices=batch.FORMATS, default='html')
+        parser.add_argument('--processes', type=int, default=None,
+                            help="Rendering pool size (default: CPU count); 0 renders in this process.")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Invoices rendered per pool task.")
+
+    def handle(self, *args, reports, month, status, batch_size, archive, format, processes, chunk_size, **options):
+        selected = Report.objects.all()
+        if reports:
+            selected = selected.filter(pk__in=reports)
+        if month:
+            selected = selected.filter(DateRange__year=month.year, DateRange__month=month.month)
+        if status:
+            selected = selected.filter(Status=status)
+
+        def on_batch(done, seconds):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {done} invoices")
+
+        result = batch.generate_invoices(selected, batch_size=batch_size, on_batch=on_batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(result.invoices)} invoices in {result.seconds:.1f}s "
+            f"({len(result.invoices) / max(result.seconds, 1e-9):.0f} invoices/s)"
+        ))
+        if not archive:
+            return
+
+        started = time.monotonic()
+        try:
+            with open(archive, 'wb') as out:
+                for data in batch.iter_archive(result.invoices, format, processes, chunk_size):
+                    out.write(data)
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {len(result.invoices)} {format.upper()} invoices to {archive} in {seconds:.1f}s "
+            f"({len(result.invoices) / max(seconds, 1e-9):.0f} invoices/s)"
+        ))
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from ams.search import index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+    ]
+
+    operations = [
+        index_operation('billing', 'Invoice', ['POno', 'Description']),
+    ]
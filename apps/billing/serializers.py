@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import Invoice
+
+
+class InvoiceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Invoice
+        fields = ['IVID', 'ReportID', 'BalanceDue', 'POno', 'Quantity', 'Description', 'UnitPrice']
@@ -1,3 +1,78 @@
+import io
+import zipfile
+from datetime import date, datetime, timezone
+
 from django.test import TestCase
 
-# Create your tests here.
+from ams.testing import AdminTestMixin, make_account, make_report, make_transaction
+from apps.reports.models import Report
+from apps.reports.statements import generate_invoice
+from .batch import generate_invoices, iter_archive
+from .models import Invoice
+
+
+class InvoiceAdminQueryTests(AdminTestMixin, TestCase):
+    def test_invoice_changelist(self):
+        self.assertChangelistQueriesConstant(Invoice, lambda count: [
+            Invoice.objects.create(IVID=f'IV-{report.pk}', ReportID=report, BalanceDue=10, POno='PO-1',
+                                   Quantity=1, Description='Consulting', UnitPrice=10)
+            for report in (make_report() for _ in range(count))
+        ])
+
+
+class InvoiceSearchTests(AdminTestMixin, TestCase):
+    def test_admin_search_matches_po_number_and_description(self):
+        report = make_report()
+        first = Invoice.objects.create(IVID='IV-1', ReportID=report, BalanceDue=10, POno='PO-7781', Quantity=1,
+                                       Description='Quarterly audit', UnitPrice=10)
+        second = Invoice.objects.create(IVID='IV-2', ReportID=report, BalanceDue=10, POno='PO-1200', Quantity=1,
+                                        Description='Payroll services', UnitPrice=10)
+
+        def search(text):
+            return set(self.changelist(Invoice, q=text).queryset.values_list('pk', flat=True))
+
+        self.assertEqual(search('7781'), {first.pk})
+        self.assertEqual(search('payroll'), {second.pk})
+        self.assertEqual(search('IV-2'), {second.pk})
+        self.assertEqual(search('iv-'), {first.pk, second.pk})
+
+
+class BatchInvoiceTests(TestCase):
+    def make_reports(self, count):
+        reports = []
+        for i in range(count):
+            account = make_account(first_name=f'Client {i}')
+            make_transaction(account, datetime(2025, 2, 27, tzinfo=timezone.utc), debit=5)
+            make_transaction(account, datetime(2025, 3, 2, tzinfo=timezone.utc), debit=10 + i, credit=3)
+            make_transaction(account, datetime(2025, 3, 20, tzinfo=timezone.utc), debit='2.50')
+            reports.append(make_report(account, DateRange=date(2025, 3, 15)))
+        return reports
+
+    def test_matches_single_report_generation(self):
+        reports = self.make_reports(3)
+        result = generate_invoices(Report.objects.filter(pk__in=[report.pk for report in reports]))
+        self.assertEqual(result.invoices, [f'IV-{report.pk}' for report in reports])
+        fields = ['IVID', 'ReportID', 'POno', 'Description', 'Quantity', 'UnitPrice', 'BalanceDue']
+        batched = list(Invoice.objects.order_by('pk').values(*fields))
+        for report in reports:
+            generate_invoice(report)
+        self.assertEqual(list(Invoice.objects.order_by('pk').values(*fields)), batched)
+        self.assertEqual(batched[0]['BalanceDue'], 10)
+        self.assertIn('(1 transactions)', batched[0]['Description'])
+
+    def test_queries_do_not_grow_with_reports(self):
+        self.make_reports(2)
+        with self.assertNumQueries(6):  # report ids, annotated batch, savepoint, upsert, update, release
+            generate_invoices(Report.objects.all())
+        self.make_reports(20)
+        with self.assertNumQueries(6):
+            generate_invoices(Report.objects.all())
+
+    def test_archive_contains_rendered_invoices(self):
+        ivids = generate_invoices(Report.objects.filter(pk__in=[r.pk for r in self.make_reports(3)])).invoices
+        data = b''.join(iter_archive(ivids, processes=0, chunk_size=2))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(archive.namelist(), [f'{ivid}.html' for ivid in ivids])
+            page = archive.read(f'{ivids[1]}.html').decode()
+        self.assertIn('Client 1', page)
+        self.assertIn('Balance due: 11.00', page)
@@ -1,3 +1,11 @@
-from django.shortcuts import render
+from ams.api import AccountScopedModelViewSet
+from .models import Invoice
+from .serializers import InvoiceSerializer
 
-# Create your views here.
+
+class InvoiceViewSet(AccountScopedModelViewSet):
+    queryset = Invoice.objects.all()
+    serializer_class = InvoiceSerializer
+    account_lookup = 'ReportID__AccountID'
+    related_account_lookups = {'ReportID': 'AccountID'}
+    filterset_fields = ['ReportID']
@@ -6,4 +6,5 @@ from .models import IncomeStatement
 @admin.register(IncomeStatement)
 class IncomeStatementAdmin(admin.ModelAdmin):
     list_display = ['ISID', 'ReportID', 'TotalRevenue', 'TotalExpense', 'NetIncome']
-    search_fields = ['ISID']
\ No newline at end of file
+    search_fields = ['ISID']
+    list_select_related = ['ReportID']
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import IncomeStatement
+
+
+class IncomeStatementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IncomeStatement
+        fields = ['ISID', 'ReportID', 'TotalRevenue', 'TotalExpense', 'NetIncome']
@@ -1,3 +1,13 @@
 from django.test import TestCase
 
-# Create your tests here.
+from ams.testing import AdminTestMixin, make_report
+from .models import IncomeStatement
+
+
+class IncomeStatementAdminQueryTests(AdminTestMixin, TestCase):
+    def test_income_statement_changelist(self):
+        self.assertChangelistQueriesConstant(IncomeStatement, lambda count: [
+            IncomeStatement.objects.create(ISID=f'IS-{report.pk}', ReportID=report, TotalRevenue=0,
+                                           TotalExpense=0, NetIncome=0)
+            for report in (make_report() for _ in range(count))
+        ])
@@ -1,3 +1,10 @@
-from django.shortcuts import render
+from ams.api import AccountScopedReadOnlyModelViewSet
+from .models import IncomeStatement
+from .serializers import IncomeStatementSerializer
 
-# Create your views here.
+
+class IncomeStatementViewSet(AccountScopedReadOnlyModelViewSet):
+    queryset = IncomeStatement.objects.all()
+    serializer_class = IncomeStatementSerializer
+    account_lookup = 'ReportID__AccountID'
+    filterset_fields = ['ReportID']
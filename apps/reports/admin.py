@@ -1,12 +1,36 @@
 from django.contrib import admin
 
+from ams.export import ExportActionsMixin
+from apps.billing.batch import generate_invoices
+
 # Register your models here.
-from .models import Report
+from .jobs import enqueue
+from .models import Report, ReportJob
 
 @admin.register(Report)
-class ReportAdmin(admin.ModelAdmin):
+class ReportAdmin(ExportActionsMixin, admin.ModelAdmin):
     list_display = ['ReportID', 'AccountID', 'TransactionID', 'DateRange', 'Status']
     list_filter = ['Status', 'DateRange']
     search_fields = ['ReportID']
     date_hierarchy = 'DateRange'
+    list_select_related = ['AccountID', 'TransactionID']
+    actions = [*ExportActionsMixin.actions, 'queue_generation', 'bulk_invoice']
+
+    @admin.action(description="Queue generation of selected %(verbose_name_plural)s")
+    def queue_generation(self, request, queryset):
+        for report in queryset:
+            enqueue(report)
+        self.message_user(request, f"Queued {len(queryset)} reports; run_report_worker generates them.")
+
+    @admin.action(description="Generate invoices for selected %(verbose_name_plural)s")
+    def bulk_invoice(self, request, queryset):
+        result = generate_invoices(queryset)
+        self.message_user(request, f"Generated {len(result.invoices)} invoices in {result.seconds:.1f}s.")
+
 
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['JobID', 'ReportID', 'Status', 'Worker', 'Attempts', 'CreatedAt', 'FinishedAt']
+    list_filter = ['Status']
+    list_select_related = ['ReportID']
+    readonly_fields = ['StartedAt', 'FinishedAt', 'Error']
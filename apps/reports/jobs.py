@@ -0,0 +1,134 @@
+"""Database-backed queue of report generation jobs.
+
+``enqueue`` adds a ``ReportJob`` and marks the report queued. Workers (the
+``run_report_worker`` command) ``claim`` a batch of the oldest queued jobs and
+run them in a process pool; each job generates the report's balance sheet,
+income statement and invoice in one transaction and moves ``Report.Status``
+through queued -> running -> done/failed.
+
+Claiming selects candidates with ``select_for_update(skip_locked=True)`` so
+concurrent workers on Postgres take disjoint rows without waiting on each
+other; the selection is the subquery of an ``UPDATE ... WHERE Status='queued'``
+that flips them to running. That conditional update is what makes a claim
+exclusive on databases without row locks (SQLite), where ``select_for_update``
+is a no-op. A job that fails on a database error (lock timeout, deadlock) is
+queued again, up to ``MAX_ATTEMPTS`` runs.
+"""
+import os
+import socket
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Report, ReportJob
+from .statements import generate_balance_sheet, generate_income_statement, generate_invoice
+
+GENERATORS = (generate_balance_sheet, generate_income_statement, generate_invoice)
+MAX_ATTEMPTS = 3
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(report):
+    """Queue generation for ``report`` unless it already has a queued or running job."""
+    with transaction.atomic():
+        job = report.jobs.filter(Status__in=[ReportJob.QUEUED, ReportJob.RUNNING]).first()
+        if job is None:
+            job = ReportJob.objects.create(ReportID=report)
+            Report.objects.filter(pk=report.pk).update(Status=ReportJob.QUEUED)
+            report.Status = ReportJob.QUEUED
+    return job
+
+
+def claim(worker, limit):
+    """Mark up to ``limit`` of the oldest queued jobs as running for ``worker``; returns their ids."""
+    claimed_at = timezone.now()
+    candidates = (ReportJob.objects.select_for_update(skip_locked=True)
+                  .filter(Status=ReportJob.QUEUED)
+                  .order_by('CreatedAt', 'JobID')
+                  .values('JobID')[:limit])
+    with transaction.atomic():
+        # One UPDATE, so SQLite takes the write lock up front instead of upgrading a read lock.
+        updated = ReportJob.objects.filter(JobID__in=candidates, Status=ReportJob.QUEUED).update(
+            Status=ReportJob.RUNNING, Worker=worker, StartedAt=claimed_at, Attempts=F('Attempts') + 1,
+        )
+        if not updated:
+            return []
+        claimed = list(ReportJob.objects.filter(Status=ReportJob.RUNNING, Worker=worker, StartedAt=claimed_at)
+                       .order_by('CreatedAt', 'JobID')
+                       .values_list('JobID', 'ReportID'))
+        Report.objects.filter(pk__in=[report_id for _, report_id in claimed]).update(Status=ReportJob.RUNNING)
+    return [job_id for job_id, _ in claimed]
+
+
+def finish(job, status, error=''):
+    with transaction.atomic():
+        ReportJob.objects.filter(pk=job.pk).update(Status=status, Error=error, FinishedAt=timezone.now())
+        Report.objects.filter(pk=job.ReportID_id).update(Status=status)
+
+
+def run_job(job_id):
+    """Generate everything for one claimed job; returns ``(job_id, status)``. Runs in pool processes."""
+    job = ReportJob.objects.select_related('ReportID').get(pk=job_id)
+    try:
+        with transaction.atomic():
+            for generate in GENERATORS:
+                generate(job.ReportID)
+    except OperationalError:
+        # Lock timeouts, deadlocks and serialization failures are worth another try.
+        status = ReportJob.QUEUED if job.Attempts < MAX_ATTEMPTS else ReportJob.FAILED
+        finish(job, status, traceback.format_exc())
+        return job_id, status
+    except Exception:
+        finish(job, ReportJob.FAILED, traceback.format_exc())
+        return job_id, ReportJob.FAILED
+    finish(job, ReportJob.DONE)
+    return job_id, ReportJob.DONE
+
+
+def requeue_stale(older_than):
+    """Put jobs that have been running longer than ``older_than`` (a dead worker's) back in the queue."""
+    cutoff = timezone.now() - older_than
+    with transaction.atomic():
+        stale = list(ReportJob.objects.filter(Status=ReportJob.RUNNING, StartedAt__lt=cutoff)
+                     .values_list('JobID', 'ReportID'))
+        ReportJob.objects.filter(JobID__in=[job_id for job_id, _ in stale], Status=ReportJob.RUNNING).update(
+            Status=ReportJob.QUEUED, Worker='')
+        Report.objects.filter(pk__in=[report_id for _, report_id in stale]).update(Status=ReportJob.QUEUED)
+    return len(stale)
+
+
+def init_process():
+    # Spawned processes start without apps loaded; forked ones must not share the parent's connections.
+    django.setup()
+    connections.close_all()
+
+
+def drain(worker=None, processes=None, batch_size=None, on_result=None):
+    """Run queued jobs until the queue is empty; ``processes=0`` runs them in this process."""
+    worker = worker or default_worker_name()
+    processes = os.cpu_count() if processes is None else processes
+    batch_size = batch_size or max(processes, 1) * 4
+    done = 0
+    pool = None
+    try:
+        while job_ids := claim(worker, batch_size):
+            if processes and pool is None:
+                connections.close_all()
+                pool = ProcessPoolExecutor(processes, initializer=init_process)
+            results = pool.map(run_job, job_ids) if pool else map(run_job, job_ids)
+            for result in results:
+                done += 1
+                if on_result:
+                    on_result(*result)
+    finally:
+        if pool:
+            pool.shutdown()
+    return done
+
@@ -0,0 +1,70 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.reports.models import Report
+from apps.reports.statements import generate_statements
+from apps.transactions import ledger, rollups
+from apps.transactions.models import Transaction
+from apps.users.models import AmsUser
+
+
+class Command(BaseCommand):
+    help = ("Time statement generation while the account's transaction history grows. "
+            "Runs inside a transaction that is rolled back, so no data is kept.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', type=int, default=1000, help="Transactions in the smallest history.")
+        parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100])
+        parser.add_argument('--years', type=int, default=5, help="Years of history the rows are spread over.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(**options)
+            transaction.set_rollback(True)
+
+    def run(self, base, factors, years, repeat, **options):
+        rng = random.Random(0)
+        account = AmsUser.objects.create_user(username=f'benchmark-{time.time_ns()}')
+        end = date(2025, 6, 15)
+        start = timezone.make_aware(datetime(end.year - years, end.month, 1))
+        span = (timezone.make_aware(datetime.combine(end, datetime.min.time())) - start).total_seconds()
+        created = 0
+
+        self.stdout.write(f"{'rows':>10} {'rollup ms':>10} {'scan ms':>10}")
+        for factor in sorted(factors):
+            target = base * factor
+            Transaction.objects.bulk_create(
+                (Transaction(AccountID=account, BankName='Benchmark Bank',
+                             DateOfTransaction=start + timedelta(seconds=rng.random() * span),
+                             Debit=Decimal(rng.randint(0, 500)), Credit=Decimal(rng.randint(0, 500)),
+                             TotalAmount=Decimal(0))
+                 for _ in range(target - created)),
+                batch_size=5000,
+            )
+            created = target
+            # bulk_create skips the signals that maintain the ledger and rollups.
+            ledger.rebuild(account.pk)
+            rollups.rebuild(account.pk)
+
+            report = Report.objects.create(AccountID=account, TransactionID=Transaction.objects.filter(
+                AccountID=account).first(), DateRange=end)
+            rollup_ms = self.time(repeat, lambda: generate_statements(report))
+            scan_ms = self.time(repeat, lambda: Transaction.objects.filter(
+                AccountID=account, DateOfTransaction__date__lte=end).aggregate(Sum('Debit'), Sum('Credit')))
+            self.stdout.write(f"{target:>10} {rollup_ms:>10.2f} {scan_ms:>10.2f}")
+
+    @staticmethod
+    def time(repeat, func):
+        func()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeat
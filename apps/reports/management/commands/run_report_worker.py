@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.reports.jobs import default_worker_name, drain, requeue_stale
+
+
+class Command(BaseCommand):
+    help = ("Generate queued reports (balance sheet, income statement, invoice) in a process pool. "
+            "Several workers can drain the queue at once.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help="Pool size (default: CPU count); 0 runs jobs in this process.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Jobs claimed at a time.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep on an empty queue.")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Requeue jobs left running this many seconds by a dead worker.")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty.")
+        parser.add_argument('--worker', default=None, help="Name recorded on claimed jobs.")
+
+    def handle(self, *args, processes, batch_size, poll_interval, stale_after, once, worker, **options):
+        worker = worker or default_worker_name()
+        verbose = options['verbosity'] > 1
+
+        def report(job_id, status):
+            if verbose or status != 'done':
+                self.stdout.write(f"job {job_id}: {status}")
+
+        while True:
+            requeued = requeue_stale(timedelta(seconds=stale_after))
+            if requeued:
+                self.stdout.write(f"requeued {requeued} stale jobs")
+            done = drain(worker, processes=processes, batch_size=batch_size, on_result=report)
+            if done:
+                self.stdout.write(f"{worker}: ran {done} jobs")
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('transactions', '0004_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['Status', 'DateRange'], name='report_status_daterange_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['DateRange'], name='report_daterange_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('JobID', models.AutoField(primary_key=True, serialize=False)),
+                ('Status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('Worker', models.CharField(blank=True, max_length=100)),
+                ('Attempts', models.PositiveIntegerField(default=0)),
+                ('Error', models.TextField(blank=True)),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True)),
+                ('StartedAt', models.DateTimeField(blank=True, null=True)),
+                ('FinishedAt', models.DateTimeField(blank=True, null=True)),
+                ('ReportID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='reports.report')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['Status', 'CreatedAt'], name='reportjob_status_created_idx')],
+            },
+        ),
+    ]
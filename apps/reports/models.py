@@ -9,7 +9,41 @@ class Report(models.Model):
     DateRange = models.DateField()
     Status = models.CharField(max_length=50, default='draft')
 
+    class Meta:
+        indexes = [
+            # Admin Status filter with the DateRange drilldown; also lists the distinct statuses.
+            models.Index(fields=['Status', 'DateRange'], name='report_status_daterange_idx'),
+            models.Index(fields=['DateRange'], name='report_daterange_idx'),
+        ]
+
     def __str__(self):
         return f"Report {self.ReportID}"
 
 
+
+class ReportJob(models.Model):
+    # A queued request to generate a report's balance sheet, income statement and invoice.
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    JobID = models.AutoField(primary_key=True)
+    ReportID = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='jobs')
+    Status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    Worker = models.CharField(max_length=100, blank=True)
+    Attempts = models.PositiveIntegerField(default=0)
+    Error = models.TextField(blank=True)
+    CreatedAt = models.DateTimeField(auto_now_add=True)
+    StartedAt = models.DateTimeField(null=True, blank=True)
+    FinishedAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued jobs; also finds stale running ones.
+            models.Index(fields=['Status', 'CreatedAt'], name='reportjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.JobID} ({self.Status})"
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+from .models import Report
+
+
+class ReportSerializer(serializers.ModelSerializer):
+    AccountName = serializers.CharField(source='AccountID.username', read_only=True)
+
+    class Meta:
+        model = Report
+        fields = ['ReportID', 'AccountID', 'AccountName', 'TransactionID', 'DateRange', 'Status']
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ams.cache import account_cache
+from .models import Report
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def invalidate_report_account(sender, instance, **kwargs):
+    account_cache.invalidate_on_commit(instance.AccountID_id)
@@ -0,0 +1,77 @@
+"""Balance sheet, income statement and invoice generation for a Report.
+
+A report's statements cover the month of ``Report.DateRange`` up to and
+including that date. Both are derived from pre-aggregated data only: the
+balance sheet from ``ledger.balance_as_of`` (the previous month's checkpoint
+plus this month's daily rollups), the income statement and invoice from the
+rollups of the period.
+
+With ``AMS_STATEMENT_SOURCE = 'journal'`` the balance sheet and income
+statement come from the double-entry postings instead
+(``apps.accounts.trial_balance``).
+"""
+from django.conf import settings
+from django.db import transaction
+
+from apps.accounts import trial_balance
+from apps.balance_sheet.models import BalanceSheet
+from apps.billing.models import Invoice
+from apps.income_statement.models import IncomeStatement
+from apps.transactions.ledger import balance_as_of
+from apps.transactions.rollups import period_totals
+
+
+def statement_period(report):
+    return report.DateRange.replace(day=1), report.DateRange
+
+
+def generate_balance_sheet(report):
+    totals = balance_as_of(report.AccountID_id, report.DateRange)
+    sheet, _ = BalanceSheet.objects.update_or_create(
+        BSID=f"BS-{report.pk}",
+        defaults={
+            'ReportID': report,
+            'TotalAssets': totals.Credit,
+            'TotalLiabilities': totals.Debit,
+            'TotalOwnersEquity': totals.Balance,
+        },
+    )
+    return sheet
+
+
+def generate_income_statement(report):
+    totals = period_totals(report.AccountID_id, *statement_period(report))
+    statement, _ = IncomeStatement.objects.update_or_create(
+        ISID=f"IS-{report.pk}",
+        defaults={
+            'ReportID': report,
+            'TotalRevenue': totals.Credit,
+            'TotalExpense': totals.Debit,
+            'NetIncome': totals.Balance,
+        },
+    )
+    return statement
+
+
+def generate_invoice(report):
+    start, end = statement_period(report)
+    totals = period_totals(report.AccountID_id, start, end)
+    invoice, _ = Invoice.objects.update_or_create(
+        IVID=f"IV-{report.pk}",
+        defaults={
+            'ReportID': report,
+            'POno': f"PO-{report.pk}",
+            'Description': f"Debits {start:%Y-%m-%d} to {end:%Y-%m-%d} ({totals.TransactionCount} transactions)",
+            'Quantity': 1,
+            'UnitPrice': totals.Debit,
+            'BalanceDue': totals.Debit,
+        },
+    )
+    return invoice
+
+
+def generate_statements(report):
+    if getattr(settings, 'AMS_STATEMENT_SOURCE', 'rollups') == 'journal':
+        return trial_balance.generate_statements(report)
+    with transaction.atomic():
+        return generate_balance_sheet(report), generate_income_statement(report)
@@ -1,3 +1,116 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ams.testing import AdminTestMixin, QueryPlanMixin, make_account, make_report, make_transaction
+from apps.billing.models import Invoice
+from .jobs import claim, enqueue, run_job
+from .models import Report
+from .statements import generate_statements
+
+
+class StatementGenerationTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        for day, debit, credit in [(date(2025, 1, 5), 0, 500), (date(2025, 2, 3), 120, 0),
+                                   (date(2025, 2, 14), 0, 80), (date(2025, 3, 1), 999, 0)]:
+            self.last = make_transaction(self.account, timezone.make_aware(datetime(day.year, day.month, day.day)),
+                                         debit=debit, credit=credit)
+
+    def test_statements_match_transactions(self):
+        report = Report.objects.create(AccountID=self.account, TransactionID=self.last, DateRange=date(2025, 2, 28))
+        sheet, income = generate_statements(report)
+
+        self.assertEqual(sheet.TotalAssets, Decimal('580.00'))
+        self.assertEqual(sheet.TotalLiabilities, Decimal('120.00'))
+        self.assertEqual(sheet.TotalOwnersEquity, Decimal('460.00'))
+        self.assertEqual(income.TotalRevenue, Decimal('80.00'))
+        self.assertEqual(income.TotalExpense, Decimal('120.00'))
+        self.assertEqual(income.NetIncome, Decimal('-40.00'))
+
+
+class ReportQueryPlanTests(QueryPlanMixin, AdminTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        account = make_account()
+        tx = make_transaction(account)
+        for month in range(1, 13):
+            make_report(account, tx, DateRange=date(2025, month, 1))
+
+    def test_changelist_filters_use_indexes(self):
+        for params in [
+            {'Status__exact': 'draft'},
+            {'DateRange__year': '2025'},
+            {'DateRange__year': '2025', 'DateRange__month': '3'},
+            {'Status__exact': 'draft', 'DateRange__year': '2025', 'DateRange__month': '3'},
+        ]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.changelist(Report, **params).queryset)
+
+    def test_filter_sidebar_and_date_hierarchy_use_indexes(self):
+        self.assertUsesIndex(Report.objects.distinct().order_by('Status').values_list('Status'))
+        self.assertUsesIndex(Report.objects.dates('DateRange', 'year'))
+
+
+class ReportAdminQueryTests(AdminTestMixin, TestCase):
+    def test_report_changelist(self):
+        self.assertChangelistQueriesConstant(Report, lambda count: [make_report() for _ in range(count)])
+
+
+class ReportStatusViewTests(TestCase):
+    async def test_report_status_for_owner_only(self):
+        report = await sync_to_async(make_report)(Status='queued')
+        url = reverse('report-status', kwargs={'version': 'v1', 'report_id': report.pk})
+
+        await self.async_client.aforce_login(report.AccountID)
+        self.assertEqual((await self.async_client.get(url)).json()['Status'], 'queued')
+        await self.async_client.aforce_login(await sync_to_async(make_account)())
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.account = make_account(is_staff=True, is_superuser=True)
+        tx = make_transaction(self.account, timezone.make_aware(datetime(2025, 1, 10)), debit=30, credit=100)
+        self.report = make_report(self.account, tx)
+
+    def test_generate_then_worker_completes_report(self):
+        self.client.force_login(self.account)
+        url = reverse('report-generate', kwargs={'version': 'v1', 'pk': self.report.pk})
+        self.assertEqual(self.client.post(url).status_code, 202)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.Status, 'queued')
+
+        call_command('run_report_worker', '--once', '--processes', '0', stdout=StringIO())
+
+        self.report.refresh_from_db()
+        job = self.report.jobs.get()
+        self.assertEqual((self.report.Status, job.Status, job.Attempts), ('done', 'done', 1))
+        self.assertEqual(self.report.balance_sheets.get().TotalOwnersEquity, Decimal('70.00'))
+        self.assertEqual(self.report.income_statements.get().NetIncome, Decimal('70.00'))
+        invoice = Invoice.objects.get(IVID=f"IV-{self.report.pk}")
+        self.assertEqual(invoice.BalanceDue, Decimal('30.00'))
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        first = enqueue(self.report)
+        self.assertEqual(enqueue(self.report), first)
+        second = enqueue(make_report(self.account))
+        self.assertEqual(claim('a', 10), [first.pk, second.pk])
+        self.assertEqual(claim('b', 10), [])
 
-# Create your tests here.
+    def test_failing_job_marks_report_failed(self):
+        job = enqueue(self.report)
+        claim('a', 1)
+        with mock.patch('apps.reports.jobs.GENERATORS', [mock.Mock(side_effect=ValueError('boom'))]):
+            self.assertEqual(run_job(job.pk), (job.pk, 'failed'))
+        job.refresh_from_db()
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.Status, 'failed')
+        self.assertIn('boom', job.Error)
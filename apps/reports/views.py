@@ -1,3 +1,38 @@
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-# Create your views here.
+from ams.api import AccountScopedModelViewSet, async_account_view
+from .jobs import enqueue
+from .models import Report
+from .serializers import ReportSerializer
+
+
+class ReportViewSet(AccountScopedModelViewSet):
+    queryset = Report.objects.select_related('AccountID')
+    serializer_class = ReportSerializer
+    related_account_lookups = {'AccountID': 'pk', 'TransactionID': 'AccountID'}
+    # Served by the (Status, DateRange), (DateRange) and AccountID indexes.
+    filterset_fields = {
+        'AccountID': ['exact'],
+        'Status': ['exact'],
+        'DateRange': ['exact', 'gte', 'lte'],
+    }
+
+    @action(detail=True, methods=['post'])
+    def generate(self, request, pk=None, version=None):
+        job = enqueue(self.get_object())
+        return Response({'JobID': job.pk, 'Status': job.Status}, status=status.HTTP_202_ACCEPTED)
+
+
+@require_GET
+@async_account_view
+async def report_status(request, user, version, report_id):
+    reports = Report.objects.all() if user.is_staff else Report.objects.filter(AccountID_id=user.pk)
+    try:
+        report = await reports.values('ReportID', 'AccountID', 'DateRange', 'Status').aget(pk=report_id)
+    except Report.DoesNotExist:
+        return JsonResponse({'detail': "Not found."}, status=404)
+    return JsonResponse(report)
@@ -1,25 +1,40 @@
 from django.contrib import admin
-from .models import Transaction, Payment, CreditCard, Cash
+
+from ams.export import ExportActionsMixin
+from ams.search import FullTextSearchMixin
+from .models import Transaction, Payment, CreditCard, Cash, FxRate
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ExportActionsMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['TransactionID', 'AccountID', 'DateOfTransaction', 'BankName', 'Debit', 'Credit', 'TotalAmount']
     list_filter = ['DateOfTransaction', 'BankName']
-    search_fields = ['TransactionID', 'Description']
+    search_fields = ['TransactionID__exact', 'Description']
+    full_text_fields = ['Description']
     date_hierarchy = 'DateOfTransaction'
+    list_select_related = ['AccountID']
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
-    list_display = ['PaymentID', 'TransactionID', 'Currency', 'Amount']
-    list_filter = ['Currency']
+class PaymentAdmin(ExportActionsMixin, admin.ModelAdmin):
+    list_display = ['PaymentID', 'TransactionID', 'Currency', 'Amount', 'Method']
+    list_filter = ['Method', 'Currency']
     search_fields = ['PaymentID']
+    list_select_related = ['TransactionID']
 
 @admin.register(CreditCard)
 class CreditCardAdmin(admin.ModelAdmin):
     list_display = ['CreditCardNo', 'PaymentID', 'BankCredit', 'NameCredit']
     search_fields = ['CreditCardNo', 'NameCredit']
+    list_select_related = ['PaymentID']
 
 @admin.register(Cash)
 class CashAdmin(admin.ModelAdmin):
     list_display = ['CashTransactionNo', 'PaymentID', 'NameCash', 'CashTendered']
     search_fields = ['CashTransactionNo', 'NameCash']
+    list_select_related = ['PaymentID']
+
+@admin.register(FxRate)
+class FxRateAdmin(ExportActionsMixin, admin.ModelAdmin):
+    list_display = ['Currency', 'RateDate', 'Rate']
+    list_filter = ['Currency']
+    date_hierarchy = 'RateDate'
+    ordering = ['Currency', '-RateDate']
@@ -0,0 +1,178 @@
+"""Archival of closed periods out of the hot Transaction table.
+
+``archive_period`` moves the transactions dated in a closed date range (it
+must end before the current month) into ``ArchivedTransaction``, with their
+payments, credit card and cash rows kept as a JSON snapshot, and records an
+``ArchivedPeriod``. ``restore_period`` moves them back with the same ids.
+
+Rows are moved without the model signals: the balance ledger and period
+rollups still count archived transactions, so balances, ``Report`` statements
+and invoices keep being generated from them unchanged, and ``rebuild`` /
+``verify`` read both tables (``ledger.sources``). Transactions a ``Report``
+points at stay in the hot table.
+
+Everything else (admin, API, search, exports) only reads the hot table.
+``history`` is the one query over both: it reads the archive only when the
+requested range reaches into an archived period.
+
+These are plain archive tables rather than Postgres range partitions, so the
+same code runs on SQLite and Django keeps managing the schema.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .ledger import start_of_day
+from .models import ArchivedPeriod, ArchivedTransaction, Cash, CreditCard, Payment, Transaction
+from .payments import refresh_methods
+
+HISTORY_FIELDS = ('TransactionID', 'AccountID', 'DateOfTransaction', 'Description', 'BankName',
+                  'Debit', 'Credit', 'TotalAmount')
+ArchiveResult = namedtuple('ArchiveResult', ['moved', 'kept'])
+
+
+def first_open_day():
+    return timezone.localdate().replace(day=1)
+
+
+def date_range(start, end):
+    return {'DateOfTransaction__gte': start_of_day(start), 'DateOfTransaction__lt': start_of_day(end + timedelta(days=1))}
+
+
+def payment_snapshot(payment):
+    return {
+        'PaymentID': payment.PaymentID,
+        'Currency': payment.Currency,
+        'Amount': payment.Amount,
+        'credit_card': [{'CreditCardNo': card.CreditCardNo, 'BankCredit': card.BankCredit,
+                         'NameCredit': card.NameCredit} for card in payment.credit_card.all()],
+        'cash': [{'CashTransactionNo': cash.CashTransactionNo, 'NameCash': cash.NameCash,
+                  'CashTendered': cash.CashTendered} for cash in payment.cash.all()],
+    }
+
+
+def _delete(model, field, values):
+    """``DELETE FROM`` the model's table where ``field`` is in ``values``, in SQL.
+
+    Unlike ``QuerySet.delete()`` this sends no delete signals, which would take
+    the rows out of the ledger and rollups.
+    """
+    if not values:
+        return
+    quote = connection.ops.quote_name
+    column = model._meta.get_field(field).column
+    size = connection.features.max_query_params or len(values)
+    with connection.cursor() as cursor:
+        for offset in range(0, len(values), size):
+            chunk = values[offset:offset + size]
+            cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN "
+                           f"({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def _move_out(batch):
+    ids = [tx.pk for tx in batch]
+    payment_ids = [payment.pk for tx in batch for payment in tx.payments.all()]
+    ArchivedTransaction.objects.bulk_create(
+        ArchivedTransaction(
+            TransactionID=tx.pk, AccountID_id=tx.AccountID_id, DateOfTransaction=tx.DateOfTransaction,
+            Description=tx.Description, BankName=tx.BankName, Debit=tx.Debit, Credit=tx.Credit,
+            TotalAmount=tx.TotalAmount, Payments=[payment_snapshot(p) for p in tx.payments.all()],
+        )
+        for tx in batch
+    )
+    _delete(CreditCard, 'PaymentID', payment_ids)
+    _delete(Cash, 'PaymentID', payment_ids)
+    _delete(Payment, 'TransactionID', ids)
+    _delete(Transaction, 'TransactionID', ids)
+
+
+def _move_back(batch):
+    # bulk_create skips the save signals, so the ledger and rollups are not counted twice.
+    Transaction.objects.bulk_create(
+        Transaction(
+            TransactionID=row.pk, AccountID_id=row.AccountID_id, DateOfTransaction=row.DateOfTransaction,
+            Description=row.Description, BankName=row.BankName, Debit=row.Debit, Credit=row.Credit,
+            TotalAmount=row.TotalAmount,
+        )
+        for row in batch
+    )
+    payments = [(row.pk, p) for row in batch for p in row.Payments]
+    Payment.objects.bulk_create(
+        Payment(PaymentID=p['PaymentID'], TransactionID_id=tx_id, Currency=p['Currency'], Amount=Decimal(p['Amount']))
+        for tx_id, p in payments
+    )
+    CreditCard.objects.bulk_create(
+        CreditCard(PaymentID_id=p['PaymentID'], **card) for _, p in payments for card in p['credit_card']
+    )
+    Cash.objects.bulk_create(
+        Cash(PaymentID_id=p['PaymentID'], **{**cash, 'CashTendered': Decimal(cash['CashTendered'])})
+        for _, p in payments for cash in p['cash']
+    )
+    refresh_methods(p['PaymentID'] for _, p in payments)
+    ArchivedTransaction.objects.filter(pk__in=[row.pk for row in batch]).delete()
+
+
+def archive_period(start, end, batch_size=1000):
+    """Move the transactions dated ``start`` to ``end`` (inclusive) into the archive."""
+    if start > end:
+        raise ValueError(f"Period start {start} is after its end {end}.")
+    if end >= first_open_day():
+        raise ValueError(f"Only closed periods can be archived; {end} is not before {first_open_day()}.")
+
+    rows = Transaction.objects.filter(**date_range(start, end)).order_by('pk')
+    movable = rows.filter(reports__isnull=True).prefetch_related('payments__credit_card', 'payments__cash')
+    moved, last_pk = 0, 0
+    while batch := list(movable.filter(pk__gt=last_pk)[:batch_size]):
+        with transaction.atomic():
+            _move_out(batch)
+        moved += len(batch)
+        last_pk = batch[-1].pk
+
+    ArchivedPeriod.objects.create(PeriodStart=start, PeriodEnd=end, RowsArchived=moved)
+    return ArchiveResult(moved, rows.count())
+
+
+def restore_period(start, end, batch_size=1000):
+    """Move archived transactions dated ``start`` to ``end`` (inclusive) back into the hot table."""
+    rows = ArchivedTransaction.objects.filter(**date_range(start, end)).order_by('pk')
+    restored = 0
+    while batch := list(rows[:batch_size]):
+        with transaction.atomic():
+            _move_back(batch)
+        restored += len(batch)
+
+    with transaction.atomic():
+        for period in ArchivedPeriod.objects.filter(PeriodStart__lte=end, PeriodEnd__gte=start):
+            # Keep whatever part of an overlapping archived period lies outside the restored range.
+            if period.PeriodStart < start:
+                ArchivedPeriod.objects.create(PeriodStart=period.PeriodStart, PeriodEnd=start - timedelta(days=1))
+            if period.PeriodEnd > end:
+                ArchivedPeriod.objects.create(PeriodStart=end + timedelta(days=1), PeriodEnd=period.PeriodEnd)
+            period.delete()
+    return restored
+
+
+def history(account_id=None, start=None, end=None, fields=HISTORY_FIELDS):
+    """``values()`` rows of hot and archived transactions, ordered by date.
+
+    The archive is only queried when ``start`` is missing or falls on or before
+    the end of an archived period.
+    """
+    filters = {}
+    if account_id is not None:
+        filters['AccountID_id'] = account_id
+    if start is not None:
+        filters['DateOfTransaction__gte'] = start_of_day(start)
+    if end is not None:
+        filters['DateOfTransaction__lt'] = start_of_day(end + timedelta(days=1))
+
+    rows = Transaction.objects.filter(**filters).values(*fields)
+    archived = ArchivedPeriod.objects.all() if start is None else ArchivedPeriod.objects.filter(PeriodEnd__gte=start)
+    if end is not None:
+        archived = archived.filter(PeriodStart__lte=end)
+    if archived.exists():
+        rows = rows.union(ArchivedTransaction.objects.filter(**filters).values(*fields), all=True)
+    return rows.order_by('DateOfTransaction', 'TransactionID')
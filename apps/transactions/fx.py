@@ -0,0 +1,198 @@
+"""Currency conversion of payments with dated FX rates.
+
+An ``FxRate`` gives the value of one unit of a currency in the base currency
+(``settings.AMS_FX_BASE``) from its ``RateDate`` until the currency's next
+rate, so a payment converts at the latest rate dated on or before its
+transaction's date (rates are not published on weekends and holidays). The
+base currency has no rows; its rate is 1.
+
+``totals`` converts a Payment queryset into a reporting currency. The
+database does the per-payment work: a correlated subquery on the
+(Currency, RateDate) index finds each payment's rate date and the amounts
+are summed per (currency, rate date) group, so the result has at most one
+row per currency and rate date however many payments there are. The groups
+are then converted with exact Decimal arithmetic from ``rate_table()``, an
+in-process copy of the whole rate table that is reloaded only when rates
+change (``invalidate`` moves a version kept in the shared cache).
+
+``load_rates`` reads rates from CSV files, either one rate per row
+(``Currency,Date,Rate``) or one date per row with a column per currency, as
+reference-rate publishers such as the ECB distribute them.
+"""
+import bisect
+import csv
+import itertools
+import time
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+
+from ams.cache import cache_settings
+from ams.fixtures import open_fixture
+from .models import FxRate
+
+ONE = Decimal(1)
+CENT = Decimal('0.01')
+RATE_PLACES = Decimal('1e-10')
+VERSION_KEY = 'ams:fx-rates:version'
+
+
+class MissingRate(LookupError):
+    pass
+
+
+def base_currency():
+    return getattr(settings, 'AMS_FX_BASE', 'USD')
+
+
+class RateTable:
+    """All FX rates in memory, by currency and date."""
+
+    def __init__(self, rows, base):
+        self.base = base
+        self.dates, self.rates = defaultdict(list), defaultdict(list)
+        for currency, day, rate in rows:
+            self.dates[currency].append(day)
+            self.rates[currency].append(rate)
+
+    def rate(self, currency, day):
+        """Value of one unit of ``currency`` in the base currency on ``day``."""
+        if currency == self.base:
+            return ONE
+        index = bisect.bisect_right(self.dates.get(currency, ()), day) - 1
+        if index < 0:
+            raise MissingRate(f"No {currency} rate on or before {day}.")
+        return self.rates[currency][index]
+
+    def convert(self, amount, currency, day, target=None):
+        target = target or self.base
+        if currency == target:
+            return amount
+        return amount * self.rate(currency, day) / self.rate(target, day)
+
+
+_table = None
+
+
+def _shared():
+    return caches[cache_settings()['ALIAS']]
+
+
+def rate_table():
+    """The process's ``RateTable``, reloaded when another process (or this one) has changed the rates."""
+    global _table
+    version = _shared().get_or_set(VERSION_KEY, time.time_ns)
+    if _table is None or _table[0] != version:
+        # From the primary: the table is kept until the rates change again.
+        rows = FxRate.objects.using(DEFAULT_DB_ALIAS).order_by('Currency', 'RateDate').values_list('Currency', 'RateDate', 'Rate')
+        _table = (version, RateTable(rows.iterator(chunk_size=10_000), base_currency()))
+    return _table[1]
+
+
+def invalidate():
+    _shared().set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_on_commit():
+    transaction.on_commit(invalidate)
+
+
+def rate_date(currency='Currency', at='TransactionID__DateOfTransaction'):
+    """Date of the rate that applies to each row: the latest RateDate of its currency on or before ``at``."""
+    # Compared with the datetime column directly: a date sorts before every time on that day.
+    return Subquery(FxRate.objects.filter(Currency=OuterRef(currency), RateDate__lte=OuterRef(at))
+                    .order_by('-RateDate').values('RateDate')[:1])
+
+
+def totals(payments, target=None, group_by=()):
+    """Sum of ``payments``' Amount in ``target`` (default: the base currency), rounded to cents.
+
+    With ``group_by`` (Payment field paths), returns ``{key tuple: total}``
+    instead. Raises ``MissingRate`` for a payment whose currency has no rate
+    on or before its date.
+    """
+    target = target or base_currency()
+    table = rate_table()
+    table.rate(target, date.max)  # fails early for an unknown reporting currency
+    # Base-currency payments need the target's rate on their date instead of their own.
+    rate_currency = Case(When(Currency=table.base, then=Value(target)), default=F('Currency'))
+    rows = (payments.order_by().annotate(fx_currency=rate_currency, fx_date=rate_date('fx_currency'))
+            .values(*group_by, 'Currency', 'fx_date').annotate(amount=Sum('Amount')))
+    result = defaultdict(lambda: Decimal('0'))
+    missing = set()
+    for row in rows:
+        currency, day = row['Currency'], row['fx_date']
+        if currency == target:
+            converted = row['amount']
+        elif day is None:
+            missing.add(target if currency == table.base else currency)
+            continue
+        else:
+            # A cross rate takes the target's rate on the source rate's date.
+            converted = row['amount'] * table.rate(currency, day) / table.rate(target, day)
+        result[tuple(row[field] for field in group_by)] += converted
+    if missing:
+        raise MissingRate(f"No rate on or before some payment dates for: {', '.join(sorted(missing))}.")
+    if not group_by:
+        return result[()].quantize(CENT)
+    return {key: total.quantize(CENT) for key, total in result.items()}
+
+
+def parse_decimal(value):
+    try:
+        return Decimal(value.strip())
+    except InvalidOperation:
+        return None
+
+
+def read_rates(path, inverse=False):
+    """Yield ``(currency, date, rate)`` from a long (Currency,Date,Rate) or wide (Date,<currencies>...) CSV."""
+    stream, _ = open_fixture(path)
+    with stream:
+        reader = csv.reader(stream)
+        header = [name.strip() for name in next(reader)]
+        columns = [name.lower() for name in header]
+        long_format = {'currency', 'date', 'rate'} <= set(columns)
+        if not long_format and columns[0] != 'date':
+            raise ValueError(f"{path}: expected Currency,Date,Rate or Date,<currency>... columns, got {header}.")
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if long_format:
+                record = dict(zip(columns, row))
+                quotes = [(record['currency'], record['rate'])]
+                day = record['date']
+            else:
+                quotes = [(currency, value) for currency, value in zip(header[1:], row[1:]) if currency]
+                day = row[0]
+            try:
+                day = date.fromisoformat(day.strip())
+            except ValueError:
+                raise ValueError(f"{path}:{line}: invalid date {day!r}.") from None
+            for currency, value in quotes:
+                rate = parse_decimal(value)
+                if not rate:
+                    continue  # publishers leave days without a quote empty or N/A
+                if inverse:
+                    rate = ONE / rate
+                yield currency.strip().upper(), day, rate.quantize(RATE_PLACES)
+
+
+def load_rates(path, inverse=False, batch_size=5000):
+    """Upsert the rates in ``path``; ``inverse`` for files quoting units of currency per base unit."""
+    loaded = 0
+    rows = read_rates(path, inverse)
+    with transaction.atomic():
+        while batch := list(itertools.islice(rows, batch_size)):
+            FxRate.objects.bulk_create(
+                [FxRate(Currency=currency, RateDate=day, Rate=rate) for currency, day, rate in batch],
+                update_conflicts=True, unique_fields=['Currency', 'RateDate'], update_fields=['Rate'],
+            )
+            loaded += len(batch)
+        invalidate_on_commit()
+    return loaded
@@ -0,0 +1,260 @@
+"""Streaming import of bank statements into Transaction and Payment.
+
+The pipeline is a chain of generators, so memory does not depend on the file
+size::
+
+    read_records(path)  ->  normalise()  ->  batched()  ->  write_batch()
+
+Each batch is written with ``bulk_create`` inside its own transaction, together
+with the balance ledger/rollup deltas (``bulk_create`` skips the model signals)
+and the ``ImportCheckpoint`` position. After a crash the import resumes after
+the last committed batch.
+"""
+import csv
+import io
+import itertools
+import json
+import re
+import time
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.users.models import AmsUser
+from . import posting
+from .models import ImportCheckpoint, Payment, Transaction
+
+FORMATS = ('csv', 'jsonl', 'ofx')
+CENT = Decimal('0.01')
+
+Record = namedtuple('Record', [
+    'position', 'AccountID', 'DateOfTransaction', 'Description', 'BankName',
+    'Debit', 'Credit', 'TotalAmount', 'Currency', 'Amount',
+])
+ImportResult = namedtuple('ImportResult', ['rows', 'rejected', 'seconds'])
+
+
+class RecordError(ValueError):
+    def __init__(self, position, message):
+        super().__init__(f"record {position}: {message}")
+        self.position = position
+
+
+def detect_format(path):
+    suffix = Path(path).suffix.lower().lstrip('.')
+    if suffix in ('qfx', 'ofx'):
+        return 'ofx'
+    if suffix in ('json', 'jsonl', 'ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+# Readers yield (position, dict of raw values or a RecordError); position counts records from 1.
+
+def read_csv(stream):
+    yield from enumerate(csv.DictReader(stream), start=1)
+
+
+def read_jsonl(stream):
+    position = 0
+    for line in stream:
+        if line.strip():
+            position += 1
+            try:
+                yield position, json.loads(line)
+            except ValueError as exc:
+                yield position, RecordError(position, f"invalid JSON: {exc}")
+
+
+OFX_TOKEN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def read_ofx(stream, chunk_size=64 * 1024):
+    """Tag-level OFX reader for both the SGML (unclosed tags) and XML dialects."""
+    header, record, position, buffer = {}, None, 0, ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        # Only tokenise up to the last complete tag; keep the rest for the next chunk.
+        cut = len(buffer) if not chunk else buffer.rfind('<')
+        for match in OFX_TOKEN.finditer(buffer, 0, max(cut, 0)):
+            closing, tag, value = match.group(1), match.group(2).upper(), match.group(3).strip()
+            if tag == 'STMTTRN':
+                if closing and record is not None:
+                    position += 1
+                    yield position, {**header, **record}
+                    record = None
+                elif not closing:
+                    record = {}
+            elif not closing and value:
+                (record if record is not None else header)[tag] = value
+        if not chunk:
+            return
+        buffer = buffer[max(cut, 0):]
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl, 'ofx': read_ofx}
+
+
+def parse_amount(value, position, field):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value).replace(',', '')).quantize(CENT)
+    except InvalidOperation:
+        raise RecordError(position, f"{field} is not a number: {value!r}")
+
+
+def parse_when(value, position):
+    text = str(value or '').strip()
+    ofx = re.match(r'^(\d{8})(\d{6})?', text)
+    try:
+        if ofx:
+            when = datetime.strptime(ofx.group(1) + (ofx.group(2) or '000000'), '%Y%m%d%H%M%S')
+        else:
+            when = parse_datetime(text)
+            if when is None:
+                day = parse_date(text)
+                when = datetime(day.year, day.month, day.day) if day else None
+    except ValueError:
+        when = None
+    if when is None:
+        raise RecordError(position, f"invalid date {value!r}")
+    return timezone.make_aware(when, dt_timezone.utc) if timezone.is_naive(when) else when
+
+
+def normalise(rows, account=None, bank=None):
+    """Turn raw reader rows into ``Record``s; bad rows come through as ``RecordError``s."""
+    for position, row in rows:
+        if isinstance(row, RecordError):
+            yield row
+            continue
+        try:
+            yield normalise_row(position, row, account, bank)
+        except RecordError as exc:
+            yield exc
+
+
+def normalise_row(position, row, account=None, bank=None):
+    if 'TRNAMT' in row:  # OFX
+        amount = parse_amount(row['TRNAMT'], position, 'TRNAMT')
+        if amount is None:
+            raise RecordError(position, "TRNAMT is required")
+        row = {
+            'DateOfTransaction': row.get('DTPOSTED'),
+            'Description': ' '.join(filter(None, [row.get('NAME'), row.get('MEMO')])),
+            'BankName': row.get('ORG') or row.get('BANKID'),
+            'Debit': -amount if amount < 0 else 0,
+            'Credit': amount if amount > 0 else 0,
+            'Currency': row.get('CURDEF'),
+            'Amount': abs(amount),
+        }
+
+    account_id = row.get('AccountID') or account
+    try:
+        account_id = int(account_id)
+    except (TypeError, ValueError):
+        raise RecordError(position, f"invalid AccountID {account_id!r}")
+    bank_name = (row.get('BankName') or bank or '').strip()
+    if not bank_name:
+        raise RecordError(position, "BankName is required")
+
+    debit = parse_amount(row.get('Debit'), position, 'Debit') or Decimal('0.00')
+    credit = parse_amount(row.get('Credit'), position, 'Credit') or Decimal('0.00')
+    total = parse_amount(row.get('TotalAmount'), position, 'TotalAmount')
+    if debit < 0 or credit < 0:
+        raise RecordError(position, "Debit and Credit must not be negative")
+
+    return Record(
+        position=position,
+        AccountID=account_id,
+        DateOfTransaction=parse_when(row.get('DateOfTransaction'), position),
+        Description=(row.get('Description') or '').strip(),
+        BankName=bank_name[:100],
+        Debit=debit,
+        Credit=credit,
+        TotalAmount=credit - debit if total is None else total,
+        Currency=(row.get('Currency') or 'USD').strip().upper()[:10],
+        Amount=parse_amount(row.get('Amount'), position, 'Amount'),
+    )
+
+
+def batched(items, size):
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def write_batch(records):
+    """Insert one batch of valid records; returns the number written and the rejected records."""
+    known = set(AmsUser.objects.filter(pk__in={r.AccountID for r in records}).values_list('pk', flat=True))
+    rejected = [RecordError(r.position, f"unknown AccountID {r.AccountID}") for r in records
+                if r.AccountID not in known]
+    records = [r for r in records if r.AccountID in known]
+
+    transactions = Transaction.objects.bulk_create([
+        Transaction(AccountID_id=r.AccountID, DateOfTransaction=r.DateOfTransaction, Description=r.Description,
+                    BankName=r.BankName, Debit=r.Debit, Credit=r.Credit, TotalAmount=r.TotalAmount)
+        for r in records
+    ])
+    Payment.objects.bulk_create([
+        Payment(TransactionID=tx, Currency=r.Currency, Amount=r.Amount)
+        for tx, r in zip(transactions, records) if r.Amount is not None
+    ])
+
+    # bulk_create skips the Transaction signals, so book the batch set-wise.
+    posting.record(transactions)
+
+    return len(records), rejected
+
+
+def import_records(records, checkpoint, batch_size=1000, on_batch=None, on_error=None):
+    """Write ``Record``/``RecordError`` items in batches, skipping those at or before the checkpoint."""
+    started = time.perf_counter()
+    imported = rejected = 0
+    pending = (item for item in records if item.position > checkpoint.Position)
+
+    for batch in batched(pending, batch_size):
+        valid = [item for item in batch if isinstance(item, Record)]
+        errors = [item for item in batch if isinstance(item, RecordError)]
+        with transaction.atomic():
+            written, unknown = write_batch(valid) if valid else (0, [])
+            errors += unknown
+            checkpoint.Position = batch[-1].position
+            checkpoint.RowsImported += written
+            checkpoint.RowsRejected += len(errors)
+            checkpoint.save()
+        imported += written
+        rejected += len(errors)
+        for error in errors:
+            if on_error:
+                on_error(error)
+        if on_batch:
+            on_batch(imported, rejected, time.perf_counter() - started)
+
+    checkpoint.Completed = True
+    checkpoint.save()
+    return ImportResult(imported, rejected, time.perf_counter() - started)
+
+
+def import_file(path, fmt=None, account=None, bank=None, batch_size=1000, restart=False,
+                source=None, on_batch=None, on_error=None):
+    """Import one statement file; returns an ``ImportResult`` for the rows written by this run."""
+    fmt = fmt or detect_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"Unknown statement format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(Source=source or str(Path(path).resolve()))
+    if restart:
+        checkpoint.Position = checkpoint.RowsImported = checkpoint.RowsRejected = 0
+        checkpoint.Completed = False
+    elif checkpoint.Completed:
+        return ImportResult(0, 0, 0.0)
+
+    with io.open(path, newline='', encoding='utf-8-sig') as stream:
+        records = normalise(READERS[fmt](stream), account=account, bank=bank)
+        return import_records(records, checkpoint, batch_size=batch_size, on_batch=on_batch, on_error=on_error)
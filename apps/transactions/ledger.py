@@ -0,0 +1,297 @@
+"""Running balances per account.
+
+Every account has one ``AccountBalance`` row with its all-time totals and one
+``BalanceCheckpoint`` per month with activity, holding the cumulative totals up
+to the end of that month. A balance as of any date is the checkpoint of the
+previous month plus the rows of the current month, so the cost no longer grows
+with the account's history.
+
+Every write to an ``AccountBalance`` bumps its ``Version``. ``apply`` adds to
+the row in place (``UPDATE ... SET Debit = Debit + ...``); ``apply_many`` reads
+the rows of a batch's accounts unlocked and writes each one back with
+``UPDATE ... WHERE Version = <the version it read>``. A row another writer
+changed in between matches nothing and is read and written again, so
+concurrent postings to an account are never lost and no lock is held while
+a batch is being summed.
+"""
+import calendar
+import functools
+from collections import defaultdict, namedtuple
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from ams.cache import account_cache, cached_per_account
+from .models import AccountBalance, ArchivedTransaction, BalanceCheckpoint, Transaction
+
+ZERO = Decimal('0.00')
+TOTAL_FIELDS = ('Debit', 'Credit', 'TotalAmount')
+MAX_RETRIES = 5
+
+
+class StaleBalance(OperationalError):
+    # An OperationalError, so callers that retry lock timeouts and deadlocks retry this too.
+    pass
+
+
+class Totals(namedtuple('Totals', ['Debit', 'Credit', 'TotalAmount', 'TransactionCount'])):
+    __slots__ = ()
+
+    @property
+    def Balance(self):
+        return self.Credit - self.Debit
+
+    def plus(self, other):
+        return Totals(*(a + b for a, b in zip(self, other)))
+
+    @classmethod
+    def of(cls, instance):
+        return cls(*(getattr(instance, field) for field in cls._fields))
+
+    def assign(self, instance):
+        for field, value in zip(self._fields, self):
+            setattr(instance, field, value)
+
+
+EMPTY = Totals(ZERO, ZERO, ZERO, 0)
+
+
+def month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def local_date(value):
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def start_of_day(day):
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+
+def totals_from(row):
+    if not row:
+        return EMPTY
+    return Totals(*(row[f] or ZERO for f in TOTAL_FIELDS), row['TransactionCount'] or 0)
+
+
+def aggregate(queryset):
+    return totals_from(queryset.aggregate(
+        Debit=Sum('Debit'), Credit=Sum('Credit'), TotalAmount=Sum('TotalAmount'),
+        TransactionCount=Count('pk'),
+    ))
+
+
+def sources(account_id):
+    """An account's hot and archived transaction rows: totals over its history read both."""
+    return [Transaction.objects.filter(AccountID_id=account_id),
+            ArchivedTransaction.objects.filter(AccountID_id=account_id)]
+
+
+def increments(debit, credit, total, count):
+    return {
+        'Debit': F('Debit') + decimal(debit),
+        'Credit': F('Credit') + decimal(credit),
+        'TotalAmount': F('TotalAmount') + decimal(total),
+        'TransactionCount': F('TransactionCount') + count,
+    }
+
+
+def apply(account_id, when, debit, credit, total, count=1, create=True):
+    """Add one transaction's amounts (or remove them, with negative values) to the ledger."""
+    period_end = month_end(local_date(when))
+    deltas = increments(debit, credit, total, count)
+
+    if create:
+        AccountBalance.objects.get_or_create(AccountID_id=account_id)
+        # Seeded from the primary: a lagging replica's checkpoint would be carried into the new month.
+        checkpoints = BalanceCheckpoint.objects.using(DEFAULT_DB_ALIAS).filter(AccountID_id=account_id)
+        if not checkpoints.filter(PeriodEnd=period_end).exists():
+            previous = (checkpoints
+                        .filter(PeriodEnd__lt=period_end)
+                        .order_by('-PeriodEnd')
+                        .values(*TOTAL_FIELDS, 'TransactionCount')
+                        .first())
+            BalanceCheckpoint.objects.get_or_create(
+                AccountID_id=account_id, PeriodEnd=period_end, defaults=totals_from(previous)._asdict(),
+            )
+
+    AccountBalance.objects.filter(AccountID_id=account_id).update(**deltas, Version=F('Version') + 1)
+    BalanceCheckpoint.objects.filter(AccountID_id=account_id, PeriodEnd__gte=period_end).update(**deltas)
+
+
+def apply_many(deltas):
+    """Bulk form of ``apply``: ``deltas`` maps ``(account_id, date)`` to the ``Totals`` to add."""
+    accounts = defaultdict(lambda: defaultdict(lambda: EMPTY))
+    for (account_id, day), totals in deltas.items():
+        months = accounts[account_id]
+        period_end = month_end(local_date(day))
+        months[period_end] = months[period_end].plus(totals)
+
+    add_to_balances({account_id: functools.reduce(Totals.plus, months.values())
+                     for account_id, months in accounts.items()})
+
+    # Missing checkpoints are inserted first, holding the cumulative totals of the checkpoint before
+    # them. A concurrent batch may insert the same row; ignore_conflicts keeps whichever came first,
+    # and the deltas are added below to the locked rows, whoever inserted them.
+    created = []
+    for account_id, months in accounts.items():
+        first = min(months)
+        checkpoints = BalanceCheckpoint.objects.select_for_update().filter(AccountID_id=account_id)
+        previous = (checkpoints.filter(PeriodEnd__lt=first).order_by('-PeriodEnd')
+                    .values_list('PeriodEnd', flat=True).first())
+        # Locked from the previous checkpoint on, so no concurrent batch moves it meanwhile.
+        rows = (checkpoints.filter(PeriodEnd__gte=previous or first)
+                .values('PeriodEnd', *TOTAL_FIELDS, 'TransactionCount'))
+        stored = {row['PeriodEnd']: totals_from(row) for row in rows}
+        carried = EMPTY
+        for period_end in sorted(set(stored) | set(months)):
+            if period_end in stored:
+                carried = stored[period_end]
+            else:
+                created.append(BalanceCheckpoint(AccountID_id=account_id, PeriodEnd=period_end, **carried._asdict()))
+    BalanceCheckpoint.objects.bulk_create(created, ignore_conflicts=True)
+
+    updated = []
+    for account_id, months in accounts.items():
+        rows = BalanceCheckpoint.objects.select_for_update().filter(AccountID_id=account_id, PeriodEnd__gte=min(months))
+        added = EMPTY
+        for row in rows.order_by('PeriodEnd'):
+            added = added.plus(months.get(row.PeriodEnd, EMPTY))
+            Totals.of(row).plus(added).assign(row)
+            updated.append(row)
+    BalanceCheckpoint.objects.bulk_update(updated, [*TOTAL_FIELDS, 'TransactionCount'])
+
+
+def add_to_balances(added, retries=MAX_RETRIES):
+    """Add ``{account_id: Totals}`` to the accounts' balances, one conditional UPDATE per account.
+
+    Raises ``StaleBalance`` if an account's row is still being changed by other
+    writers after ``retries`` more attempts.
+    """
+    AccountBalance.objects.bulk_create([AccountBalance(AccountID_id=pk) for pk in added], ignore_conflicts=True)
+    pending = set(added)
+    for _ in range(retries + 1):
+        rows = (AccountBalance.objects.using(DEFAULT_DB_ALIAS).filter(AccountID_id__in=pending)
+                .values_list('AccountID_id', 'Version', *TOTAL_FIELDS, 'TransactionCount'))
+        for account_id, version, *stored in rows:
+            totals = Totals(*stored).plus(added[account_id])
+            if AccountBalance.objects.filter(AccountID_id=account_id, Version=version).update(
+                    **totals._asdict(), Version=version + 1):
+                pending.discard(account_id)
+        if not pending:
+            return
+    raise StaleBalance(f"Balances of accounts {sorted(pending)} kept changing; gave up after {retries} retries.")
+
+
+@cached_per_account('balance')
+def current_balance(account_id):
+    # From the primary: a lagging replica's row, read just after an invalidation, would stay cached.
+    row = (AccountBalance.objects.using(DEFAULT_DB_ALIAS).filter(AccountID_id=account_id)
+           .values(*TOTAL_FIELDS, 'TransactionCount').first())
+    return totals_from(row)
+
+
+@cached_per_account('balance')
+async def acurrent_balance(account_id):
+    row = await (AccountBalance.objects.using(DEFAULT_DB_ALIAS).filter(AccountID_id=account_id)
+                 .values(*TOTAL_FIELDS, 'TransactionCount').afirst())
+    return totals_from(row)
+
+
+def balance_as_of(account_id, as_of):
+    """Totals for an account up to and including ``as_of`` (a date or a datetime).
+
+    A month end is read from its checkpoint. Otherwise the previous month's
+    checkpoint is added to the daily rollups of the month so far, or, for a
+    datetime, to the month's rows up to that moment.
+    """
+    # rollups imports this module.
+    from .rollups import period_totals
+
+    day = local_date(as_of)
+    month_start = day.replace(day=1)
+    checkpoints = BalanceCheckpoint.objects.filter(AccountID_id=account_id)
+
+    if not isinstance(as_of, datetime) and day == month_end(day):
+        row = checkpoints.filter(PeriodEnd=day).values(*TOTAL_FIELDS, 'TransactionCount').first()
+        if row:
+            return totals_from(row)
+
+    base = totals_from(checkpoints.filter(PeriodEnd__lt=month_start)
+                   .order_by('-PeriodEnd')
+                   .values(*TOTAL_FIELDS, 'TransactionCount')
+                   .first())
+    if not isinstance(as_of, datetime):
+        return base.plus(period_totals(account_id, month_start, day))
+    for rows in sources(account_id):
+        base = base.plus(aggregate(rows.filter(DateOfTransaction__gte=start_of_day(month_start),
+                                               DateOfTransaction__lte=as_of)))
+    return base
+
+
+def expected_checkpoints(account_id):
+    """Cumulative monthly totals computed from the raw (hot and archived) transaction rows."""
+    months = defaultdict(lambda: EMPTY)
+    for rows in sources(account_id):
+        for row in (rows.annotate(Month=TruncMonth('DateOfTransaction'))
+                    .values('Month')
+                    .annotate(Debit=Sum('Debit'), Credit=Sum('Credit'), TotalAmount=Sum('TotalAmount'),
+                              TransactionCount=Count('pk'))):
+            period_end = month_end(local_date(row['Month']))
+            months[period_end] = months[period_end].plus(totals_from(row))
+    running = EMPTY
+    result = {}
+    for period_end in sorted(months):
+        running = running.plus(months[period_end])
+        result[period_end] = running
+    return result
+
+
+def rebuild(account_id):
+    expected = expected_checkpoints(account_id)
+    BalanceCheckpoint.objects.filter(AccountID_id=account_id).delete()
+    BalanceCheckpoint.objects.bulk_create(
+        BalanceCheckpoint(AccountID_id=account_id, PeriodEnd=period_end, **totals._asdict())
+        for period_end, totals in expected.items()
+    )
+    totals = list(expected.values())[-1] if expected else EMPTY
+    AccountBalance.objects.update_or_create(AccountID_id=account_id, create_defaults=totals._asdict(),
+                                            defaults={**totals._asdict(), 'Version': F('Version') + 1})
+    account_cache.invalidate_on_commit(account_id)
+
+
+def verify(account_id):
+    """Return a list of human-readable differences between the ledger and the raw rows."""
+    problems = []
+    expected = expected_checkpoints(account_id)
+    stored = {
+        row['PeriodEnd']: totals_from(row)
+        for row in BalanceCheckpoint.objects.filter(AccountID_id=account_id)
+        .values('PeriodEnd', *TOTAL_FIELDS, 'TransactionCount')
+    }
+
+    running = EMPTY
+    for period_end in sorted(set(expected) | set(stored)):
+        running = expected.get(period_end, running)
+        if period_end not in stored:
+            problems.append(f"missing checkpoint {period_end}")
+        elif stored[period_end] != running:
+            problems.append(f"checkpoint {period_end}: stored {stored[period_end]} != {running}")
+
+    actual = functools.reduce(Totals.plus, map(aggregate, sources(account_id)))
+    balance = current_balance.uncached(account_id)
+    if balance != actual:
+        problems.append(f"balance: stored {balance} != {actual}")
+    return problems
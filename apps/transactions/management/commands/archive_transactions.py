@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.transactions.archive import archive_period, restore_period
+
+
+def period_bound(value):
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f"Invalid date {value!r}; expected YYYY-MM-DD.")
+    return day
+
+
+class Command(BaseCommand):
+    help = ("Move the transactions of a closed period into the archive tables, or back with --restore. "
+            "Balances, rollups and statements are unaffected either way.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=period_bound, help="First day of the period (YYYY-MM-DD).")
+        parser.add_argument('end', type=period_bound, help="Last day of the period, inclusive (YYYY-MM-DD).")
+        parser.add_argument('--restore', action='store_true', help="Un-archive the period instead.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, start, end, restore, batch_size, **options):
+        if restore:
+            restored = restore_period(start, end, batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Restored {restored} transactions dated {start} to {end}."))
+            return
+        try:
+            result = archive_period(start, end, batch_size=batch_size)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Archived {result.moved} transactions dated {start} to {end}."))
+        if result.kept:
+            self.stdout.write(f"Kept {result.kept} transactions that reports refer to.")
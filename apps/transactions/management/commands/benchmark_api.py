@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from rest_framework.pagination import Cursor
+
+from ams.pagination import KeysetPagination
+from apps.transactions.models import Transaction
+from apps.users.models import AmsUser
+
+
+class Command(BaseCommand):
+    help = ("Load-test the transactions API: p50/p95 latency of page 1 against deep cursor pages, "
+            "with an OFFSET query of the same page for comparison. "
+            "Runs inside a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=10_000, help="Depth of the deepest page.")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=50, help="Requests per measured page.")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(**options)
+            transaction.set_rollback(True)
+
+    def run(self, pages, page_size, requests, batch_size, **options):
+        user = AmsUser.objects.create_superuser(username=f'benchmark-{time.time_ns()}', password=None)
+        rows = pages * page_size
+        for offset in range(0, rows, batch_size):
+            Transaction.objects.bulk_create(
+                Transaction(AccountID=user, BankName='Benchmark Bank', TotalAmount=0)
+                for _ in range(min(batch_size, rows - offset))
+            )
+        self.stdout.write(f"{rows} transactions, page size {page_size}")
+
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        url = reverse('transaction-list', kwargs={'version': 'v1'})
+        queryset = Transaction.objects.order_by('pk')
+
+        self.stdout.write(f"{'page':>8} {'cursor p50':>11} {'cursor p95':>11} {'offset p50':>11} {'offset p95':>11}")
+        for page in sorted({1, pages // 2, pages}):
+            offset = (page - 1) * page_size
+            if offset:
+                cursor_url = self.cursor_url(url, queryset[offset - 1].pk, page_size)
+            else:
+                cursor_url = f"{url}?page_size={page_size}"
+            cursor = self.latencies(requests, lambda: client.get(cursor_url))
+            offset_ms = self.latencies(requests, lambda: list(queryset[offset:offset + page_size]))
+            self.stdout.write(f"{page:>8} {cursor[0]:>11.2f} {cursor[1]:>11.2f} {offset_ms[0]:>11.2f} {offset_ms[1]:>11.2f}")
+
+    @staticmethod
+    def cursor_url(url, position, page_size):
+        paginator = KeysetPagination()
+        paginator.base_url = f"{url}?page_size={page_size}"
+        return paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    @staticmethod
+    def latencies(requests, func):
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        quantiles = statistics.quantiles(timings, n=20)
+        return statistics.median(timings), quantiles[18]
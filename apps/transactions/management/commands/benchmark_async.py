@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import functools
+import importlib.util
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from django.urls import path, reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.reports.models import Report
+from apps.transactions import ledger
+from apps.transactions.models import Transaction
+from apps.transactions.views import LATEST_LIMIT
+from apps.users.models import AmsUser
+
+
+def rss_kb(pid):
+    for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+        if line.startswith('VmRSS:'):
+            return int(line.split()[1])
+    return 0
+
+
+def account_view(view):
+    """Sync twin of ``ams.api.async_account_view``."""
+    @functools.wraps(view)
+    def wrapper(request, version, **kwargs):
+        user = request.user
+        if not user.is_authenticated:
+            try:
+                user = (JWTAuthentication().authenticate(request) or (user,))[0]
+            except AuthenticationFailed:
+                pass
+        if not user.is_authenticated:
+            return JsonResponse({'detail': "Authentication credentials were not provided."}, status=401)
+        account_id = kwargs.get('account_id')
+        if account_id is not None and not user.is_staff and account_id != user.pk:
+            return JsonResponse({'detail': "Not found."}, status=404)
+        return view(request, user, **kwargs)
+    return wrapper
+
+
+# The three polling views written against the sync ORM, so the WSGI run measures what a
+# sync implementation of the same endpoints costs. They mirror the async views query for query.
+
+@account_view
+def account_balance(request, user, account_id):
+    totals = ledger.current_balance(account_id)
+    if not totals.TransactionCount and not AmsUser.objects.filter(pk=account_id).exists():
+        return JsonResponse({'detail': "Not found."}, status=404)
+    return JsonResponse({'AccountID': account_id, 'Balance': totals.Balance, **totals._asdict()})
+
+
+@account_view
+def latest_transactions(request, user, account_id):
+    limit = min(int(request.GET.get('limit', 20)), LATEST_LIMIT)
+    rows = (Transaction.objects.filter(AccountID_id=account_id)
+            .order_by('-DateOfTransaction', '-TransactionID')
+            .values('TransactionID', 'DateOfTransaction', 'Description', 'BankName',
+                    'Debit', 'Credit', 'TotalAmount'))
+    return JsonResponse({'AccountID': account_id, 'results': list(rows[:limit])})
+
+
+@account_view
+def report_status(request, user, report_id):
+    reports = Report.objects.all() if user.is_staff else Report.objects.filter(AccountID_id=user.pk)
+    try:
+        report = reports.values('ReportID', 'AccountID', 'DateRange', 'Status').get(pk=report_id)
+    except Report.DoesNotExist:
+        return JsonResponse({'detail': "Not found."}, status=404)
+    return JsonResponse(report)
+
+
+# ROOT_URLCONF of the WSGI server: the same paths as ams.urls, routed to the sync views.
+urlpatterns = [
+    path('api/<str:version>/accounts/<int:account_id>/balance/', account_balance),
+    path('api/<str:version>/accounts/<int:account_id>/transactions/latest/', latest_transactions),
+    path('api/<str:version>/reports/<int:report_id>/status/', report_status),
+]
+
+
+def serve_wsgi(port):
+    """Thread-per-connection WSGI server (runserver with a backlog that fits the load) for the sync views."""
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadedWSGIServer):
+        request_queue_size = 4096
+
+    settings.ROOT_URLCONF = __name__
+    httpd = Server(('127.0.0.1', port), QuietHandler)
+    httpd.set_app(get_wsgi_application())
+    httpd.serve_forever()
+
+
+class Command(BaseCommand):
+    help = ("Poll the balance / latest-transactions / report-status endpoints with many concurrent clients: "
+            "the async views served by uvicorn (ASGI, one event loop) against sync-ORM equivalents served by "
+            "a thread-per-connection WSGI server. Writes a benchmark account to the configured database and "
+            "deletes it afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=5, help="Requests per client.")
+        parser.add_argument('--transactions', type=int, default=1000)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--servers', nargs='+', choices=['asgi', 'wsgi'], default=['asgi', 'wsgi'])
+        parser.add_argument('--serve-wsgi', type=int, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve_wsgi']:
+            return serve_wsgi(options['serve_wsgi'])
+        if 'asgi' in options['servers'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError("The ASGI run needs uvicorn (pip install uvicorn), or pass --servers wsgi.")
+        # One socket per client here, and per connection in the server, which inherits the limit.
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+        user = AmsUser.objects.create_superuser(username=f'benchmark-{time.time_ns()}', password=None)
+        try:
+            Transaction.objects.bulk_create(
+                Transaction(AccountID=user, BankName='Benchmark Bank', Credit=1, TotalAmount=1)
+                for _ in range(options['transactions'])
+            )
+            ledger.rebuild(user.pk)
+            first = Transaction.objects.filter(AccountID=user).first()
+            report = Report.objects.create(AccountID=user, TransactionID=first, DateRange=first.DateOfTransaction)
+            paths = [
+                reverse('account-balance', kwargs={'version': 'v1', 'account_id': user.pk}),
+                reverse('account-latest-transactions', kwargs={'version': 'v1', 'account_id': user.pk}),
+                reverse('report-status', kwargs={'version': 'v1', 'report_id': report.pk}),
+            ]
+            token = str(AccessToken.for_user(user))
+
+            self.stdout.write(f"{options['clients']} clients x {options['requests']} requests")
+            self.stdout.write(f"{'views':<11} {'req/s':>8} {'p95 ms':>8} {'errors':>7} {'RSS MB':>8} {'KB/conn':>8}")
+            for server in options['servers']:
+                self.run(server, paths, token, **options)
+        finally:
+            user.delete()
+
+    def run(self, server, paths, token, port, clients, requests, **options):
+        if server == 'asgi':
+            command = [sys.executable, '-m', 'uvicorn', 'ams.asgi:application', '--port', str(port),
+                       '--log-level', 'warning', '--backlog', '4096', '--no-access-log']
+        else:
+            command = [sys.executable, 'manage.py', 'benchmark_async', '--serve-wsgi', str(port)]
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR)
+        try:
+            asyncio.run(self.wait_ready(port, paths[0], token))
+            idle = rss_kb(process.pid)
+            peak, latencies, errors, seconds = asyncio.run(
+                self.load(process.pid, port, paths, token, clients, requests))
+        finally:
+            process.terminate()
+            process.wait()
+
+        total = clients * requests
+        p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else 0
+        label = 'async/asgi' if server == 'asgi' else 'sync/wsgi'
+        self.stdout.write(f"{label:<11} {total / seconds:>8.0f} {p95:>8.1f} {errors:>7} "
+                          f"{peak / 1024:>8.1f} {(peak - idle) / clients:>8.1f}")
+
+    @staticmethod
+    async def get(port, path, token):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write((f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n"
+                      f"Connection: close\r\n\r\n").encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b' ', 2)[1])
+
+    async def wait_ready(self, port, path, token, timeout=30):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if await self.get(port, path, token) == 200:
+                    return
+            except (OSError, IndexError, ValueError):
+                pass
+            if time.monotonic() > deadline:
+                raise CommandError(f"Server on port {port} did not become ready.")
+            await asyncio.sleep(0.2)
+
+    async def load(self, pid, port, paths, token, clients, requests):
+        latencies, errors, peak = [], 0, 0
+
+        async def client(number):
+            nonlocal errors
+            for n in range(requests):
+                started = time.perf_counter()
+                try:
+                    status = await self.get(port, paths[(number + n) % len(paths)], token)
+                except (OSError, IndexError, ValueError):
+                    status = None
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += status != 200
+
+        async def sample():
+            nonlocal peak
+            while True:
+                peak = max(peak, rss_kb(pid))
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample())
+        started = time.perf_counter()
+        await asyncio.gather(*(client(number) for number in range(clients)))
+        seconds = time.perf_counter() - started
+        sampler.cancel()
+        return peak, latencies, errors, seconds
@@ -0,0 +1,86 @@
+import importlib.util
+import statistics
+import time
+from io import BytesIO
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.transactions.models import Transaction
+from apps.users.models import AmsUser
+
+
+class Command(BaseCommand):
+    help = ("Request latency through the full WSGI handler (so connections are opened and closed the way "
+            "they are when serving) with a new connection per request, persistent connections, and, on "
+            "Postgres with psycopg_pool installed, the native pool. On SQLite, --connect-latency-ms stands in "
+            "for a Postgres connection handshake. Writes a benchmark account and deletes it afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--connect-latency-ms', type=float, default=0,
+                            help="Sleep added to every new connection.")
+
+    def handle(self, *args, requests, connect_latency_ms, **options):
+        modes = {'per-request': {'CONN_MAX_AGE': 0}, 'persistent': {'CONN_MAX_AGE': 600}}
+        if connection.vendor == 'postgresql' and importlib.util.find_spec('psycopg_pool'):
+            modes['pool'] = {'CONN_MAX_AGE': 0, 'pool': {'min_size': 2, 'max_size': 4}}
+        else:
+            self.stdout.write("pool: skipped (needs Postgres with psycopg[pool])")
+
+        opened = []
+
+        def on_connect(sender, connection, **kwargs):
+            opened.append(connection.alias)
+            if connect_latency_ms:
+                time.sleep(connect_latency_ms / 1000)
+
+        user = AmsUser.objects.create_superuser(username=f'benchmark-{time.time_ns()}', password=None)
+        # Reads go to the replica alias, so every alias gets the mode under test.
+        original = {conn.alias: {key: conn.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'OPTIONS')}
+                    for conn in connections.all()}
+        connection_created.connect(on_connect)
+        try:
+            Transaction.objects.bulk_create(
+                Transaction(AccountID=user, BankName='Benchmark Bank', TotalAmount=0) for _ in range(100)
+            )
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': reverse('transaction-list', kwargs={'version': 'v1'}),
+                'QUERY_STRING': 'page_size=10',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}',
+                'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(b''), 'wsgi.errors': BytesIO(),
+            }
+            handler = WSGIHandler()
+
+            self.stdout.write(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12}")
+            for mode, config in modes.items():
+                for conn in connections.all():
+                    conn.close()
+                    conn.settings_dict['CONN_MAX_AGE'] = config['CONN_MAX_AGE']
+                    conn.settings_dict['OPTIONS'] = {
+                        key: value for key, value in (original[conn.alias]['OPTIONS'] or {}).items() if key != 'pool'
+                    }
+                    if 'pool' in config:
+                        conn.settings_dict['OPTIONS']['pool'] = config['pool']
+                opened.clear()
+                timings = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = handler(dict(environ), lambda status, headers: None)
+                    b''.join(response)
+                    response.close()
+                    timings.append((time.perf_counter() - started) * 1000)
+                p95 = statistics.quantiles(timings, n=20)[18]
+                self.stdout.write(f"{mode:<12} {statistics.median(timings):>8.2f} {p95:>8.2f} {len(opened):>12}")
+        finally:
+            connection_created.disconnect(on_connect)
+            for conn in connections.all():
+                conn.close()
+                conn.settings_dict.update(original[conn.alias])
+            user.delete()
@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.transactions import fx
+from apps.transactions.models import FxRate, Payment, Transaction
+from apps.users.models import AmsUser
+
+CURRENCIES = ('EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'SEK')
+
+
+class Command(BaseCommand):
+    help = ("Time multi-currency payment totals: converting every payment in Python against the "
+            "set-wise conversion of fx.totals, cold and with the rate table cached. "
+            "Runs inside a transaction that is rolled back, so no data is kept.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Payments to generate.")
+        parser.add_argument('--years', type=int, default=3, help="Years of history the payments are spread over.")
+        parser.add_argument('--batch-size', type=int, default=20_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(**options)
+            transaction.set_rollback(True)
+
+    def run(self, rows, years, batch_size, repeat, **options):
+        rng = random.Random(0)
+        base = fx.base_currency()
+        currencies = (base, *(currency for currency in CURRENCIES if currency != base))
+        account = AmsUser.objects.create_user(username=f'benchmark-{time.time_ns()}')
+        end = date(2025, 1, 1)
+        first = end.replace(year=end.year - years)
+        start = timezone.make_aware(datetime.combine(first, datetime.min.time()))
+        span = (end - first).total_seconds()
+
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            transactions = Transaction.objects.bulk_create(
+                Transaction(AccountID=account, BankName='Benchmark Bank', TotalAmount=0,
+                            DateOfTransaction=start + timedelta(seconds=rng.random() * span))
+                for _ in range(min(batch_size, rows - offset))
+            )
+            Payment.objects.bulk_create(
+                Payment(TransactionID=tx, Currency=rng.choice(currencies),
+                        Amount=Decimal(rng.randint(100, 50_000)) / 100)
+                for tx in transactions
+            )
+        rates = []
+        for currency in currencies[1:]:
+            rate, day = rng.uniform(0.005, 1.5), first - timedelta(days=7)
+            while day <= end:
+                if day.weekday() < 5:
+                    rate *= rng.uniform(0.99, 1.01)
+                    rates.append(FxRate(Currency=currency, RateDate=day, Rate=Decimal(f'{rate:.10f}')))
+                day += timedelta(days=1)
+        # Rates are global: replace any real ones for the run (the rollback restores them).
+        FxRate.objects.all().delete()
+        FxRate.objects.bulk_create(rates, batch_size=batch_size)
+        self.stdout.write(f"Inserted {rows} payments in {len(currencies)} currencies and {len(rates)} rates "
+                          f"in {time.perf_counter() - started:.1f}s")
+
+        payments = Payment.objects.filter(TransactionID__AccountID=account)
+        target = currencies[1]
+
+        def per_row():
+            table, total = fx.rate_table(), Decimal(0)
+            for currency, when, amount in payments.values_list(
+                    'Currency', 'TransactionID__DateOfTransaction', 'Amount').iterator(chunk_size=10_000):
+                total += table.convert(amount, currency, timezone.localdate(when), target)
+            return total.quantize(fx.CENT)
+
+        def cold():
+            fx.invalidate()
+            return fx.totals(payments, target)
+
+        cases = [('python per row', per_row), ('totals, cold rate table', cold),
+                 ('totals, cached rate table', lambda: fx.totals(payments, target))]
+        self.stdout.write(f"{'case':<28} {'ms':>10} {'total ' + target:>20}")
+        for name, func in cases:
+            result = func()
+            ms = self.time(repeat, func)
+            self.stdout.write(f"{name:<28} {ms:>10.1f} {result:>20}")
+
+    @staticmethod
+    def time(repeat, func):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeat
@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ams.search import LikeBackend, search_q
+from apps.transactions.models import Transaction
+from apps.users.models import AmsUser
+
+WORDS = ('invoice rent payroll coffee supplies travel hotel fuel insurance licence consulting refund '
+         'transfer deposit salary utilities electricity water internet subscription hardware software '
+         'maintenance repair catering marketing advertising shipping freight customs tax').split()
+
+
+class Command(BaseCommand):
+    help = ("Compare full-text search of Transaction.Description with the LIKE '%...%' path. "
+            "Runs inside a transaction that is rolled back, so no data is kept.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('terms', nargs='*', default=['payroll', 'coffee hotel', 'zzzunmatched'])
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(**options)
+            transaction.set_rollback(True)
+
+    def run(self, rows, batch_size, repeat, terms, **options):
+        rng = random.Random(0)
+        account = AmsUser.objects.create_user(username=f'benchmark-{time.time_ns()}')
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            Transaction.objects.bulk_create(
+                Transaction(AccountID=account, BankName='Benchmark Bank', TotalAmount=0,
+                            Description=' '.join(rng.choices(WORDS, k=8)))
+                for _ in range(min(batch_size, rows - offset))
+            )
+        self.stdout.write(f"Inserted {rows} rows in {time.perf_counter() - started:.1f}s")
+
+        like = LikeBackend(None)
+        self.stdout.write(f"{'term':<16} {'matches':>9} {'fts ms':>10} {'like ms':>10}")
+        for term in terms:
+            fts_query = Transaction.objects.filter(search_q(Transaction, ['Description'], term))
+            like_query = Transaction.objects.filter(like.q(Transaction, ['Description'], term))
+            # The admin renders a count plus the first page.
+            fts_ms = self.time(repeat, lambda: (fts_query.count(), list(fts_query[:100])))
+            like_ms = self.time(repeat, lambda: (like_query.count(), list(like_query[:100])))
+            self.stdout.write(f"{term:<16} {fts_query.count():>9} {fts_ms:>10.1f} {like_ms:>10.1f}")
+
+    @staticmethod
+    def time(repeat, func):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeat
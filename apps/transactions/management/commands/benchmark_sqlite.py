@@ -0,0 +1,98 @@
+import multiprocessing
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import Sum
+
+from ams.db import SQLITE_PROFILES
+from apps.transactions.models import Transaction
+from apps.users.models import AmsUser
+
+ALIAS = 'benchmark'
+PROFILES = {'sqlite': {}, 'production': SQLITE_PROFILES['production']}
+
+
+def worker(role, account_id, seconds, batch_size):
+    """Run reads or write batches against ALIAS for ``seconds``; returns (latencies in ms, errors)."""
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'read':
+                Transaction.objects.using(ALIAS).filter(AccountID_id=account_id).aggregate(Sum('Credit'))
+            else:
+                with transaction.atomic(using=ALIAS):
+                    Transaction.objects.using(ALIAS).bulk_create(
+                        Transaction(AccountID_id=account_id, BankName='Benchmark Bank', Credit=1, TotalAmount=1)
+                        for _ in range(batch_size)
+                    )
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    connections.close_all()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = ("Mixed concurrent readers and writers against a scratch SQLite database, once with SQLite's "
+            "default settings and once with the production pragmas (WAL, synchronous=NORMAL, mmap, "
+            "cache size, busy timeout). The configured databases are not touched.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=6)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=20_000, help="Rows each reader aggregates.")
+        parser.add_argument('--batch-size', type=int, default=10, help="Rows per write transaction.")
+
+    def handle(self, *args, readers, writers, seconds, rows, batch_size, **options):
+        self.stdout.write(f"{readers} readers, {writers} writers, {seconds:g}s per profile")
+        self.stdout.write(f"{'profile':<11} {'role':<6} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'max ms':>8} {'locked':>7}")
+        for profile, pragmas in PROFILES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                self.run(profile, pragmas, Path(directory) / 'benchmark.sqlite3',
+                         readers, writers, seconds, rows, batch_size)
+
+    def run(self, profile, pragmas, path, readers, writers, seconds, rows, batch_size):
+        connections.settings[ALIAS] = {
+            **connections['default'].settings_dict,
+            'NAME': path, 'PRAGMAS': pragmas, 'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }
+        try:
+            call_command('migrate', database=ALIAS, verbosity=0)
+            account = AmsUser.objects.db_manager(ALIAS).create_user(username='benchmark')
+            Transaction.objects.using(ALIAS).bulk_create(
+                (Transaction(AccountID=account, BankName='Benchmark Bank', Credit=1, TotalAmount=1)
+                 for _ in range(rows)),
+                batch_size=5000,
+            )
+            connections.close_all()
+
+            roles = ['read'] * readers + ['write'] * writers
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(len(roles), mp_context=context) as pool:
+                futures = [(role, pool.submit(worker, role, account.pk, seconds, batch_size)) for role in roles]
+                results = [(role, future.result()) for role, future in futures]
+        finally:
+            connections.close_all()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
+
+        for role in ('read', 'write'):
+            latencies = [ms for r, (timings, _) in results if r == role for ms in timings]
+            errors = sum(errors for r, (_, errors) in results if r == role)
+            if not latencies:
+                self.stdout.write(f"{profile:<11} {role:<6} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {errors:>7}")
+                continue
+            p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else latencies[0]
+            self.stdout.write(f"{profile:<11} {role:<6} {len(latencies) / seconds:>8.0f} "
+                              f"{statistics.median(latencies):>8.2f} {p95:>8.2f} {max(latencies):>8.1f} {errors:>7}")
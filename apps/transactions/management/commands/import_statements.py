@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.transactions import importer
+
+
+class Command(BaseCommand):
+    help = ("Stream CSV, JSONL or OFX bank statements into Transaction/Payment with batched inserts. "
+            "Progress is checkpointed per batch, so re-running after a crash resumes where it stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument('--format', choices=importer.FORMATS, help="Default: guessed from the extension.")
+        parser.add_argument('--account', type=int, help="AccountID for files without an AccountID column (OFX).")
+        parser.add_argument('--bank', help="BankName for files without a BankName column.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and import from the start.")
+        parser.add_argument('--max-errors', type=int, default=100, help="Number of rejected records to print.")
+
+    def handle(self, *args, **options):
+        printed = 0
+
+        def on_error(error):
+            nonlocal printed
+            if printed < options['max_errors']:
+                self.stderr.write(f"  rejected {error}")
+            printed += 1
+
+        def on_batch(rows, rejected, seconds):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {rows} rows, {rejected} rejected, {rows / max(seconds, 1e-9):.0f} rows/s")
+
+        for path in options['files']:
+            try:
+                result = importer.import_file(
+                    path, fmt=options['format'], account=options['account'], bank=options['bank'],
+                    batch_size=options['batch_size'], restart=options['restart'],
+                    on_batch=on_batch, on_error=on_error,
+                )
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"{path}: {exc}")
+            rate = result.rows / result.seconds if result.seconds else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: imported {result.rows} rows, rejected {result.rejected} "
+                f"in {result.seconds:.1f}s ({rate:.0f} rows/s)"
+            ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.transactions import fx
+
+
+class Command(BaseCommand):
+    help = ("Load dated FX rates from CSV files (Currency,Date,Rate rows, or a Date column plus one column "
+            "per currency). Existing rates for the same currency and date are replaced.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="CSV files, optionally gzipped.")
+        parser.add_argument('--inverse', action='store_true',
+                            help="The files quote units of each currency per one unit of the base currency "
+                                 "(as the ECB does) instead of the base-currency value of one unit.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, files, inverse, batch_size, **options):
+        for path in files:
+            try:
+                loaded = fx.load_rates(path, inverse=inverse, batch_size=batch_size)
+            except (OSError, ValueError, ArithmeticError) as exc:
+                raise CommandError(f"{path}: {exc}")
+            self.stdout.write(self.style.SUCCESS(f"{path}: loaded {loaded} rates"))
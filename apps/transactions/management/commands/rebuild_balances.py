@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.accounts import journal
+from apps.transactions import ledger, rollups
+from apps.users import summary
+from apps.users.models import AmsUser
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the per-account balance ledger, period rollups, journal postings and account "
+            "summaries from the Transaction rows, or verify them with --verify.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('accounts', nargs='*', type=int, help="AccountIDs to process (default: all).")
+        parser.add_argument('--verify', action='store_true', help="Only compare the snapshots with the raw rows.")
+
+    def handle(self, *args, **options):
+        account_ids = options['accounts'] or AmsUser.objects.order_by('pk').values_list('pk', flat=True)
+        failures = 0
+
+        for account_id in account_ids:
+            if options['verify']:
+                problems = ledger.verify(account_id) + rollups.verify(account_id) + journal.verify(account_id)
+                problems += summary.verify(account_id)
+                for problem in problems:
+                    self.stderr.write(f"Account {account_id}: {problem}")
+                failures += bool(problems)
+            else:
+                with transaction.atomic():
+                    ledger.rebuild(account_id)
+                    rollups.rebuild(account_id)
+                    journal.rebuild(account_id)
+                    summary.rebuild(account_ids=[account_id])
+                self.stdout.write(f"Account {account_id}: rebuilt")
+
+        if failures:
+            raise CommandError(f"{failures} account(s) do not match their transactions.")
+        if options['verify']:
+            self.stdout.write(self.style.SUCCESS("Balance ledger, rollups, journal and summaries match the transactions."))
@@ -0,0 +1,83 @@
+import functools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from apps.reports.jobs import init_process
+from apps.transactions import ledger
+from apps.transactions.models import Transaction
+from apps.transactions.posting import Poster
+from apps.users.models import AmsUser
+
+
+def run_worker(seed, account_ids, postings, batch_size):
+    """Post ``postings`` random amounts to ``account_ids``; returns what was posted, per account."""
+    rng = random.Random(seed)
+    posted = {account_id: ledger.EMPTY for account_id in account_ids}
+    now = timezone.now()
+    poster = Poster(batch_size) if batch_size > 1 else None
+    for _ in range(postings):
+        account_id = rng.choice(account_ids)
+        debit, credit = (Decimal(rng.randint(1, 10_000)) / 100, ledger.ZERO)
+        if rng.random() < 0.5:
+            debit, credit = credit, debit
+        if poster:
+            poster.add(account_id, now, debit, credit, bank='Stress Bank')
+        else:
+            Transaction.objects.create(AccountID_id=account_id, DateOfTransaction=now, BankName='Stress Bank',
+                                       Debit=debit, Credit=credit, TotalAmount=credit - debit)
+        posted[account_id] = posted[account_id].plus(ledger.Totals(debit, credit, credit - debit, 1))
+    if poster:
+        poster.flush()
+    return posted
+
+
+class Command(BaseCommand):
+    help = ("Post to a few shared accounts from several processes at once, one save() per posting and in "
+            "batches through apps.transactions.posting, and check that every account's balance equals what "
+            "the processes posted (no lost updates). Writes benchmark accounts and deletes them afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=max(os.cpu_count() or 1, 4))
+        parser.add_argument('--postings', type=int, default=1000, help="Postings per process.")
+        parser.add_argument('--accounts', type=int, default=3, help="Accounts the processes contend for.")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, processes, postings, accounts, batch_size, **options):
+        self.stdout.write(f"{processes} processes x {postings} postings to {accounts} accounts")
+        for mode, size in (('save', 1), (f'batch {batch_size}', batch_size)):
+            stamp = time.time_ns()
+            users = [AmsUser.objects.create_user(username=f'stress-{stamp}-{n}') for n in range(accounts)]
+            account_ids = [user.pk for user in users]
+            try:
+                connections.close_all()
+                started = time.perf_counter()
+                with ProcessPoolExecutor(processes, initializer=init_process) as pool:
+                    results = list(pool.map(run_worker, range(processes), [account_ids] * processes,
+                                            [postings] * processes, [size] * processes))
+                elapsed = time.perf_counter() - started
+                lost, wrong = self.compare(account_ids, results)
+                self.stdout.write(f"{mode:<12} {processes * postings / elapsed:>10,.0f} postings/s "
+                                  f"{lost:>6} lost updates")
+            finally:
+                for user in users:
+                    user.delete()
+            if wrong:
+                raise CommandError(f"{mode}: balances of accounts {wrong} differ from what was posted.")
+
+    def compare(self, account_ids, results):
+        """Postings missing from the balances, and the accounts whose balance is not what was posted."""
+        lost, wrong = 0, []
+        for account_id in account_ids:
+            expected = functools.reduce(ledger.Totals.plus, (posted[account_id] for posted in results))
+            stored = ledger.current_balance.uncached(account_id)
+            lost += expected.TransactionCount - stored.TransactionCount
+            if stored != expected:
+                wrong.append(account_id)
+        return lost, wrong
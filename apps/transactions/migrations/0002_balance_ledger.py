@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0001_initial'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalance',
+            fields=[
+                ('AccountID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('Debit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('Credit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TotalAmount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TransactionCount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('PeriodEnd', models.DateField()),
+                ('Debit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('Credit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TotalAmount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TransactionCount', models.PositiveIntegerField(default=0)),
+                ('AccountID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('AccountID', 'PeriodEnd'), name='unique_balance_checkpoint')],
+            },
+        ),
+    ]
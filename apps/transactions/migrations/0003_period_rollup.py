@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_balance_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='DateOfTransaction',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='PeriodRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('PeriodStart', models.DateField()),
+                ('Debit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('Credit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TotalAmount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TransactionCount', models.PositiveIntegerField(default=0)),
+                ('AccountID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('AccountID', 'Granularity', 'PeriodStart'), name='unique_period_rollup')],
+            },
+        ),
+    ]
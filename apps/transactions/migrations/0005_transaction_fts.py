@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from ams.search import index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_indexes'),
+    ]
+
+    operations = [
+        index_operation('transactions', 'Transaction', ['Description']),
+    ]
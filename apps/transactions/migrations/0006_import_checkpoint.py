@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_transaction_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Source', models.CharField(max_length=255, unique=True)),
+                ('Position', models.PositiveBigIntegerField(default=0)),
+                ('RowsImported', models.PositiveBigIntegerField(default=0)),
+                ('RowsRejected', models.PositiveBigIntegerField(default=0)),
+                ('Completed', models.BooleanField(default=False)),
+                ('UpdatedAt', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
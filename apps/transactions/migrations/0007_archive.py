@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:27
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_import_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('PeriodStart', models.DateField()),
+                ('PeriodEnd', models.DateField()),
+                ('RowsArchived', models.PositiveBigIntegerField(default=0)),
+                ('ArchivedAt', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['PeriodStart'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('TransactionID', models.IntegerField(primary_key=True, serialize=False)),
+                ('DateOfTransaction', models.DateTimeField()),
+                ('Description', models.TextField(blank=True)),
+                ('BankName', models.CharField(max_length=100)),
+                ('Debit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('Credit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('TotalAmount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('Payments', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('ArchivedAt', models.DateTimeField(auto_now_add=True)),
+                ('AccountID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['AccountID', 'DateOfTransaction'], name='archived_tx_account_date_idx'), models.Index(fields=['DateOfTransaction'], name='archived_tx_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Currency', models.CharField(max_length=10)),
+                ('RateDate', models.DateField()),
+                ('Rate', models.DecimalField(decimal_places=10, max_digits=20)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('Currency', 'RateDate'), name='unique_fx_rate')],
+            },
+        ),
+    ]
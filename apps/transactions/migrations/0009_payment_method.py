@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+from apps.transactions.payments import refresh_methods
+
+
+def backfill(apps, schema_editor):
+    refresh_methods(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_fx_rate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='Method',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('card', 'Card'), ('cash', 'Cash'), ('mixed', 'Card and cash')], default='', max_length=5),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
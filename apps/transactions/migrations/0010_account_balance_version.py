@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountbalance',
+            name='Version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,29 +1,81 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
 from apps.users.models import AmsUser
 
 class Transaction(models.Model):
     TransactionID = models.AutoField(primary_key=True)
     AccountID = models.ForeignKey(AmsUser, on_delete=models.CASCADE, related_name='transactions')
-    DateOfTransaction = models.DateTimeField(auto_now_add=True)
+    DateOfTransaction = models.DateTimeField(default=timezone.now)
     Description = models.TextField(blank=True)
     BankName = models.CharField(max_length=100)
     Debit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     Credit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     TotalAmount = models.DecimalField(max_digits=15, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Per-account history, balance deltas and rollup rebuilds.
+            models.Index(fields=['AccountID', 'DateOfTransaction'], name='transaction_account_date_idx'),
+            # Admin date_hierarchy drilldown and the date list filter.
+            models.Index(fields=['DateOfTransaction'], name='transaction_date_idx'),
+            # Admin BankName filter (and its distinct value list), optionally with a date drilldown.
+            models.Index(fields=['BankName', 'DateOfTransaction'], name='transaction_bank_date_idx'),
+        ]
+
     def __str__(self):
         return f"Transaction {self.TransactionID}"
 
+    def save(self, *args, **kwargs):
+        # Keep the balance ledger (see signals.py) in the same DB transaction as the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class PaymentQuerySet(models.QuerySet):
+    def with_details(self):
+        """Prefetch each payment's ``credit_card`` and ``cash`` rows, with one query per detail table."""
+        return self.prefetch_related('credit_card', 'cash')
+
+
 class Payment(models.Model):
+    # How the payment was made, by which detail tables have rows for it. Kept by signals.py
+    # (refresh_methods in payments.py) so listing, filtering and totals per method need no joins.
+    NONE = ''
+    CARD = 'card'
+    CASH = 'cash'
+    MIXED = 'mixed'
+    METHOD_CHOICES = [(NONE, 'None'), (CARD, 'Card'), (CASH, 'Cash'), (MIXED, 'Card and cash')]
+    DETAIL_METHODS = {'credit_card': (CARD, MIXED), 'cash': (CASH, MIXED)}
+
     PaymentID = models.AutoField(primary_key=True)
     TransactionID = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='payments')
     Currency = models.CharField(max_length=10, default='USD')
     Amount = models.DecimalField(max_digits=15, decimal_places=2)
+    Method = models.CharField(max_length=5, choices=METHOD_CHOICES, default=NONE, blank=True)
+
+    objects = PaymentQuerySet.as_manager()
 
     def __str__(self):
         return f"Payment {self.PaymentID}"
 
 
+# Value of one unit of Currency in the base currency (settings.AMS_FX_BASE) from RateDate until the
+# currency's next rate. Loaded from files with load_fx_rates; see fx.py.
+class FxRate(models.Model):
+    Currency = models.CharField(max_length=10)
+    RateDate = models.DateField()
+    Rate = models.DecimalField(max_digits=20, decimal_places=10)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['Currency', 'RateDate'], name='unique_fx_rate'),
+        ]
+
+    def __str__(self):
+        return f"{self.Currency} {self.RateDate}: {self.Rate}"
+
+
 class CreditCard(models.Model):
     CreditCardNo = models.CharField(max_length=20, primary_key=True)
     PaymentID = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='credit_card')
@@ -44,6 +96,119 @@ class Cash(models.Model):
         return f"Cash {self.CashTransactionNo}"
 
 
+class AccountBalance(models.Model):
+    AccountID = models.OneToOneField(AmsUser, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    Debit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    Credit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TotalAmount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TransactionCount = models.PositiveIntegerField(default=0)
+    # Bumped by every write; ledger.apply_many only writes back the version it read.
+    Version = models.PositiveIntegerField(default=0)
+
+    @property
+    def Balance(self):
+        return self.Credit - self.Debit
+
+    def __str__(self):
+        return f"Balance {self.AccountID_id}"
+
+
+class BalanceCheckpoint(models.Model):
+    # Cumulative totals for an account up to and including PeriodEnd (the last day of a month).
+    AccountID = models.ForeignKey(AmsUser, on_delete=models.CASCADE, related_name='balance_checkpoints')
+    PeriodEnd = models.DateField()
+    Debit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    Credit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TotalAmount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TransactionCount = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['AccountID', 'PeriodEnd'], name='unique_balance_checkpoint'),
+        ]
+
+    @property
+    def Balance(self):
+        return self.Credit - self.Debit
+
+    def __str__(self):
+        return f"Checkpoint {self.AccountID_id} @ {self.PeriodEnd}"
+
+
+class PeriodRollup(models.Model):
+    DAY = 'day'
+    MONTH = 'month'
+    GRANULARITY_CHOICES = [(DAY, 'Day'), (MONTH, 'Month')]
+
+    # Per-account totals of the transactions dated inside one day or one month.
+    AccountID = models.ForeignKey(AmsUser, on_delete=models.CASCADE, related_name='period_rollups')
+    Granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    PeriodStart = models.DateField()
+    Debit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    Credit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TotalAmount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TransactionCount = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['AccountID', 'Granularity', 'PeriodStart'], name='unique_period_rollup'),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.AccountID_id} {self.Granularity} {self.PeriodStart}"
+
+
+class ImportCheckpoint(models.Model):
+    # Progress of a statement import, committed with each batch so a crashed import can resume.
+    Source = models.CharField(max_length=255, unique=True)
+    Position = models.PositiveBigIntegerField(default=0)
+    RowsImported = models.PositiveBigIntegerField(default=0)
+    RowsRejected = models.PositiveBigIntegerField(default=0)
+    Completed = models.BooleanField(default=False)
+    UpdatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import {self.Source} @ {self.Position}"
+
+
+class ArchivedTransaction(models.Model):
+    # A Transaction of a closed period moved out of the hot table (see archive.py). It keeps its
+    # TransactionID, and its payments (with card and cash details) as a JSON snapshot.
+    TransactionID = models.IntegerField(primary_key=True)
+    AccountID = models.ForeignKey(AmsUser, on_delete=models.CASCADE, related_name='archived_transactions')
+    DateOfTransaction = models.DateTimeField()
+    Description = models.TextField(blank=True)
+    BankName = models.CharField(max_length=100)
+    Debit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    Credit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    TotalAmount = models.DecimalField(max_digits=15, decimal_places=2)
+    Payments = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    ArchivedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['AccountID', 'DateOfTransaction'], name='archived_tx_account_date_idx'),
+            models.Index(fields=['DateOfTransaction'], name='archived_tx_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived transaction {self.TransactionID}"
+
+
+class ArchivedPeriod(models.Model):
+    # A closed date range whose transactions live in ArchivedTransaction.
+    PeriodStart = models.DateField()
+    PeriodEnd = models.DateField()
+    RowsArchived = models.PositiveBigIntegerField(default=0)
+    ArchivedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['PeriodStart']
+
+    def __str__(self):
+        return f"Archived {self.PeriodStart} - {self.PeriodEnd}"
+
+
 # class Cheque(models.Model):
 #     ChequeID = models.CharField(max_length=50, primary_key=True)
 #     PaymentID = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='cheque')
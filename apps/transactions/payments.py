@@ -0,0 +1,65 @@
+"""Payment methods: the ``Payment.Method`` discriminator and totals per method.
+
+A payment's card and cash details live in the CreditCard and Cash tables.
+``Method`` records which of them have rows for it. ``refresh_methods`` sets it
+with one UPDATE per batch of payments, from EXISTS subqueries on the two
+tables. The CreditCard/Cash signals call it for single rows, and the bulk
+paths (archive restore, fixture loading) call it for their batches.
+
+With ``Method`` on the payment, listing and filtering by method need no
+joins, and ``method_totals`` breaks payment totals down by bank and method
+from Payment and Transaction alone, without reading either detail table.
+Pages that show the details load them with ``Payment.objects.with_details()``,
+one query per detail table.
+"""
+from collections import namedtuple
+
+from django.apps import apps as global_apps
+from django.db.models import Case, Count, Exists, OuterRef, Sum, Value, When
+
+from . import fx
+from .models import Payment
+
+MethodTotal = namedtuple('MethodTotal', ['bank', 'method', 'currency', 'count', 'total'])
+
+
+def method_expression(apps=global_apps):
+    card = Exists(apps.get_model('transactions', 'CreditCard').objects.filter(PaymentID=OuterRef('pk')))
+    cash = Exists(apps.get_model('transactions', 'Cash').objects.filter(PaymentID=OuterRef('pk')))
+    return Case(
+        When(card & cash, then=Value(Payment.MIXED)),
+        When(card, then=Value(Payment.CARD)),
+        When(cash, then=Value(Payment.CASH)),
+        default=Value(Payment.NONE),
+    )
+
+
+def refresh_methods(payment_ids=None, apps=global_apps, batch_size=10_000):
+    """Recompute ``Method`` of ``payment_ids`` (default: every payment) from the detail tables."""
+    payments = apps.get_model('transactions', 'Payment').objects.all()
+    if payment_ids is None:
+        return payments.update(Method=method_expression(apps))
+    payment_ids = list(payment_ids)
+    updated = 0
+    for start in range(0, len(payment_ids), batch_size):
+        updated += payments.filter(pk__in=payment_ids[start:start + batch_size]).update(
+            Method=method_expression(apps))
+    return updated
+
+
+def method_totals(payments, target=None):
+    """``MethodTotal`` rows per transaction bank and payment method, largest totals first.
+
+    Without ``target`` there is a row per currency too; with one, amounts are
+    converted into it (see ``fx.totals``).
+    """
+    bank = 'TransactionID__BankName'
+    grouping = [bank, 'Method'] if target else [bank, 'Method', 'Currency']
+    rows = payments.order_by().values(*grouping).annotate(count=Count('pk'), total=Sum('Amount'))
+    converted = fx.totals(payments, target, group_by=[bank, 'Method']) if target else {}
+    result = [
+        MethodTotal(row[bank], row['Method'], target or row['Currency'], row['count'],
+                    converted[row[bank], row['Method']] if target else row['total'])
+        for row in rows
+    ]
+    return sorted(result, key=lambda row: (-row.total, row.bank, row.method, row.currency))
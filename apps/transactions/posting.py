@@ -0,0 +1,96 @@
+"""Posting transactions in batches, safely from many processes at once.
+
+``post`` writes a batch of ``Entry`` items in one database transaction: one
+``bulk_create`` of the Transaction rows, then the bookkeeping for the whole
+batch, coalesced per account and day (``record``), so an account with a
+hundred entries in the batch gets one balance write rather than a hundred.
+Balances are written with optimistic locking (see ``ledger.add_to_balances``):
+concurrent posters never lose each other's updates and never wait on a lock
+while reading. A batch that still fails on a database error (a stale
+balance after all its retries, a lock timeout, a deadlock) is rolled back
+and posted again, up to ``MAX_ATTEMPTS`` times.
+
+``Poster`` collects entries as they arrive and posts them ``batch_size`` at
+a time.
+"""
+import random
+import time
+from collections import defaultdict, namedtuple
+
+from django.db import OperationalError, transaction
+
+from ams.cache import account_cache
+from apps.accounts import journal
+from .ledger import EMPTY, ZERO, Totals, decimal, local_date
+from .models import Transaction
+from .signals import BOOKKEEPERS
+
+MAX_ATTEMPTS = 5
+
+Entry = namedtuple('Entry', ['AccountID', 'DateOfTransaction', 'Debit', 'Credit', 'Description', 'BankName'],
+                   defaults=(ZERO, ZERO, '', ''))
+
+
+def record(transactions):
+    """Book bulk-created ``transactions`` (which skip the Transaction signals) to the ledger, rollups and journal."""
+    sums = defaultdict(lambda: EMPTY)
+    for tx in transactions:
+        key = tx.AccountID_id, local_date(tx.DateOfTransaction)
+        sums[key] = sums[key].plus(Totals(decimal(tx.Debit), decimal(tx.Credit), decimal(tx.TotalAmount), 1))
+    for book in BOOKKEEPERS:
+        book.apply_many(sums)
+    journal.post(transactions)
+    account_cache.invalidate_on_commit(*{account_id for account_id, _ in sums})
+
+
+def write(entries):
+    transactions = Transaction.objects.bulk_create([
+        Transaction(AccountID_id=entry.AccountID, DateOfTransaction=entry.DateOfTransaction,
+                    Description=entry.Description, BankName=entry.BankName,
+                    Debit=decimal(entry.Debit), Credit=decimal(entry.Credit),
+                    TotalAmount=decimal(entry.Credit) - decimal(entry.Debit))
+        for entry in entries
+    ])
+    record(transactions)
+    return transactions
+
+
+def post(entries, attempts=MAX_ATTEMPTS):
+    """Write ``entries`` as Transactions in one database transaction; returns the Transactions."""
+    entries = list(entries)
+    if not entries:
+        return []
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                return write(entries)
+        except OperationalError:
+            if attempt == attempts:
+                raise
+            # Back off a little, at random, so the writers that collided do not collide again.
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+class Poster:
+    """Collects entries and posts them ``batch_size`` at a time; posts the rest on ``flush`` or on exit."""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.pending = []
+        self.posted = 0
+
+    def add(self, account_id, when, debit=ZERO, credit=ZERO, description='', bank=''):
+        self.pending.append(Entry(account_id, when, debit, credit, description, bank))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        entries, self.pending = self.pending, []
+        self.posted += len(post(entries))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,121 @@
+"""Daily and monthly per-account totals.
+
+``PeriodRollup`` rows are maintained by the Transaction signals alongside the
+balance ledger. ``period_totals`` answers any date range from whole-month rows
+plus the daily rows of the partial months at either end, so statement
+generation reads O(periods) rows instead of every transaction.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+from ams.cache import account_cache, cached_per_account
+from .ledger import EMPTY, TOTAL_FIELDS, Totals, increments, local_date, month_end, sources, totals_from
+from .models import PeriodRollup
+
+
+def _rollups(account_id):
+    # From the primary: period_totals is cached, and the bookkeeping reads what it writes.
+    return PeriodRollup.objects.using(DEFAULT_DB_ALIAS).filter(AccountID_id=account_id)
+
+
+def apply(account_id, when, debit, credit, total, count=1, create=True):
+    day = local_date(when)
+    deltas = increments(debit, credit, total, count)
+    for granularity, start in ((PeriodRollup.DAY, day), (PeriodRollup.MONTH, day.replace(day=1))):
+        if create:
+            PeriodRollup.objects.get_or_create(AccountID_id=account_id, Granularity=granularity, PeriodStart=start)
+        _rollups(account_id).filter(Granularity=granularity, PeriodStart=start).update(**deltas)
+
+
+def apply_many(deltas):
+    """Bulk form of ``apply``: ``deltas`` maps ``(account_id, date)`` to the ``Totals`` to add."""
+    keyed = defaultdict(lambda: EMPTY)
+    for (account_id, day), totals in deltas.items():
+        day = local_date(day)
+        for key in ((account_id, PeriodRollup.DAY, day), (account_id, PeriodRollup.MONTH, day.replace(day=1))):
+            keyed[key] = keyed[key].plus(totals)
+
+    PeriodRollup.objects.bulk_create(
+        [PeriodRollup(AccountID_id=account_id, Granularity=granularity, PeriodStart=start)
+         for account_id, granularity, start in keyed],
+        ignore_conflicts=True,
+    )
+    rows = [
+        row for row in PeriodRollup.objects.select_for_update().filter(
+            AccountID_id__in={key[0] for key in keyed}, PeriodStart__in={key[2] for key in keyed},
+        )
+        if (row.AccountID_id, row.Granularity, row.PeriodStart) in keyed
+    ]
+    for row in rows:
+        Totals.of(row).plus(keyed[row.AccountID_id, row.Granularity, row.PeriodStart]).assign(row)
+    PeriodRollup.objects.bulk_update(rows, [*TOTAL_FIELDS, 'TransactionCount'])
+
+
+def _sum(queryset):
+    return totals_from(queryset.aggregate(
+        Debit=Sum('Debit'), Credit=Sum('Credit'), TotalAmount=Sum('TotalAmount'),
+        TransactionCount=Sum('TransactionCount'),
+    ))
+
+
+@cached_per_account('period')
+def period_totals(account_id, start, end):
+    """Totals for the transactions dated between ``start`` and ``end`` (inclusive dates)."""
+    if start > end:
+        return EMPTY
+    first_month = start if start.day == 1 else month_end(start) + timedelta(days=1)
+    last_month = end.replace(day=1) if end == month_end(end) else end.replace(day=1) - timedelta(days=1)
+    rollups = _rollups(account_id)
+
+    if first_month > last_month:
+        return _sum(rollups.filter(Granularity=PeriodRollup.DAY, PeriodStart__range=(start, end)))
+
+    months = _sum(rollups.filter(Granularity=PeriodRollup.MONTH, PeriodStart__range=(first_month, last_month)))
+    edges = _sum(rollups.filter(
+        Q(PeriodStart__range=(start, first_month - timedelta(days=1)))
+        | Q(PeriodStart__range=(month_end(last_month) + timedelta(days=1), end)),
+        Granularity=PeriodRollup.DAY,
+    ))
+    return months.plus(edges)
+
+
+def expected_rollups(account_id):
+    """``{(granularity, period_start): Totals}`` computed from the raw (hot and archived) transaction rows."""
+    result = defaultdict(lambda: EMPTY)
+    for rows in sources(account_id):
+        for granularity, trunc in ((PeriodRollup.DAY, TruncDate), (PeriodRollup.MONTH, TruncMonth)):
+            periods = (rows.annotate(Period=trunc('DateOfTransaction'))
+                       .values('Period')
+                       .annotate(Debit=Sum('Debit'), Credit=Sum('Credit'), TotalAmount=Sum('TotalAmount'),
+                                 TransactionCount=Count('pk')))
+            for row in periods:
+                key = granularity, local_date(row['Period'])
+                result[key] = result[key].plus(totals_from(row))
+    return dict(result)
+
+
+def rebuild(account_id):
+    expected = expected_rollups(account_id)
+    _rollups(account_id).delete()
+    PeriodRollup.objects.bulk_create(
+        PeriodRollup(AccountID_id=account_id, Granularity=granularity, PeriodStart=start, **totals._asdict())
+        for (granularity, start), totals in expected.items()
+    )
+    account_cache.invalidate_on_commit(account_id)
+
+
+def verify(account_id):
+    problems = []
+    expected = expected_rollups(account_id)
+    stored = {
+        (row['Granularity'], row['PeriodStart']): totals_from(row)
+        for row in _rollups(account_id).values('Granularity', 'PeriodStart', *TOTAL_FIELDS, 'TransactionCount')
+    }
+    for key in sorted(set(expected) | set(stored)):
+        if stored.get(key, EMPTY) != expected.get(key, EMPTY):
+            problems.append(f"{key[0]} rollup {key[1]}: stored {stored.get(key, EMPTY)} != {expected.get(key, EMPTY)}")
+    return problems
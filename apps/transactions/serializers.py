@@ -0,0 +1,34 @@
+from rest_framework import serializers
+
+from .models import Cash, CreditCard, Payment, Transaction
+
+
+class TransactionSerializer(serializers.ModelSerializer):
+    payments = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = ['TransactionID', 'AccountID', 'DateOfTransaction', 'Description', 'BankName',
+                  'Debit', 'Credit', 'TotalAmount', 'payments']
+
+
+class CreditCardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CreditCard
+        fields = ['CreditCardNo', 'BankCredit', 'NameCredit']
+
+
+class CashSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Cash
+        fields = ['CashTransactionNo', 'NameCash', 'CashTendered']
+
+
+class PaymentSerializer(serializers.ModelSerializer):
+    credit_card = CreditCardSerializer(many=True, read_only=True)
+    cash = CashSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Payment
+        fields = ['PaymentID', 'TransactionID', 'Currency', 'Amount', 'Method', 'credit_card', 'cash']
+        read_only_fields = ['Method']
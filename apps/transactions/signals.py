@@ -0,0 +1,113 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from ams.cache import account_cache
+from ams.fixtures import fixture_loaded
+from . import fx, ledger, payments, rollups
+from .models import Cash, CreditCard, FxRate, Payment, Transaction
+
+LEDGER_FIELDS = ('AccountID_id', 'DateOfTransaction', 'Debit', 'Credit', 'TotalAmount')
+
+# Every module here exposes ``apply(account_id, when, debit, credit, total, count, create)``
+# and its bulk form ``apply_many({(account_id, date): Totals})``.
+BOOKKEEPERS = (ledger, rollups)
+
+
+def ledger_values(instance):
+    return {field: getattr(instance, field) for field in LEDGER_FIELDS}
+
+
+def post(values, sign):
+    for book in BOOKKEEPERS:
+        book.apply(
+            values['AccountID_id'], values['DateOfTransaction'],
+            sign * ledger.decimal(values['Debit']),
+            sign * ledger.decimal(values['Credit']),
+            sign * ledger.decimal(values['TotalAmount']),
+            count=sign, create=sign > 0,
+        )
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_ledger_values(sender, instance, **kwargs):
+    instance._ledger_previous = None
+    if instance.pk is not None and not instance._state.adding:
+        # From the primary: the amounts reversed below must be the stored ones, not a lagging replica's.
+        instance._ledger_previous = (Transaction.objects.using(DEFAULT_DB_ALIAS).filter(pk=instance.pk)
+                                     .values(*LEDGER_FIELDS).first())
+
+
+@receiver(post_save, sender=Transaction)
+def update_ledger_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        post(previous, -1)
+    post(ledger_values(instance), 1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_ledger_on_delete(sender, instance, **kwargs):
+    post(ledger_values(instance), -1)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_transaction_account(sender, instance, **kwargs):
+    previous = getattr(instance, '_ledger_previous', None)
+    account_cache.invalidate_on_commit(instance.AccountID_id, *([previous['AccountID_id']] if previous else []))
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_payment_account(sender, instance, **kwargs):
+    account_id = (Transaction.objects.using(DEFAULT_DB_ALIAS).filter(pk=instance.TransactionID_id)
+                  .values_list('AccountID_id', flat=True).first())
+    if account_id is not None:
+        account_cache.invalidate_on_commit(account_id)
+
+
+@receiver(pre_save, sender=CreditCard)
+@receiver(pre_save, sender=Cash)
+def remember_payment(sender, instance, **kwargs):
+    instance._previous_payment = None
+    if not instance._state.adding:
+        instance._previous_payment = (sender.objects.using(DEFAULT_DB_ALIAS).filter(pk=instance.pk)
+                                      .values_list('PaymentID', flat=True).first())
+
+
+@receiver(post_save, sender=CreditCard)
+@receiver(post_save, sender=Cash)
+@receiver(post_delete, sender=CreditCard)
+@receiver(post_delete, sender=Cash)
+def update_payment_method(sender, instance, **kwargs):
+    payments.refresh_methods({instance.PaymentID_id, getattr(instance, '_previous_payment', None)} - {None})
+
+
+@receiver(fixture_loaded, sender=CreditCard)
+@receiver(fixture_loaded, sender=Cash)
+def update_payment_methods_after_fixture(sender, pks, using, **kwargs):
+    payment_ids = set()
+    for start in range(0, len(pks), 10_000):
+        payment_ids.update(sender.objects.using(using).filter(pk__in=pks[start:start + 10_000])
+                           .values_list('PaymentID', flat=True))
+    payments.refresh_methods(payment_ids)
+
+
+@receiver(post_save, sender=FxRate)
+@receiver(post_delete, sender=FxRate)
+@receiver(fixture_loaded, sender=FxRate)
+def invalidate_fx_rates(sender, **kwargs):
+    fx.invalidate_on_commit()
+
+
+@receiver(fixture_loaded, sender=Transaction)
+def rebuild_books_after_fixture(sender, pks, using, **kwargs):
+    # Rebuilt rather than incremented: a bulk load may have overwritten existing transactions.
+    accounts = set()
+    for start in range(0, len(pks), 10_000):
+        accounts.update(Transaction.objects.using(using).filter(pk__in=pks[start:start + 10_000])
+                        .values_list('AccountID_id', flat=True).distinct())
+    for account_id in sorted(accounts):
+        for book in BOOKKEEPERS:
+            book.rebuild(account_id)
@@ -1,3 +1,596 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Permission
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ams import export
+from ams.testing import AdminTestMixin, QueryPlanMixin, make_account, make_report, make_transaction
+from apps.users.models import AmsUser
+from . import archive, fx, importer, ledger, payments, posting, rollups
+from .models import AccountBalance, ArchivedTransaction, Cash, CreditCard, FxRate, Payment, Transaction
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+
+    def test_insert_update_delete_keep_balance_in_sync(self):
+        tx = make_transaction(self.account, credit=100)
+        make_transaction(self.account, debit=30)
+        self.assertEqual(ledger.current_balance(self.account.pk).Balance, Decimal('70.00'))
+
+        tx.Credit = Decimal('150.00')
+        tx.DateOfTransaction = aware(2025, 3, 1)
+        tx.save()
+        self.assertEqual(ledger.current_balance(self.account.pk).Balance, Decimal('120.00'))
+
+        tx.delete()
+        totals = ledger.current_balance(self.account.pk)
+        self.assertEqual(totals.Balance, Decimal('-30.00'))
+        self.assertEqual(totals.TransactionCount, 1)
+        self.assertEqual(ledger.verify(self.account.pk), [])
+
+    def test_balance_as_of_uses_checkpoints(self):
+        make_transaction(self.account, aware(2025, 1, 10), credit=100)
+        make_transaction(self.account, aware(2025, 2, 5), debit=40)
+        make_transaction(self.account, aware(2025, 2, 20), credit=10)
+        make_transaction(self.account, aware(2025, 4, 1), credit=5)
+
+        self.assertEqual(ledger.balance_as_of(self.account.pk, date(2024, 12, 31)).Balance, 0)
+        self.assertEqual(ledger.balance_as_of(self.account.pk, date(2025, 1, 31)).Balance, Decimal('100.00'))
+        self.assertEqual(ledger.balance_as_of(self.account.pk, date(2025, 2, 10)).Balance, Decimal('60.00'))
+        self.assertEqual(ledger.balance_as_of(self.account.pk, date(2025, 3, 15)).Balance, Decimal('70.00'))
+        self.assertEqual(ledger.balance_as_of(self.account.pk, aware(2025, 4, 1, 12)).Balance, Decimal('75.00'))
+        self.assertEqual(ledger.verify(self.account.pk), [])
+
+    def test_rebuild_balances_command_detects_and_repairs_drift(self):
+        make_transaction(self.account, credit=100)
+        AccountBalance.objects.filter(pk=self.account.pk).update(Credit=1)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_balances', '--verify', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_balances', self.account.pk, stdout=StringIO())
+        self.assertEqual(ledger.verify(self.account.pk), [])
+
+
+class ReplicaReadTests(TransactionTestCase):
+    # Outside a transaction, where the router would send plain reads to the replica.
+    databases = {'default', 'replica'}
+
+    def test_bookkeeping_and_cached_reads_use_the_primary(self):
+        tx = make_transaction(credit=100)
+        with self.assertNumQueries(0, using='replica'):
+            tx.Credit = Decimal('150.00')
+            tx.save()
+            make_transaction(tx.AccountID, aware(2025, 5, 1), debit=20)
+            self.assertEqual(ledger.current_balance.uncached(tx.AccountID_id).Balance, Decimal('130.00'))
+            rollups.period_totals.uncached(tx.AccountID_id, date(2025, 1, 1), date(2025, 12, 31))
+
+
+class PeriodRollupTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+
+    def test_period_totals_combine_months_and_edge_days(self):
+        make_transaction(self.account, aware(2025, 1, 15), credit=1)
+        make_transaction(self.account, aware(2025, 2, 1), credit=10)
+        make_transaction(self.account, aware(2025, 3, 31), credit=100)
+        tx = make_transaction(self.account, aware(2025, 4, 2), debit=1000)
+
+        self.assertEqual(rollups.period_totals(self.account.pk, date(2025, 1, 16), date(2025, 4, 1)).Credit,
+                         Decimal('110.00'))
+        self.assertEqual(rollups.period_totals(self.account.pk, date(2025, 1, 1), date(2025, 4, 30)).Balance,
+                         Decimal('-889.00'))
+
+        tx.delete()
+        self.assertEqual(rollups.period_totals(self.account.pk, date(2025, 4, 1), date(2025, 4, 30)).TransactionCount, 0)
+        self.assertEqual(rollups.verify(self.account.pk), [])
+
+
+class TransactionQueryPlanTests(QueryPlanMixin, AdminTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = make_account()
+        for month in range(1, 13):
+            make_transaction(cls.account, aware(2025, month, 10), credit=month)
+
+    def test_changelist_filters_use_indexes(self):
+        for params in [
+            {'BankName__exact': 'Demo Bank'},
+            {'DateOfTransaction__year': '2025'},
+            {'DateOfTransaction__year': '2025', 'DateOfTransaction__month': '3'},
+            {'DateOfTransaction__year': '2025', 'DateOfTransaction__month': '3', 'DateOfTransaction__day': '10'},
+            {'BankName__exact': 'Demo Bank', 'DateOfTransaction__year': '2025', 'DateOfTransaction__month': '3'},
+        ]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.changelist(Transaction, **params).queryset)
+
+    def test_filter_sidebar_and_date_hierarchy_use_indexes(self):
+        self.assertUsesIndex(Transaction.objects.distinct().order_by('BankName').values_list('BankName'))
+        self.assertUsesIndex(Transaction.objects.datetimes('DateOfTransaction', 'year'))
+        self.assertUsesIndex(Transaction.objects.filter(
+            DateOfTransaction__gte=aware(2025, 1, 1), DateOfTransaction__lt=aware(2026, 1, 1),
+        ).datetimes('DateOfTransaction', 'month'))
+
+    def test_account_history_uses_index(self):
+        self.assertUsesIndex(Transaction.objects.filter(
+            AccountID=self.account, DateOfTransaction__gte=aware(2025, 6, 1),
+        ).order_by('DateOfTransaction'))
+
+
+class TransactionAdminQueryTests(AdminTestMixin, TestCase):
+    def add_payments(self, count):
+        return [Payment.objects.create(TransactionID=make_transaction(), Amount=10) for _ in range(count)]
+
+    def test_transaction_changelist(self):
+        self.assertChangelistQueriesConstant(
+            Transaction, lambda count: [make_transaction(credit=1) for _ in range(count)])
+
+    def test_payment_changelist(self):
+        self.assertChangelistQueriesConstant(Payment, self.add_payments)
+
+    def test_credit_card_changelist(self):
+        self.assertChangelistQueriesConstant(CreditCard, lambda count: [
+            CreditCard.objects.create(CreditCardNo=f'4000-{payment.pk}', PaymentID=payment,
+                                      BankCredit='Demo Bank', NameCredit='Demo')
+            for payment in self.add_payments(count)
+        ])
+
+    def test_cash_changelist(self):
+        self.assertChangelistQueriesConstant(Cash, lambda count: [
+            Cash.objects.create(CashTransactionNo=f'C-{payment.pk}', PaymentID=payment,
+                                NameCash='Demo', CashTendered=10)
+            for payment in self.add_payments(count)
+        ])
+
+
+class TransactionSearchTests(AdminTestMixin, TestCase):
+    def search(self, text):
+        return set(self.changelist(Transaction, q=text).queryset.values_list('pk', flat=True))
+
+    def test_admin_search_uses_full_text_index(self):
+        coffee = make_transaction(Description='Coffee beans from the corner roastery')
+        rent = make_transaction(Description='Office rent for March')
+        bulk = Transaction.objects.bulk_create([
+            Transaction(AccountID=coffee.AccountID, BankName='Demo Bank', TotalAmount=0, Description='Bulk coffee order'),
+        ])[0]
+
+        self.assertEqual(self.search('coffee'), {coffee.pk, bulk.pk})
+        self.assertEqual(self.search('roast'), {coffee.pk})
+        self.assertEqual(self.search('office march'), {rent.pk})
+        self.assertEqual(self.search(str(rent.pk)), {rent.pk})
+
+        rent.Description = 'Office rent for April'
+        rent.save()
+        coffee.delete()
+        self.assertEqual(self.search('march'), set())
+        self.assertEqual(self.search('april'), {rent.pk})
+        self.assertEqual(self.search('coffee'), {bulk.pk})
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        self.old = make_transaction(self.account, aware(2024, 3, 5), credit=100, Description='March rent')
+        payment = Payment.objects.create(TransactionID=self.old, Amount=100)
+        CreditCard.objects.create(CreditCardNo='4111', PaymentID=payment, BankCredit='Demo', NameCredit='A')
+        self.reported = make_transaction(self.account, aware(2024, 3, 20), debit=30)
+        make_report(self.account, self.reported)
+        self.recent = make_transaction(self.account, aware(2024, 4, 2), debit=5)
+
+    def test_archive_keeps_balances_rollups_and_history(self):
+        result = archive.archive_period(date(2024, 3, 1), date(2024, 3, 31))
+
+        self.assertEqual(result, (1, 1))
+        self.assertFalse(Transaction.objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(ArchivedTransaction.objects.get().Payments[0]['credit_card'][0]['CreditCardNo'], '4111')
+        self.assertEqual(ledger.current_balance(self.account.pk).Balance, Decimal('65.00'))
+        self.assertEqual(ledger.balance_as_of(self.account.pk, aware(2024, 3, 10)).Balance, Decimal('100.00'))
+        self.assertEqual(ledger.verify(self.account.pk) + rollups.verify(self.account.pk), [])
+        self.assertEqual([row['TransactionID'] for row in archive.history(self.account.pk)],
+                         [self.old.pk, self.reported.pk, self.recent.pk])
+        with self.assertNumQueries(2):  # the archived-period check, then the hot table only
+            self.assertEqual(len(archive.history(self.account.pk, start=date(2024, 4, 1))), 1)
+
+    def test_restore_brings_rows_back(self):
+        call_command('archive_transactions', '2024-03-01', '2024-03-31', stdout=StringIO())
+        call_command('archive_transactions', '2024-03-01', '2024-03-31', '--restore', stdout=StringIO())
+
+        self.assertEqual(Transaction.objects.get(pk=self.old.pk).Description, 'March rent')
+        self.assertEqual(CreditCard.objects.get().PaymentID.TransactionID_id, self.old.pk)
+        self.assertFalse(ArchivedTransaction.objects.exists())
+        self.assertEqual(ledger.verify(self.account.pk) + rollups.verify(self.account.pk), [])
+
+    def test_open_period_is_refused(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_transactions', '2024-01-01', str(timezone.localdate()), stdout=StringIO())
+
+
+class StatementImportTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def test_csv_import_writes_transactions_payments_and_ledger(self):
+        make_transaction(self.account, aware(2024, 12, 1), credit=5)
+        make_transaction(self.account, aware(2025, 3, 1), debit=5)
+        path = self.write('statement.csv', (
+            "AccountID,DateOfTransaction,Description,BankName,Debit,Credit,Currency,Amount\n"
+            f"{self.account.pk},2025-01-05,Salary,Demo Bank,,1000.00,USD,1000\n"
+            f"{self.account.pk},2025-01-06T10:30:00,Groceries,Demo Bank,45.50,,,\n"
+            f"{self.account.pk},not-a-date,Broken,Demo Bank,1,,,\n"
+            "999999,2025-01-07,Unknown account,Demo Bank,1,,,\n"
+        ))
+        errors = []
+        result = importer.import_file(path, batch_size=2, on_error=errors.append)
+
+        self.assertEqual((result.rows, result.rejected), (2, 2))
+        self.assertEqual(sorted(e.position for e in errors), [3, 4])
+        self.assertEqual(Payment.objects.filter(TransactionID__AccountID=self.account).count(), 1)
+        self.assertEqual(ledger.current_balance(self.account.pk).Balance, Decimal('954.50'))
+        self.assertEqual(ledger.balance_as_of(self.account.pk, date(2025, 1, 31)).Balance, Decimal('959.50'))
+        self.assertEqual(ledger.verify(self.account.pk) + rollups.verify(self.account.pk), [])
+
+    def test_jsonl_and_ofx_import(self):
+        jsonl = self.write('statement.jsonl', (
+            f'{{"AccountID": {self.account.pk}, "DateOfTransaction": "2025-02-01", "BankName": "Demo Bank", "Credit": 10}}\n'
+            '{not json}\n'
+        ))
+        ofx = self.write('statement.ofx', (
+            "OFXHEADER:100\n<OFX><SIGNONMSGSRSV1><SONRS><FI><ORG>Demo Bank</FI></SONRS></SIGNONMSGSRSV1>"
+            "<BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>EUR<BANKTRANLIST>\n"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250203120000<TRNAMT>-12.30<NAME>Coffee</STMTTRN>\n"
+            "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250204<TRNAMT>100.00<NAME>Refund<MEMO>Order 7</STMTTRN>\n"
+            "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+        ))
+
+        self.assertEqual(importer.import_file(jsonl)[:2], (1, 1))
+        self.assertEqual(importer.import_file(ofx, account=self.account.pk)[:2], (2, 0))
+        refund = Transaction.objects.get(Description='Refund Order 7')
+        self.assertEqual((refund.Credit, refund.BankName), (Decimal('100.00'), 'Demo Bank'))
+        self.assertEqual(refund.payments.get().Currency, 'EUR')
+        self.assertEqual(ledger.current_balance(self.account.pk).Balance, Decimal('97.70'))
+
+    def test_import_resumes_after_crash(self):
+        path = self.write('statement.csv', "AccountID,DateOfTransaction,BankName,Credit\n" + "".join(
+            f"{self.account.pk},2025-03-{day:02d},Demo Bank,1\n" for day in range(1, 8)
+        ))
+
+        def crash(rows, rejected, seconds):
+            raise RuntimeError("worker killed")
+
+        with self.assertRaises(RuntimeError):
+            importer.import_file(path, batch_size=3, on_batch=crash)
+        self.assertEqual(Transaction.objects.count(), 3)
+
+        self.assertEqual(importer.import_file(path, batch_size=3).rows, 4)
+        self.assertEqual(importer.import_file(path, batch_size=3).rows, 0)
+        self.assertEqual(Transaction.objects.count(), 7)
+
+
+class PostingTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        self.other = make_account()
+
+    def test_post_coalesces_a_batch_into_one_balance_write_per_account(self):
+        entries = [posting.Entry(self.account.pk, aware(2025, 1, day), Credit=Decimal('10.00')) for day in (1, 2, 3)]
+        entries.append(posting.Entry(self.other.pk, aware(2025, 1, 1), Debit=Decimal('4.00')))
+        with CaptureQueriesContext(connection) as queries:
+            posted = posting.post(entries)
+        self.assertEqual(len(posted), 4)
+        self.assertEqual(sum('UPDATE "transactions_accountbalance"' in q['sql'] for q in queries.captured_queries), 2)
+
+        balance = AccountBalance.objects.get(AccountID=self.account)
+        self.assertEqual((balance.Credit, balance.TransactionCount, balance.Version), (Decimal('30.00'), 3, 1))
+        self.assertEqual(ledger.current_balance(self.other.pk).Balance, Decimal('-4.00'))
+        self.assertEqual(rollups.period_totals(self.account.pk, date(2025, 1, 1), date(2025, 1, 31)).Credit,
+                         Decimal('30.00'))
+        self.assertEqual(ledger.verify(self.account.pk), [])
+
+    def test_a_balance_changed_by_another_writer_is_read_again(self):
+        make_transaction(self.account, credit=100)
+        filter_balances = AccountBalance.objects.filter
+        interfered = []
+
+        def filter_interleaved(*args, **kwargs):
+            if 'Version' in kwargs and not interfered:
+                # Another writer posts between this batch's read and its conditional write.
+                interfered.append(True)
+                ledger.apply(self.account.pk, aware(2025, 1, 1), ledger.ZERO, Decimal('5.00'), Decimal('5.00'))
+            return filter_balances(*args, **kwargs)
+
+        with mock.patch.object(AccountBalance.objects, 'filter', side_effect=filter_interleaved):
+            ledger.add_to_balances({self.account.pk: ledger.Totals(ledger.ZERO, Decimal('1.00'), Decimal('1.00'), 1)})
+        totals = ledger.current_balance.uncached(self.account.pk)
+        self.assertEqual((totals.Credit, totals.TransactionCount), (Decimal('106.00'), 3))
+
+        interfered.clear()
+        with mock.patch.object(AccountBalance.objects, 'filter', side_effect=filter_interleaved):
+            with self.assertRaises(ledger.StaleBalance):
+                ledger.add_to_balances({self.account.pk: ledger.Totals(ledger.ZERO, ledger.ZERO, ledger.ZERO, 1)},
+                                       retries=0)
+
+    def test_a_checkpoint_created_by_another_writer_is_added_to(self):
+        make_transaction(self.account, aware(2025, 1, 10), credit=100)
+        bulk_create = ledger.BalanceCheckpoint.objects.bulk_create
+
+        def create_interleaved(objs, **kwargs):
+            # Another writer opens March between this batch's read and its insert.
+            make_transaction(self.account, aware(2025, 3, 20), credit=7)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(ledger.BalanceCheckpoint.objects, 'bulk_create', side_effect=create_interleaved):
+            posting.post([posting.Entry(self.account.pk, aware(2025, 3, 5), Credit=Decimal('3.00'))])
+        march = ledger.BalanceCheckpoint.objects.get(AccountID=self.account, PeriodEnd=date(2025, 3, 31))
+        self.assertEqual((march.Credit, march.TransactionCount), (Decimal('110.00'), 3))
+        self.assertEqual(ledger.verify(self.account.pk), [])
+
+    def test_poster_posts_in_batches_and_on_exit(self):
+        with posting.Poster(batch_size=2) as poster:
+            for day in (1, 2, 3):
+                poster.add(self.account.pk, aware(2025, 2, day), debit=Decimal('1.50'))
+            self.assertEqual(poster.posted, 2)
+        self.assertEqual(poster.posted, 3)
+        self.assertEqual(ledger.current_balance(self.account.pk).Debit, Decimal('4.50'))
+
+
+class TransactionExportTests(AdminTestMixin, TestCase):
+    def test_keyset_pages_cover_every_row_once(self):
+        rows = [make_transaction(credit=n, Description=f'row {n}') for n in range(7)]
+        with self.assertNumQueries(4):
+            exported = list(export.iter_rows(Transaction.objects.all(), ['Description'], chunk_size=2))
+        self.assertEqual(exported, [(tx.Description,) for tx in rows])
+
+    def test_admin_action_streams_filtered_selection(self):
+        keep = make_transaction(credit=1, BankName='Keep Bank')
+        make_transaction(credit=2, BankName='Other Bank')
+        self.client.force_login(self.admin_user())
+
+        response = self.client.post(
+            reverse('admin:transactions_transaction_changelist') + '?BankName__exact=Keep+Bank',
+            {'action': 'export_jsonl', 'select_across': '1', 'index': '0', '_selected_action': [keep.pk]},
+        )
+        self.assertTrue(response.streaming)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(line['TransactionID'], line['AccountID']) for line in lines],
+                         [(keep.pk, keep.AccountID_id)])
+
+
+class TransactionApiTests(AdminTestMixin, TestCase):
+    def setUp(self):
+        self.account = make_account()
+        for n in range(5):
+            tx = make_transaction(self.account, aware(2025, 1, n + 1), credit=n)
+            Payment.objects.create(TransactionID=tx, Amount=n)
+        make_transaction(make_account(), aware(2025, 1, 1), credit=99)
+
+    def test_cursor_pages_walk_all_rows_with_constant_queries(self):
+        self.client.force_login(self.admin_user())
+        url = reverse('transaction-list', kwargs={'version': 'v1'}) + '?page_size=2'
+        seen, query_counts = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(url).json()
+            query_counts.append(len(queries))
+            seen += [row['TransactionID'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted(Transaction.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(set(query_counts)), 1)
+
+    def test_filters_and_account_scoping(self):
+        self.client.force_login(self.account)
+        url = reverse('transaction-list', kwargs={'version': 'v1'})
+        rows = self.client.get(url, {'DateOfTransaction__gte': '2025-01-03'}).json()['results']
+        self.assertEqual([row['Credit'] for row in rows], ['2.00', '3.00', '4.00'])
+        self.assertTrue(all(row['AccountID'] == self.account.pk for row in rows))
+
+        payments = self.client.get(reverse('payment-list', kwargs={'version': 'v1'})).json()['results']
+        self.assertEqual(len(payments), 5)
+
+    def test_non_staff_writes_cannot_point_at_other_accounts(self):
+        self.account.user_permissions.add(*Permission.objects.filter(codename__in=['add_transaction', 'add_payment']))
+        other_tx = Transaction.objects.exclude(AccountID=self.account).get()
+        own_tx = Transaction.objects.filter(AccountID=self.account).first()
+        self.client.force_login(self.account)
+        url = reverse('transaction-list', kwargs={'version': 'v1'})
+        row = {'DateOfTransaction': '2025-02-01T00:00:00Z', 'BankName': 'Demo Bank', 'TotalAmount': '1.00'}
+
+        response = self.client.post(url, {**row, 'AccountID': other_tx.AccountID_id})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('AccountID', response.json())
+        self.assertEqual(self.client.post(url, {**row, 'AccountID': self.account.pk}).status_code, 201)
+
+        url = reverse('payment-list', kwargs={'version': 'v1'})
+        self.assertEqual(self.client.post(url, {'TransactionID': other_tx.pk, 'Amount': '1.00'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'TransactionID': own_tx.pk, 'Amount': '1.00'}).status_code, 201)
+
+    def test_api_docs_are_built_on_first_request_for_staff_only(self):
+        url = reverse('api-docs', kwargs={'version': 'v1'})
+        self.client.force_login(self.account)
+        self.assertEqual(self.client.get(url, {'format': 'openapi'}).status_code, 403)
+        self.client.force_login(self.admin_user())
+        schema = self.client.get(url, {'format': 'openapi'}).json()
+        self.assertIn('/transactions/', schema['paths'])
+
+
+class AsyncAccountViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = make_account()
+        for day in range(1, 4):
+            make_transaction(cls.account, aware(2025, 5, day), credit=10 * day, Description=f'day {day}')
+
+    async def test_balance_and_latest_transactions(self):
+        await self.async_client.aforce_login(self.account)
+        balance = await self.async_client.get(
+            reverse('account-balance', kwargs={'version': 'v1', 'account_id': self.account.pk}))
+        self.assertEqual(balance.json()['Balance'], '60.00')
+
+        latest = await self.async_client.get(
+            reverse('account-latest-transactions', kwargs={'version': 'v1', 'account_id': self.account.pk}),
+            {'limit': 2})
+        self.assertEqual([row['Description'] for row in latest.json()['results']], ['day 3', 'day 2'])
+
+    async def test_latest_transactions_rejects_a_limit_below_one(self):
+        await self.async_client.aforce_login(self.account)
+        url = reverse('account-latest-transactions', kwargs={'version': 'v1', 'account_id': self.account.pk})
+        for limit in (0, -5, 'x'):
+            self.assertEqual((await self.async_client.get(url, {'limit': limit})).status_code, 400)
+
+    async def test_other_accounts_are_hidden(self):
+        url = reverse('account-balance', kwargs={'version': 'v1', 'account_id': self.account.pk})
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(url, headers={'authorization': 'Bearer nope'})).status_code, 401)
+
+        other = await AmsUser.objects.acreate(username='async-other')
+        await self.async_client.aforce_login(other)
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+        own = reverse('account-balance', kwargs={'version': 'v1', 'account_id': other.pk})
+        self.assertEqual((await self.async_client.get(own)).json()['TransactionCount'], 0)
+
+
+class PaymentMethodTests(TestCase):
+    def pay(self, bank='Demo Bank', amount=10, card=False, cash=False, when=None):
+        payment = Payment.objects.create(TransactionID=make_transaction(when=when, BankName=bank), Amount=amount)
+        if card:
+            CreditCard.objects.create(CreditCardNo=f'4000-{payment.pk}', PaymentID=payment, BankCredit='Visa',
+                                      NameCredit='A')
+        if cash:
+            Cash.objects.create(CashTransactionNo=f'C-{payment.pk}', PaymentID=payment, NameCash='B',
+                                CashTendered=amount)
+        return payment
+
+    def method(self, payment):
+        return Payment.objects.values_list('Method', flat=True).get(pk=payment.pk)
+
+    def test_method_follows_detail_rows(self):
+        payment, other = self.pay(card=True), self.pay()
+        self.assertEqual(self.method(payment), Payment.CARD)
+        self.assertEqual(self.method(other), Payment.NONE)
+        Cash.objects.create(CashTransactionNo='C-x', PaymentID=payment, NameCash='B', CashTendered=1)
+        self.assertEqual(self.method(payment), Payment.MIXED)
+
+        card = CreditCard.objects.get(PaymentID=payment)
+        card.PaymentID = other
+        card.save()
+        self.assertEqual((self.method(payment), self.method(other)), (Payment.CASH, Payment.CARD))
+        Cash.objects.filter(PaymentID=payment).delete()
+        self.assertEqual(self.method(payment), Payment.NONE)
+
+    def test_archive_round_trip_keeps_method(self):
+        payment = self.pay(cash=True, when=aware(2024, 1, 5))
+        archive.archive_period(date(2024, 1, 5), date(2024, 1, 5))
+        archive.restore_period(date(2024, 1, 5), date(2024, 1, 5))
+        self.assertEqual(self.method(payment), Payment.CASH)
+
+    def test_with_details_loads_each_detail_table_once(self):
+        cards = [self.pay(card=True) for _ in range(3)]
+        self.pay()
+        [self.pay(cash=True) for _ in range(5)]
+        with self.assertNumQueries(3):
+            page = list(Payment.objects.with_details().filter(pk__gte=cards[0].pk)[:20])
+            self.assertEqual([len(p.credit_card.all()) + len(p.cash.all()) for p in page], [1, 1, 1, 0, 1, 1, 1, 1, 1])
+        with self.assertNumQueries(3):
+            self.assertEqual(sum(len(p.cash.all()) for p in Payment.objects.with_details().iterator(chunk_size=100)), 5)
+
+    def test_payment_api_queries_are_constant(self):
+        def fetch():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('payment-list', kwargs={'version': 'v1'})).json()
+            return len(queries)
+
+        self.client.force_login(AdminTestMixin.admin_user())
+        self.pay(card=True), self.pay(cash=True)
+        baseline = fetch()
+        [self.pay(card=True, cash=True) for _ in range(10)]
+        self.assertEqual(fetch(), baseline)
+
+    def test_method_totals_per_bank(self):
+        self.pay('North', 10, card=True)
+        self.pay('North', 5, card=True)
+        self.pay('North', 7, cash=True)
+        self.pay('South', 30, cash=True)
+        with self.assertNumQueries(1):
+            rows = payments.method_totals(Payment.objects.all())
+        self.assertEqual([tuple(row) for row in rows], [
+            ('South', Payment.CASH, 'USD', 1, Decimal('30')),
+            ('North', Payment.CARD, 'USD', 2, Decimal('15')),
+            ('North', Payment.CASH, 'USD', 1, Decimal('7')),
+        ])
+        with override_settings(AMS_FX_BASE='USD'):
+            converted = payments.method_totals(Payment.objects.filter(TransactionID__BankName='North'), 'USD')
+        self.assertEqual([(row.method, row.total) for row in converted],
+                         [(Payment.CARD, Decimal('15.00')), (Payment.CASH, Decimal('7.00'))])
+
+
+@override_settings(AMS_FX_BASE='USD')
+class FxConversionTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        self.write_rates('Date,EUR,JPY,\n2025-03-07,0.5,100,\n2025-03-10,0.8,N/A,\n', inverse=True)
+
+    def write_rates(self, text, inverse=False):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'rates.csv'
+            path.write_text(text)
+            with self.captureOnCommitCallbacks(execute=True):
+                return fx.load_rates(path, inverse=inverse)
+
+    def pay(self, when, currency, amount):
+        return Payment.objects.create(TransactionID=make_transaction(self.account, when), Currency=currency,
+                                      Amount=amount)
+
+    def test_loads_wide_and_long_files(self):
+        self.assertEqual(FxRate.objects.get(Currency='EUR', RateDate=date(2025, 3, 7)).Rate, Decimal(2))
+        self.assertEqual(FxRate.objects.get(Currency='JPY', RateDate=date(2025, 3, 7)).Rate, Decimal('0.01'))
+        self.assertFalse(FxRate.objects.filter(Currency='JPY', RateDate=date(2025, 3, 10)).exists())
+        self.assertEqual(self.write_rates('Currency,Date,Rate\neur,2025-03-10,1.5\n'), 1)
+        self.assertEqual(FxRate.objects.get(Currency='EUR', RateDate=date(2025, 3, 10)).Rate, Decimal('1.5'))
+
+    def test_totals_use_the_latest_rate_on_or_before_each_payment(self):
+        self.pay(aware(2025, 3, 8, 12), 'EUR', 10)   # Saturday: Friday's rate, 2
+        self.pay(aware(2025, 3, 10, 9), 'EUR', 10)   # Monday: 1.25
+        self.pay(aware(2025, 3, 10, 9), 'JPY', 1000)  # no Monday quote: Friday's, 0.01
+        self.pay(aware(2025, 3, 10, 9), 'USD', 5)
+        payments = Payment.objects.all()
+        self.assertEqual(fx.totals(payments), Decimal('47.50'))
+        # JPY crosses at Friday's EUR rate; USD converts at Monday's.
+        self.assertEqual(fx.totals(payments, 'EUR'), Decimal('29.00'))
+        self.assertEqual(fx.totals(payments, group_by=['Currency']),
+                         {('EUR',): Decimal('32.50'), ('JPY',): Decimal('10.00'), ('USD',): Decimal('5.00')})
+
+    def test_payment_before_the_first_rate_is_reported(self):
+        self.pay(aware(2025, 3, 1), 'EUR', 10)
+        with self.assertRaisesMessage(fx.MissingRate, 'EUR'):
+            fx.totals(Payment.objects.all())
+
+    def test_rate_table_is_reloaded_when_rates_change(self):
+        self.assertEqual(fx.rate_table().rate('EUR', date(2025, 3, 12)), Decimal('1.25'))
+        with self.captureOnCommitCallbacks(execute=True):
+            FxRate.objects.create(Currency='EUR', RateDate=date(2025, 3, 11), Rate=3)
+        self.assertEqual(fx.rate_table().rate('EUR', date(2025, 3, 12)), Decimal(3))
+        with self.assertNumQueries(0):
+            fx.rate_table()
@@ -1,3 +1,59 @@
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from ams.api import AccountScopedModelViewSet, async_account_view
+from apps.users.models import AmsUser
+from .ledger import acurrent_balance
+from .models import Payment, Transaction
+from .serializers import PaymentSerializer, TransactionSerializer
+
+
+class TransactionViewSet(AccountScopedModelViewSet):
+    queryset = Transaction.objects.prefetch_related('payments')
+    serializer_class = TransactionSerializer
+    related_account_lookups = {'AccountID': 'pk'}
+    # Each filter is served by an index: (AccountID, DateOfTransaction), (BankName, DateOfTransaction)
+    # and (DateOfTransaction).
+    filterset_fields = {
+        'AccountID': ['exact'],
+        'BankName': ['exact'],
+        'DateOfTransaction': ['gte', 'lt'],
+    }
+
+
+class PaymentViewSet(AccountScopedModelViewSet):
+    queryset = Payment.objects.with_details()
+    serializer_class = PaymentSerializer
+    account_lookup = 'TransactionID__AccountID'
+    related_account_lookups = {'TransactionID': 'AccountID'}
+    filterset_fields = ['TransactionID']
+
+
+LATEST_LIMIT = 100
+
+
+@require_GET
+@async_account_view
+async def account_balance(request, user, version, account_id):
+    totals = await acurrent_balance(account_id)
+    if not totals.TransactionCount and not await AmsUser.objects.filter(pk=account_id).aexists():
+        return JsonResponse({'detail': "Not found."}, status=404)
+    return JsonResponse({'AccountID': account_id, 'Balance': totals.Balance, **totals._asdict()})
+
+
+@require_GET
+@async_account_view
+async def latest_transactions(request, user, version, account_id):
+    try:
+        limit = min(int(request.GET.get('limit', 20)), LATEST_LIMIT)
+    except ValueError:
+        return JsonResponse({'detail': "limit must be an integer."}, status=400)
+    if limit < 1:
+        return JsonResponse({'detail': "limit must be at least 1."}, status=400)
+    # Served backwards by the (AccountID, DateOfTransaction) index.
+    rows = (Transaction.objects.filter(AccountID_id=account_id)
+            .order_by('-DateOfTransaction', '-TransactionID')
+            .values('TransactionID', 'DateOfTransaction', 'Description', 'BankName',
+                    'Debit', 'Credit', 'TotalAmount'))
+    results = [row async for row in rows[:limit]]
+    return JsonResponse({'AccountID': account_id, 'results': results})
@@ -6,11 +6,22 @@ from .models import AmsUser
 
 @admin.register(AmsUser)
 class AmsUserAdmin(UserAdmin):
-    list_display = ['username', 'first_name', 'last_name', 'email', 'Permissions', 'Status']
-    list_filter = ['Permissions', 'Status', 'is_staff', 'is_active']
+    list_display = ['username', 'first_name', 'last_name', 'email', 'Permissions', 'Status',
+                    'summary__TransactionCount', 'summary__Balance', 'summary__LastTransactionAt']
+    list_filter = ['Permissions', 'Status', 'is_staff', 'is_active', 'summary__LastTransactionAt']
+    list_select_related = ['summary']
     search_fields = ['username', 'first_name', 'last_name', 'email', ]
     
     # Add custom fields to the form
     fieldsets = UserAdmin.fieldsets + (
         ('Custom Fields', {'fields': ( 'Permissions', 'Status')}),
-    )
\ No newline at end of file
+    )
+    # Fields that decide what a user may do; only superusers may change them.
+    authorization_fields = ['is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions',
+                            'Permissions', 'Status']
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly = super().get_readonly_fields(request, obj)
+        if request.user.is_superuser:
+            return readonly
+        return [*readonly, *self.authorization_fields]
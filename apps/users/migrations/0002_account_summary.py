@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.users import summary
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('transactions', '0007_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountSummary',
+            fields=[
+                ('AccountID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('TransactionCount', models.PositiveIntegerField(default=0)),
+                ('LastTransactionAt', models.DateTimeField(blank=True, null=True)),
+                ('Balance', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+            ],
+            options={
+                'verbose_name_plural': 'account summaries',
+            },
+        ),
+        migrations.RunPython(summary.install, summary.uninstall),
+    ]
@@ -24,4 +24,19 @@ class AmsUser(AbstractUser):  # or Account - whatever you named it
     )
 
     def __str__(self):
-        return f"{self.first_name} {self.last_name}"  # Use lowercase (Django's built-in)
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}"  # Use lowercase (Django's built-in)
+
+
+# Per-account summary for list screens, over hot and archived transactions. Written only by the
+# database triggers installed in apps/users/summary.py, so it also follows bulk_create and raw SQL.
+class AccountSummary(models.Model):
+    AccountID = models.OneToOneField(AmsUser, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    TransactionCount = models.PositiveIntegerField(default=0)
+    LastTransactionAt = models.DateTimeField(null=True, blank=True)
+    Balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    class Meta:
+        verbose_name_plural = 'account summaries'
+
+    def __str__(self):
+        return f"Summary {self.AccountID_id}"
@@ -0,0 +1,169 @@
+"""Effective permissions of AmsUsers as cached bitsets.
+
+A user's permissions come from three places:
+- their role (``AmsUser.Permissions``), if ``AMS_PERMISSIONS['ROLES']`` maps
+  it to actions, which it grants on every model of ``APPS``;
+- their groups;
+- their own ``user_permissions``.
+Roles are opt-in: ``ROLES`` is empty unless settings fill it, since every
+new user gets the role ``viewer``. Roles never grant anything in
+``PROTECTED_APPS``, even if ``APPS`` names them, so no role can edit users,
+groups or permissions and promote anyone.
+``permission_bits`` compiles all three into one integer, with bit ``n`` set
+for the Permission whose primary key is ``n``. The integer is cached per user
+in ``permission_cache``, an ``ams.cache.AccountCache`` with its own versions,
+so a transaction posted to the account does not evict it. Revocations reach
+other processes through the shared cache only: when its alias is
+process-local (``LocMemCache``, without ``REDIS_URL``), bits are kept for at
+most ``AMS_PERMISSIONS['PROCESS_LOCAL_TIMEOUT']`` seconds instead.
+``permission_index`` maps ``"app_label.codename"`` to bit numbers. It is held
+in memory and reloaded when the Permission table changes: a version kept in
+the shared cache moves, as for FX rates.
+
+``RolePermissionBackend`` answers ``has_perm`` and ``has_module_perms`` from
+the two, with no queries once a user's bits are cached. The API's
+``DjangoModelPermissions`` and the admin both go through it.
+
+``apps.users.signals`` drops a user's bits when their role, status, groups or
+own permissions change, and drops every member's bits when a group's
+permissions change. Writers that bypass model signals (``QuerySet.update`` of
+those fields) call ``invalidate_on_commit`` themselves.
+"""
+import functools
+import operator
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+
+from ams.cache import AccountCache, cache_settings
+from .models import AmsUser
+
+DEFAULTS = {
+    # AmsUser.Permissions values and the actions they grant on every model of APPS, e.g.
+    # {'viewer': ['view'], 'clerk': ['view', 'add', 'change'], 'manager': ['view', 'add', 'change', 'delete']}.
+    'ROLES': {},
+    'APPS': ['accounts', 'billing', 'transactions', 'reports', 'balance_sheet', 'income_statement'],
+    # AmsUser.Status values that keep a user's permissions.
+    'ACTIVE_STATUSES': ['active'],
+    # Seconds a user's bits live when the cache alias is process-local and revocations stay in one process.
+    'PROCESS_LOCAL_TIMEOUT': 2,
+}
+# Apps whose models decide who may do what; left out of APPS whatever settings say.
+PROTECTED_APPS = {'users', 'auth'}
+INDEX_VERSION_KEY = 'ams:permission-index:version'
+# The AmsUser fields a user's bits are compiled from.
+USER_FIELDS = {'Permissions', 'Status', 'is_active'}
+
+
+def permission_settings():
+    return {**DEFAULTS, **getattr(settings, 'AMS_PERMISSIONS', {})}
+
+
+permission_cache = AccountCache(namespace='ams-perms',
+                                process_local_timeout=permission_settings()['PROCESS_LOCAL_TIMEOUT'])
+
+
+class PermissionIndex:
+    """Bit number of every permission, and the mask of every app's permissions."""
+
+    def __init__(self, rows):
+        self.bits, self.apps = {}, {}
+        for pk, app_label, codename in rows:
+            self.bits[f'{app_label}.{codename}'] = pk
+            self.apps[app_label] = self.apps.get(app_label, 0) | 1 << pk
+
+    def names(self, bits):
+        return {name for name, bit in self.bits.items() if bits >> bit & 1}
+
+
+_index = None
+
+
+def _shared():
+    return caches[cache_settings()['ALIAS']]
+
+
+def permission_index():
+    """The process's ``PermissionIndex``, reloaded when any process has changed the Permission table."""
+    global _index
+    version = _shared().get_or_set(INDEX_VERSION_KEY, time.time_ns)
+    if _index is None or _index[0] != version:
+        rows = Permission.objects.order_by().values_list('pk', 'content_type__app_label', 'codename')
+        _index = (version, PermissionIndex(rows))
+    return _index[1]
+
+
+def invalidate_index():
+    _shared().set(INDEX_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_on_commit(*account_ids):
+    permission_cache.invalidate_on_commit(*account_ids)
+
+
+def role_filter(role):
+    """``Q`` for the Permission rows ``role`` grants, or ``None`` for an unknown role."""
+    config = permission_settings()
+    actions = config['ROLES'].get(role)
+    if not actions:
+        return None
+    apps = set(config['APPS']) - PROTECTED_APPS
+    return Q(content_type__app_label__in=apps) & functools.reduce(
+        operator.or_, (Q(codename__startswith=f'{action}_') for action in actions))
+
+
+def compile_bits(account_id):
+    """A user's effective permissions as a bitset, read from the database in two queries."""
+    # From the primary: bits compiled from a lagging replica would outlive the revocation they missed.
+    user = AmsUser.objects.using(DEFAULT_DB_ALIAS).filter(pk=account_id).values(*USER_FIELDS).first()
+    if not user or not user['is_active'] or user['Status'] not in permission_settings()['ACTIVE_STATUSES']:
+        return 0
+    granted = Q(ams_users=account_id) | Q(group__ams_users=account_id)
+    role = role_filter(user['Permissions'])
+    if role is not None:
+        granted |= role
+    bits = 0
+    for pk in Permission.objects.using(DEFAULT_DB_ALIAS).filter(granted).order_by().values_list('pk', flat=True).distinct():
+        bits |= 1 << pk
+    return bits
+
+
+def permission_bits(account_id):
+    return permission_cache.get_or_compute(account_id, 'bits', lambda: compile_bits(account_id))
+
+
+class RolePermissionBackend(ModelBackend):
+    """``ModelBackend`` whose permission checks read ``permission_bits`` instead of querying."""
+
+    def user_bits(self, user_obj):
+        # Kept on the user for the rest of the request, like ModelBackend's _perm_cache.
+        if not hasattr(user_obj, '_permission_bits'):
+            user_obj._permission_bits = permission_bits(user_obj.pk)
+        return user_obj._permission_bits
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if user_obj.is_superuser:
+            return set(permission_index().bits)
+        return permission_index().names(self.user_bits(user_obj))
+
+    def has_perm(self, user_obj, perm, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return False
+        if user_obj.is_superuser:
+            return perm in permission_index().bits
+        bit = permission_index().bits.get(perm)
+        return bit is not None and bool(self.user_bits(user_obj) >> bit & 1)
+
+    def has_module_perms(self, user_obj, app_label):
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return False
+        if user_obj.is_superuser:
+            return app_label in permission_index().apps
+        return bool(self.user_bits(user_obj) & permission_index().apps.get(app_label, 0))
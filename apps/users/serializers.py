@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+from .models import AmsUser
+
+
+class AmsUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AmsUser
+        fields = ['AccountID', 'username', 'first_name', 'last_name', 'email', 'Permissions', 'Status',
+                  'is_active', 'date_joined']
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from ams.fixtures import fixture_loaded
+
+from . import permissions
+from .models import AmsUser
+
+M2M_ACTIONS = ('pre_clear', 'post_add', 'post_remove')
+
+
+@receiver(post_save, sender=AmsUser)
+def invalidate_user_permissions(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login alone; that leaves the bits as they are.
+    if update_fields is None or permissions.USER_FIELDS & set(update_fields):
+        permissions.invalidate_on_commit(instance.pk)
+
+
+@receiver(m2m_changed, sender=AmsUser.groups.through)
+@receiver(m2m_changed, sender=AmsUser.user_permissions.through)
+def invalidate_on_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in M2M_ACTIONS:
+        return
+    if not reverse:
+        users = [instance.pk]
+    elif action == 'pre_clear':
+        users = instance.ams_users.values_list('pk', flat=True)
+    else:
+        users = pk_set
+    permissions.invalidate_on_commit(*users)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in M2M_ACTIONS:
+        return
+    if not reverse:
+        groups = [instance.pk]
+    elif action == 'pre_clear':
+        groups = instance.group_set.values_list('pk', flat=True)
+    else:
+        groups = pk_set
+    permissions.invalidate_on_commit(
+        *AmsUser.objects.filter(groups__in=list(groups)).values_list('pk', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_members(sender, instance, **kwargs):
+    # Deleting a group removes its memberships without m2m_changed.
+    permissions.invalidate_on_commit(*instance.ams_users.values_list('pk', flat=True))
+
+
+@receiver(fixture_loaded, sender=AmsUser)
+def invalidate_loaded_users(sender, pks, **kwargs):
+    permissions.invalidate_on_commit(*pks)
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(fixture_loaded, sender=Permission)
+def invalidate_permission_index(sender, **kwargs):
+    permissions.invalidate_index()
+
+
+@receiver(post_migrate)
+def invalidate_permission_index_after_migrate(sender, **kwargs):
+    # create_permissions bulk-creates the permissions of new models, without post_save.
+    permissions.invalidate_index()
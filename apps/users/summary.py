@@ -0,0 +1,199 @@
+"""Database triggers that maintain ``AccountSummary``.
+
+Every insert, update and delete on the Transaction and ArchivedTransaction
+tables adjusts the account's TransactionCount and Balance (Credit - Debit) in
+the same statement, and LastTransactionAt is advanced on insert and
+recomputed from both tables only when the latest transaction is removed. A
+new AmsUser gets an empty summary row.
+
+Because the work happens in the database, the summary follows ``bulk_create``,
+raw SQL and concurrent writers (the update of the summary row serialises
+them). Archiving moves a row from one table to the other, so
+the summary does not change.
+
+``rebuild`` recomputes summaries from the transaction rows and ``verify``
+compares the two.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Max, Sum
+
+SOURCES = (('transactions', 'Transaction'), ('transactions', 'ArchivedTransaction'))
+
+
+def _names(apps, quote_name):
+    summary = apps.get_model('users', 'AccountSummary')
+    users = apps.get_model('users', 'AmsUser')
+    return {
+        'summary': quote_name(summary._meta.db_table),
+        'users': quote_name(users._meta.db_table),
+        'user_pk': quote_name(users._meta.pk.column),
+        'sources': [quote_name(apps.get_model(*source)._meta.db_table) for source in SOURCES],
+        'account': quote_name('AccountID_id'),
+        'count': quote_name('TransactionCount'),
+        'last': quote_name('LastTransactionAt'),
+        'balance': quote_name('Balance'),
+        'date': quote_name('DateOfTransaction'),
+        'debit': quote_name('Debit'),
+        'credit': quote_name('Credit'),
+    }
+
+
+def _latest(n, row):
+    """SQL for the latest transaction date of ``row``'s account across both tables."""
+    parts = ' UNION ALL '.join(
+        f"SELECT MAX({n['date']}) AS d FROM {table} WHERE {n['account']} = {row}.{n['account']}"
+        for table in n['sources']
+    )
+    return f"(SELECT MAX(d) FROM ({parts}) latest)"
+
+
+def sqlite_statements(n):
+    def add(row):
+        return (
+            f"INSERT OR IGNORE INTO {n['summary']} ({n['account']}, {n['count']}, {n['balance']}) "
+            f"VALUES ({row}.{n['account']}, 0, 0); "
+            f"UPDATE {n['summary']} SET {n['count']} = {n['count']} + 1, "
+            f"{n['balance']} = ROUND({n['balance']} + {row}.{n['credit']} - {row}.{n['debit']}, 2), "
+            f"{n['last']} = CASE WHEN {n['last']} IS NULL OR {row}.{n['date']} > {n['last']} "
+            f"THEN {row}.{n['date']} ELSE {n['last']} END "
+            f"WHERE {n['account']} = {row}.{n['account']};"
+        )
+
+    def remove(row):
+        return (
+            f"UPDATE {n['summary']} SET {n['count']} = {n['count']} - 1, "
+            f"{n['balance']} = ROUND({n['balance']} - {row}.{n['credit']} + {row}.{n['debit']}, 2), "
+            f"{n['last']} = CASE WHEN {row}.{n['date']} >= {n['last']} THEN {_latest(n, row)} ELSE {n['last']} END "
+            f"WHERE {n['account']} = {row}.{n['account']};"
+        )
+
+    statements = [
+        f"CREATE TRIGGER ams_summary_user_ai AFTER INSERT ON {n['users']} BEGIN "
+        f"INSERT OR IGNORE INTO {n['summary']} ({n['account']}, {n['count']}, {n['balance']}) "
+        f"VALUES (new.{n['user_pk']}, 0, 0); END",
+    ]
+    for i, table in enumerate(n['sources']):
+        columns = ', '.join(n[key] for key in ('account', 'date', 'debit', 'credit'))
+        statements += [
+            f"CREATE TRIGGER ams_summary_{i}_ai AFTER INSERT ON {table} BEGIN {add('new')} END",
+            f"CREATE TRIGGER ams_summary_{i}_ad AFTER DELETE ON {table} BEGIN {remove('old')} END",
+            f"CREATE TRIGGER ams_summary_{i}_au AFTER UPDATE OF {columns} ON {table} "
+            f"BEGIN {remove('old')} {add('new')} END",
+        ]
+    return statements
+
+
+def postgresql_statements(n):
+    def add(row):
+        return (
+            f"INSERT INTO {n['summary']} ({n['account']}, {n['count']}, {n['balance']}) "
+            f"VALUES ({row}.{n['account']}, 0, 0) ON CONFLICT DO NOTHING; "
+            f"UPDATE {n['summary']} SET {n['count']} = {n['count']} + 1, "
+            f"{n['balance']} = {n['balance']} + {row}.{n['credit']} - {row}.{n['debit']}, "
+            f"{n['last']} = GREATEST({n['last']}, {row}.{n['date']}) "
+            f"WHERE {n['account']} = {row}.{n['account']};"
+        )
+
+    def remove(row):
+        return (
+            f"UPDATE {n['summary']} SET {n['count']} = {n['count']} - 1, "
+            f"{n['balance']} = {n['balance']} - {row}.{n['credit']} + {row}.{n['debit']}, "
+            f"{n['last']} = CASE WHEN {row}.{n['date']} >= {n['last']} THEN {_latest(n, row)} ELSE {n['last']} END "
+            f"WHERE {n['account']} = {row}.{n['account']};"
+        )
+
+    statements = [
+        f"CREATE FUNCTION ams_summary_user() RETURNS trigger AS $$ BEGIN "
+        f"INSERT INTO {n['summary']} ({n['account']}, {n['count']}, {n['balance']}) "
+        f"VALUES (NEW.{n['user_pk']}, 0, 0) ON CONFLICT DO NOTHING; RETURN NULL; END $$ LANGUAGE plpgsql",
+        f"CREATE TRIGGER ams_summary_user_ai AFTER INSERT ON {n['users']} "
+        f"FOR EACH ROW EXECUTE FUNCTION ams_summary_user()",
+        f"CREATE FUNCTION ams_summary_transaction() RETURNS trigger AS $$ BEGIN "
+        f"IF TG_OP IN ('UPDATE', 'DELETE') THEN {remove('OLD')} END IF; "
+        f"IF TG_OP IN ('INSERT', 'UPDATE') THEN {add('NEW')} END IF; "
+        f"RETURN NULL; END $$ LANGUAGE plpgsql",
+    ]
+    for i, table in enumerate(n['sources']):
+        columns = ', '.join(n[key] for key in ('account', 'date', 'debit', 'credit'))
+        statements.append(
+            f"CREATE TRIGGER ams_summary_{i} AFTER INSERT OR DELETE OR UPDATE OF {columns} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION ams_summary_transaction()"
+        )
+    return statements
+
+
+def drop_statements(vendor, n):
+    if vendor == 'postgresql':
+        return [f"DROP TRIGGER IF EXISTS ams_summary_user_ai ON {n['users']}",
+                *(f"DROP TRIGGER IF EXISTS ams_summary_{i} ON {table}" for i, table in enumerate(n['sources'])),
+                "DROP FUNCTION IF EXISTS ams_summary_user()",
+                "DROP FUNCTION IF EXISTS ams_summary_transaction()"]
+    return ["DROP TRIGGER IF EXISTS ams_summary_user_ai",
+            *(f"DROP TRIGGER IF EXISTS ams_summary_{i}_{op}" for i in range(len(n['sources']))
+              for op in ('ai', 'ad', 'au'))]
+
+
+STATEMENTS = {'sqlite': sqlite_statements, 'postgresql': postgresql_statements}
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in STATEMENTS:
+        raise ImproperlyConfigured(
+            f"AccountSummary is maintained by database triggers, which exist for {' and '.join(sorted(STATEMENTS))} "
+            f"only; the users migrations cannot run on {vendor}.")
+    for sql in STATEMENTS[vendor](_names(apps, schema_editor.quote_name)):
+        schema_editor.execute(sql, params=None)
+    rebuild(apps)
+
+
+def uninstall(apps, schema_editor):
+    for sql in drop_statements(schema_editor.connection.vendor, _names(apps, schema_editor.quote_name)):
+        schema_editor.execute(sql, params=None)
+
+
+def totals(apps, account_ids=None):
+    """``{account_id: [count, balance, last]}`` computed from the hot and archived transactions."""
+    found = defaultdict(lambda: [0, Decimal('0.00'), None])
+    for source in SOURCES:
+        rows = (apps.get_model(*source).objects.order_by().values('AccountID_id')
+                .annotate(count=Count('pk'), credit=Sum('Credit'), debit=Sum('Debit'), last=Max('DateOfTransaction')))
+        if account_ids is not None:
+            rows = rows.filter(AccountID_id__in=account_ids)
+        for row in rows:
+            entry = found[row['AccountID_id']]
+            entry[0] += row['count']
+            entry[1] += row['credit'] - row['debit']
+            entry[2] = max(filter(None, (entry[2], row['last'])), default=None)
+    return found
+
+
+def rebuild(apps=global_apps, account_ids=None, batch_size=5000):
+    """Recompute the summaries of ``account_ids`` (default: every account) from the transaction rows."""
+    summary = apps.get_model('users', 'AccountSummary')
+    users = apps.get_model('users', 'AmsUser').objects.order_by('pk').values_list('pk', flat=True)
+    if account_ids is not None:
+        users = users.filter(pk__in=account_ids)
+    expected = totals(apps, account_ids)
+    user_ids = list(users)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        summary.objects.filter(pk__in=batch).delete()
+        summary.objects.bulk_create(
+            summary(AccountID_id=pk, TransactionCount=expected[pk][0], Balance=expected[pk][1],
+                    LastTransactionAt=expected[pk][2])
+            for pk in batch
+        )
+
+
+def verify(account_id):
+    summary = global_apps.get_model('users', 'AccountSummary').objects.filter(pk=account_id).first()
+    stored = (summary.TransactionCount, summary.Balance, summary.LastTransactionAt) if summary else None
+    expected = tuple(totals(global_apps, [account_id])[account_id])
+    if stored != expected:
+        return [f"summary {stored} != {expected}"]
+    return []
@@ -1,3 +1,206 @@
-from django.test import TestCase
+from datetime import date, datetime, timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import Group, Permission
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ams.testing import AdminTestMixin, make_account, make_transaction
+from apps.transactions.archive import archive_period
+from apps.transactions.models import Transaction
+from . import permissions, summary
+from .models import AccountSummary, AmsUser
+
+
+class AmsUserAdminQueryTests(AdminTestMixin, TestCase):
+    def test_user_changelist(self):
+        self.assertChangelistQueriesConstant(AmsUser, lambda count: [make_account() for _ in range(count)])
+
+    def test_user_changelist_shows_summary(self):
+        account = make_account()
+        make_transaction(account, datetime(2025, 3, 1, tzinfo=timezone.utc), credit=25)
+        self.client.force_login(self.admin_user())
+        response = self.client.get(reverse('admin:users_amsuser_changelist'),
+                                   {'summary__LastTransactionAt__gte': '2025-01-01T00:00:00+00:00'})
+        self.assertEqual(list(response.context['cl'].result_list), [account])
+        self.assertContains(response, '25.00')
+
+
+class AccountSummaryTests(TestCase):
+    def assertSummary(self, account, count, balance, last):
+        row = AccountSummary.objects.get(pk=account.pk)
+        self.assertEqual((row.TransactionCount, row.Balance, row.LastTransactionAt), (count, Decimal(balance), last))
+        self.assertEqual(summary.verify(account.pk), [])
+
+    def test_new_account_has_empty_summary(self):
+        self.assertSummary(make_account(), 0, '0', None)
+
+    def test_follows_save_update_and_delete(self):
+        account, other = make_account(), make_account()
+        first = datetime(2025, 1, 5, tzinfo=timezone.utc)
+        later = datetime(2025, 2, 5, tzinfo=timezone.utc)
+        make_transaction(account, first, credit='100.10')
+        tx = make_transaction(account, later, debit='40.05')
+        self.assertSummary(account, 2, '60.05', later)
+
+        tx.Debit, tx.DateOfTransaction = Decimal('10.00'), first
+        tx.save()
+        self.assertSummary(account, 2, '90.10', first)
+
+        tx.AccountID = other
+        tx.save()
+        self.assertSummary(account, 1, '100.10', first)
+        self.assertSummary(other, 1, '-10.00', first)
+
+        tx.delete()
+        self.assertSummary(other, 0, '0', None)
+
+    def test_follows_bulk_create_and_archiving(self):
+        account = make_account()
+        Transaction.objects.bulk_create(
+            Transaction(AccountID=account, DateOfTransaction=datetime(2024, month, 1, 12, tzinfo=timezone.utc),
+                        Credit=10, Debit=0, TotalAmount=10, BankName='Demo Bank')
+            for month in range(1, 7)
+        )
+        last = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+        self.assertSummary(account, 6, '60', last)
+
+        archive_period(date(2024, 1, 1), date(2024, 12, 31))
+        self.assertEqual(Transaction.objects.filter(AccountID=account).count(), 0)
+        self.assertSummary(account, 6, '60', last)
+
+        AccountSummary.objects.filter(pk=account.pk).update(TransactionCount=0, Balance=0)
+        self.assertTrue(summary.verify(account.pk))
+        summary.rebuild(account_ids=[account.pk])
+        self.assertSummary(account, 6, '60', last)
+
+
+class TokenApiTests(TestCase):
+    def test_jwt_token_authenticates_api_requests(self):
+        account = make_account(username='api-user')
+        account.set_password('secret-pass')
+        account.save()
+
+        token = self.client.post(reverse('token_obtain_pair', kwargs={'version': 'v1'}),
+                                 {'username': 'api-user', 'password': 'secret-pass'}).json()['access']
+        response = self.client.get(reverse('amsuser-list', kwargs={'version': 'v1'}),
+                                   HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual([row['AccountID'] for row in response.json()['results']], [account.pk])
+        self.assertEqual(self.client.get(reverse('amsuser-list', kwargs={'version': 'v1'})).status_code, 401)
+
+
+ROLES = {'viewer': ['view'], 'clerk': ['view', 'add', 'change'], 'manager': ['view', 'add', 'change', 'delete']}
+
+
+@override_settings(AMS_PERMISSIONS={'ROLES': ROLES})
+class PermissionResolverTests(TransactionTestCase):
+    # Committed writes: bits are only cached for accounts with no uncommitted invalidation pending.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        permissions.permission_cache.clear()
+        self.user = make_account(Permissions='viewer')
+        self.group = Group.objects.create(name='clerks')
+        self.add_transaction = Permission.objects.get(codename='add_transaction')
+
+    def fresh(self):
+        return AmsUser.objects.get(pk=self.user.pk)
+
+    def assertCachedPerm(self, perm, expected=True):
+        user = self.fresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(user.has_perm(perm), expected)
+
+    def test_role_groups_and_own_permissions_are_combined(self):
+        user = self.fresh()
+        self.assertTrue(user.has_perm('transactions.view_transaction'))
+        self.assertFalse(user.has_perm('transactions.add_transaction'))
+        self.assertFalse(user.has_perm('auth.view_group'))
+
+        self.group.permissions.add(self.add_transaction)
+        self.user.groups.add(self.group)
+        self.user.user_permissions.add(Permission.objects.get(codename='view_group'))
+        user = self.fresh()
+        self.assertTrue(user.has_perms(['transactions.add_transaction', 'auth.view_group']))
+        self.assertIn('transactions.add_transaction', user.get_all_permissions())
+        self.assertFalse(user.has_module_perms('sessions'))
+
+    def test_checks_are_answered_from_the_cache_without_queries(self):
+        self.fresh().has_perm('transactions.view_transaction')
+        user = self.fresh()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('transactions.view_transaction'))
+            self.assertFalse(user.has_perm('transactions.delete_transaction'))
+            self.assertTrue(user.has_module_perms('billing'))
+
+    def test_bits_are_short_lived_on_a_process_local_cache(self):
+        # The test settings have no REDIS_URL: 'shared' is a LocMemCache, so other workers never see
+        # a revocation and the bits must expire on their own.
+        self.assertEqual(permissions.permission_cache.timeout, 2)
+        self.assertEqual(permissions.permission_cache.local.ttl, 2)
+
+    def test_role_status_and_group_changes_invalidate(self):
+        self.user.groups.add(self.group)
+        self.assertFalse(self.fresh().has_perm('transactions.add_transaction'))
+        self.group.permissions.add(self.add_transaction)
+        self.assertTrue(self.fresh().has_perm('transactions.add_transaction'))
+        self.add_transaction.group_set.clear()
+        self.assertFalse(self.fresh().has_perm('transactions.add_transaction'))
+
+        self.user.Permissions = 'manager'
+        self.user.save()
+        self.assertTrue(self.fresh().has_perm('transactions.delete_transaction'))
+        self.user.save(update_fields=['last_login'])
+        self.assertCachedPerm('transactions.delete_transaction')
+
+        self.user.Status = 'suspended'
+        self.user.save(update_fields=['Status'])
+        self.assertFalse(self.fresh().has_perm('transactions.view_transaction'))
+
+    def test_api_writes_follow_the_role(self):
+        url = reverse('transaction-list', kwargs={'version': 'v1'})
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(url, {}).status_code, 403)
+        self.user.Permissions = 'clerk'
+        self.user.save()
+        self.assertEqual(self.client.post(url, {}).status_code, 400)
+
+    def test_roles_grant_nothing_unless_configured(self):
+        with override_settings(AMS_PERMISSIONS={}):
+            self.assertFalse(self.fresh().has_perm('transactions.view_transaction'))
+
+
+@override_settings(AMS_PERMISSIONS={'ROLES': ROLES})
+class RoleEscalationTests(TestCase):
+    def setUp(self):
+        permissions.permission_cache.clear()
+        self.clerk = make_account(Permissions='clerk', is_staff=True)
+        self.group = Group.objects.create(name='managers')
+        self.url = reverse('admin:users_amsuser_change', args=[self.clerk.pk])
+        self.client.force_login(self.clerk)
+
+    def promote(self):
+        return self.client.post(self.url, {
+            'username': self.clerk.username, 'date_joined_0': '2025-01-01', 'date_joined_1': '00:00:00',
+            'is_active': 'on', 'is_staff': 'on', 'is_superuser': 'on', 'Permissions': 'manager', 'Status': 'active',
+            'groups': [self.group.pk], 'user_permissions': [Permission.objects.get(codename='change_amsuser').pk],
+        })
+
+    def assertNotPromoted(self):
+        clerk = AmsUser.objects.get(pk=self.clerk.pk)
+        self.assertFalse(clerk.is_superuser)
+        self.assertEqual(clerk.Permissions, 'clerk')
+        self.assertFalse(clerk.groups.exists())
+        self.assertFalse(clerk.user_permissions.exclude(codename='change_amsuser').exists())
+
+    def test_roles_cannot_edit_users(self):
+        self.assertFalse(self.clerk.has_perm('users.change_amsuser'))
+        self.assertEqual(self.promote().status_code, 403)
+        self.assertNotPromoted()
+        with override_settings(AMS_PERMISSIONS={'ROLES': ROLES, 'APPS': ['users', 'auth', 'transactions']}):
+            self.assertFalse(AmsUser.objects.get(pk=self.clerk.pk).has_perm('users.change_amsuser'))
+
+    def test_only_superusers_change_authorization_fields(self):
+        self.clerk.user_permissions.add(Permission.objects.get(codename='change_amsuser'))
+        self.assertEqual(self.promote().status_code, 302)
+        self.assertNotPromoted()
@@ -1,3 +1,10 @@
-from django.shortcuts import render
+from ams.api import AccountScopedReadOnlyModelViewSet
+from .models import AmsUser
+from .serializers import AmsUserSerializer
 
-# Create your views here.
+
+class AmsUserViewSet(AccountScopedReadOnlyModelViewSet):
+    queryset = AmsUser.objects.all()
+    serializer_class = AmsUserSerializer
+    account_lookup = 'pk'
+    filterset_fields = ['username']